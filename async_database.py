@@ -0,0 +1,57 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+from config import settings
+from utils.metrics import mongo_command_listener
+
+# Async counterpart of database.py for use inside `async def` endpoints.
+# Same database and collection names; queries must be awaited.
+client = AsyncIOMotorClient(settings.MONGODB_URL, event_listeners=[mongo_command_listener])
+db = client[settings.DATABASE_NAME]
+
+
+# Access & Authentication
+access_requests_collection = db["access_requests"]
+access_tokens_collection = db["access_tokens"]
+otp_codes_collection = db["otp_codes"]
+otp_attempts_collection = db["otp_attempts"]
+
+# Users & Permissions
+admin_users_collection = db["admin_users"]
+investors_collection = db["investors"]
+users_collection = db["users"]
+permission_levels_collection = db["permission_levels"]
+
+# Documents
+documents_collection = db["documents"]
+document_categories_collection = db["document_categories"]
+document_access_collection = db["document_access"]
+document_access_logs_collection = db["document_access_logs"]
+document_versions_collection = db["document_versions"]
+document_views_collection = db["document_views"]
+upload_jobs_collection = db["upload_jobs"]
+document_blobs_collection = db["document_blobs"]
+
+# Q&A System
+qa_threads_collection = db["qa_threads"]
+qa_responses_collection = db["qa_responses"]
+
+# NDA
+nda_collection = db["nda"]
+nda_acceptances_collection = db["nda_acceptances"]
+
+# Company Information
+company_metrics_collection = db["company_metrics"]
+key_metrics_collection = db["key_metrics"]
+milestones_collection = db["milestones"]
+testimonials_collection = db["testimonials"]
+awards_collection = db["awards"]
+media_coverage_collection = db["media_coverage"]
+
+# System
+audit_logs_collection = db["audit_logs"]
+meetings_collection = db["meetings"]
+alert_configs_collection = db["alert_configs"]
+alert_logs_collection = db["alert_logs"]
+search_history_collection = db["search_history"]
+system_settings_collection = db["system_settings"]
+email_templates_collection = db["email_templates"]
+collection_versions_collection = db["collection_versions"]
@@ -35,11 +35,58 @@ class Settings(BaseSettings):
     ALLOWED_EXTENSIONS: List[str]
     ALLOWED_FILE_TYPES: List[str]
     NDA_VERSION: str
+    UPLOAD_READ_CHUNK_KB: int = 1024
+    UPLOAD_JOB_WORKERS: int = 2
+    UPLOAD_JOB_LEASE_SECONDS: int = 900
+    UPLOAD_BATCH_CONCURRENCY: int = 4
+    UPLOAD_BATCH_MAX_FILES: int = 50
+    DIRECT_UPLOAD_TTL_SECONDS: int = 600
+    DOCUMENT_LIST_DEFAULT_LIMIT: int = 50
+    DOCUMENT_LIST_MAX_LIMIT: int = 200
+    DOCUMENT_TEXT_SEARCH_MIN_LENGTH: int = 3
+    DOCUMENT_CACHE_MAX_ENTRIES: int = 512
+    DOCUMENT_CACHE_TTL_SECONDS: int = 30
+    COLLECTION_VERSION_CACHE_SECONDS: int = 60
+    STORAGE_BACKEND: str = "cloudinary"
+    LOCAL_STORAGE_ROOT: str = ""
+    LOCAL_STORAGE_ACCEL_REDIRECT_PREFIX: str = ""
+    CLOUDINARY_CHUNK_SIZE_MB: int = 6
+    RENDITION_CACHE_DIR: str = ""
+    RENDITION_CACHE_MAX_MB: int = 512
+    RENDITION_SOURCE_MAX_MB: int = 25
+    RENDITION_MAX_PIXELS: int = 50_000_000
+    RENDITION_PREGENERATE: bool = True
+    BUNDLE_MAX_DOCUMENTS: int = 200
+    BUNDLE_MAX_TOTAL_MB: int = 2048
+    BUNDLE_FETCH_CONCURRENCY: int = 4
+    BUNDLE_PREFETCH_CHUNKS: int = 8
+    BUNDLE_CHUNK_KB: int = 256
     
     # Redis Cache
     REDIS_URL: str
     CACHE_TTL: int
-    
+
+    # Password hashing pool (bcrypt runs off the shared threadpool)
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # Verified JWT cache and auth logging
+    TOKEN_CACHE_MAX_ENTRIES: int = 10000
+    AUTH_LOG_SAMPLE_RATE: float = 0.01
+    LOG_LEVEL: str = "INFO"
+
+    # Document access log write-behind buffer
+    ACCESS_LOG_FLUSH_INTERVAL_SECONDS: float = 2.0
+    ACCESS_LOG_MAX_BATCH: int = 500
+    ACCESS_LOG_MAX_BUFFERED: int = 20000
+
+    # Build missing registered indexes when the app starts
+    RECONCILE_INDEXES_ON_STARTUP: bool = True
+
+    # Principal (token identity) Cache
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 2048
+
     # Slack Integration
     SLACK_WEBHOOK_URL: str
     
@@ -50,6 +97,11 @@ class Settings(BaseSettings):
     CLOUDINARY_CLOUD_NAME: str
     CLOUDINARY_API_KEY: str
     CLOUDINARY_API_SECRET: str
+    CLOUDINARY_API_BASE_URL: str = "https://api.cloudinary.com/v1_1"
+    CLOUDINARY_TIMEOUT_SECONDS: float = 30.0
+    CLOUDINARY_MAX_RETRIES: int = 3
+    CLOUDINARY_BREAKER_THRESHOLD: int = 5
+    CLOUDINARY_BREAKER_RESET_SECONDS: float = 30.0
     
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
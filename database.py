@@ -1,8 +1,9 @@
-from pymongo import MongoClient, ASCENDING, DESCENDING, TEXT
+from pymongo import MongoClient
 from datetime import datetime
 from config import settings
+from utils.metrics import mongo_command_listener
 
-client = MongoClient(settings.MONGODB_URL)
+client = MongoClient(settings.MONGODB_URL, event_listeners=[mongo_command_listener])
 db = client[settings.DATABASE_NAME]
 
 
@@ -25,6 +26,8 @@ document_access_collection = db["document_access"]
 document_access_logs_collection = db["document_access_logs"]
 document_versions_collection = db["document_versions"]
 document_views_collection = db["document_views"]
+upload_jobs_collection = db["upload_jobs"]
+document_blobs_collection = db["document_blobs"]
 
 # Q&A System
 qa_threads_collection = db["qa_threads"]
@@ -50,84 +53,17 @@ alert_logs_collection = db["alert_logs"]
 search_history_collection = db["search_history"]
 system_settings_collection = db["system_settings"]
 email_templates_collection = db["email_templates"]
+collection_versions_collection = db["collection_versions"]
 
 
 
 def setup_indexes():
-    """Create all necessary database indexes"""
+    """Create any registered indexes (see indexes.INDEXES) that are missing"""
+    from indexes import reconcile_indexes
     
-    print("Creating database indexes...")
-    
-    # Documents - Full text search
-    documents_collection.create_index([
-        ("title", TEXT),
-        ("description", TEXT),
-        ("tags", TEXT)
-    ], name="document_search_index")
-    
-    # Documents - Regular indexes
-    documents_collection.create_index([("category_id", ASCENDING)])
-    documents_collection.create_index([("file_type", ASCENDING)])
-    documents_collection.create_index([("upload_date", DESCENDING)])
-    documents_collection.create_index([("view_count", DESCENDING)])
-    documents_collection.create_index([("category", ASCENDING)])
-    documents_collection.create_index([("uploaded_at", ASCENDING)])
-    
-    # Document Versions
-    document_versions_collection.create_index([
-        ("document_id", ASCENDING),
-        ("upload_date", DESCENDING)
-    ])
-    document_versions_collection.create_index([("is_current", ASCENDING)])
-    
-    # Document Access & Views
-    document_access_collection.create_index([
-        ("investor_id", ASCENDING),
-        ("timestamp", ASCENDING)
-    ])
-    document_views_collection.create_index([
-        ("document_id", ASCENDING),
-        ("user_id", ASCENDING),
-        ("viewed_at", DESCENDING)
-    ])
-    
-    # Search History
-    search_history_collection.create_index([
-        ("user_id", ASCENDING),
-        ("timestamp", DESCENDING)
-    ])
-    
-    # Q&A Threads - Full text search
-    qa_threads_collection.create_index([
-        ("question_text", TEXT),
-        ("answer_text", TEXT)
-    ], name="qa_search_index")
-    
-    # Q&A Threads - Regular indexes
-    qa_threads_collection.create_index([("asked_by", ASCENDING)])
-    qa_threads_collection.create_index([("status", ASCENDING)])
-    qa_threads_collection.create_index([("is_public", ASCENDING)])
-    qa_threads_collection.create_index([("category", ASCENDING)])
-    
-    # Users & Authentication
-    investors_collection.create_index([("email", ASCENDING)], unique=True)
-    admin_users_collection.create_index([("username", ASCENDING)], unique=True, sparse=True)
-    admin_users_collection.create_index([("email", ASCENDING)], unique=True)
-    
-    # OTP indexes
-    otp_codes_collection.create_index([("email", ASCENDING)])
-    otp_codes_collection.create_index([("expires_at", ASCENDING)])
-    otp_codes_collection.create_index([("created_at", ASCENDING)], expireAfterSeconds=600)
-    otp_attempts_collection.create_index([("email", ASCENDING)])
-    
-    # Company Information
-    key_metrics_collection.create_index([("display_order", ASCENDING)])
-    milestones_collection.create_index([("date", DESCENDING)])
-    testimonials_collection.create_index([("is_featured", DESCENDING)])
-    awards_collection.create_index([("date_received", DESCENDING)])
-    media_coverage_collection.create_index([("publish_date", DESCENDING)])
-    
-    print(" All indexes created successfully")
+    print("Reconciling database indexes...")
+    summary = reconcile_indexes(db)
+    print(f" Indexes up to date ({len(summary['created'])} created, {summary['existing']} already present)")
 
 
 # SEED DATA - Initial company information
@@ -1,10 +1,283 @@
-from pymongo import ASCENDING
-from database import access_tokens_collection, users_collection, otp_codes_collection, permission_levels_collection, document_categories_collection
-
-# Create indexes
-access_tokens_collection.create_index([("token", ASCENDING)], unique=True)
-users_collection.create_index([("email", ASCENDING)], unique=True)
-otp_codes_collection.create_index([("email", ASCENDING)])
-otp_codes_collection.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
-permission_levels_collection.create_index([("name", ASCENDING)], unique=True)
-document_categories_collection.create_index([("slug", ASCENDING)], unique=True)
\ No newline at end of file
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+# Single source of truth for every index the app relies on.
+# reconcile_indexes() diffs this against list_indexes() and only builds what is missing.
+INDEXES: Dict[str, List[IndexModel]] = {
+    # Access & Authentication
+    "access_requests": [
+        IndexModel([("email", ASCENDING), ("status", ASCENDING)]),
+    ],
+    "access_tokens": [
+        IndexModel([("token", ASCENDING)], unique=True),
+        IndexModel([("email", ASCENDING), ("is_active", ASCENDING)]),
+    ],
+    "otp_codes": [
+        IndexModel([("email", ASCENDING)]),
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        IndexModel([("created_at", ASCENDING)], expireAfterSeconds=600),
+    ],
+    "otp_attempts": [
+        IndexModel([("email", ASCENDING)]),
+    ],
+
+    # Users & Permissions
+    "admin_users": [
+        IndexModel([("username", ASCENDING)], unique=True, sparse=True),
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "investors": [
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("permission_level_id", ASCENDING)]),
+    ],
+    "permission_levels": [
+        IndexModel([("name", ASCENDING)], unique=True),
+    ],
+
+    # Documents
+    "documents": [
+        IndexModel(
+            [("title", TEXT), ("description", TEXT), ("tags", TEXT)],
+            name="document_search_index",
+        ),
+        IndexModel([("category_id", ASCENDING)]),
+        IndexModel([("file_type", ASCENDING)]),
+        IndexModel([("upload_date", DESCENDING)]),
+        IndexModel([("view_count", DESCENDING)]),
+        IndexModel([("category", ASCENDING)]),
+        IndexModel([("categories", ASCENDING)]),
+        IndexModel([("uploaded_at", ASCENDING)]),
+        # Keyset pagination for listings, overall and per category
+        IndexModel([("uploaded_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("categories", ASCENDING), ("uploaded_at", DESCENDING), ("_id", DESCENDING)]),
+        IndexModel([("content_sha256", ASCENDING)]),
+    ],
+    "document_categories": [
+        IndexModel([("slug", ASCENDING)], unique=True),
+    ],
+    "document_versions": [
+        IndexModel([("document_id", ASCENDING), ("upload_date", DESCENDING)]),
+        IndexModel([("document_id", ASCENDING), ("version_number", DESCENDING)], unique=True),
+        # At most one current version per document; only current versions are indexed
+        IndexModel(
+            [("document_id", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"is_current": True},
+            name="current_version_unique",
+        ),
+    ],
+    "document_access": [
+        IndexModel([("investor_id", ASCENDING), ("timestamp", ASCENDING)]),
+        IndexModel([("timestamp", ASCENDING)]),
+    ],
+    "document_access_logs": [
+        IndexModel([("document_id", ASCENDING), ("accessed_at", DESCENDING)]),
+    ],
+    "document_blobs": [
+        IndexModel([("sha256", ASCENDING)], unique=True),
+    ],
+    "upload_jobs": [
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+        # Finished jobs are kept for a week for status polling
+        IndexModel([("finished_at", ASCENDING)], expireAfterSeconds=7 * 24 * 3600),
+    ],
+    "document_views": [
+        IndexModel([("document_id", ASCENDING), ("user_id", ASCENDING), ("viewed_at", DESCENDING)]),
+    ],
+
+    # Q&A System
+    "qa_threads": [
+        IndexModel([("question_text", TEXT), ("answer_text", TEXT)], name="qa_search_index"),
+        IndexModel([("asked_by", ASCENDING)]),
+        IndexModel([("status", ASCENDING)]),
+        IndexModel([("is_public", ASCENDING)]),
+        IndexModel([("category", ASCENDING)]),
+        IndexModel([("asked_at", DESCENDING)]),
+    ],
+
+    # NDA
+    "nda_acceptances": [
+        IndexModel([("user_id", ASCENDING), ("nda_version", ASCENDING)]),
+    ],
+
+    # Company Information
+    "key_metrics": [
+        IndexModel([("display_order", ASCENDING)]),
+    ],
+    "milestones": [
+        IndexModel([("date", DESCENDING)]),
+    ],
+    "testimonials": [
+        IndexModel([("is_featured", DESCENDING)]),
+    ],
+    "awards": [
+        IndexModel([("date_received", DESCENDING)]),
+    ],
+    "media_coverage": [
+        IndexModel([("publish_date", DESCENDING)]),
+    ],
+
+    # System
+    "meetings": [
+        IndexModel([("scheduled_at", ASCENDING), ("status", ASCENDING)]),
+        IndexModel([("investor_id", ASCENDING), ("scheduled_at", DESCENDING)]),
+    ],
+    "alert_configs": [
+        IndexModel([("alert_type", ASCENDING), ("is_active", ASCENDING)]),
+    ],
+    "search_history": [
+        IndexModel([("user_id", ASCENDING), ("timestamp", DESCENDING)]),
+    ],
+    "email_templates": [
+        IndexModel([("template_type", ASCENDING)]),
+    ],
+}
+
+# Real query shapes issued by the app, checked by advise_query_shapes().
+# Each entry: (collection, filter, sort, where it comes from)
+QUERY_SHAPES = [
+    ("access_requests", {"email": "a@example.com", "status": "approved"}, None,
+     "otp.request_otp login fallback"),
+    ("access_requests", {"email": "a@example.com", "status": {"$in": ["pending", "approved"]}}, None,
+     "access_requests.create_access_request"),
+    ("access_tokens", {"email": "a@example.com", "is_active": True}, None,
+     "PermissionService.check_access_expiry"),
+    ("investors", {"email": "a@example.com", "is_active": True}, None,
+     "otp.request_otp login"),
+    ("users", {"email": "a@example.com"}, None,
+     "otp.verify_otp"),
+    ("nda_acceptances", {"user_id": "000000000000000000000000", "nda_version": "1.0", "is_active": True}, None,
+     "NDAService.get_user_nda_acceptance"),
+    ("documents", {}, [("uploaded_at", DESCENDING), ("_id", DESCENDING)],
+     "DocumentService.list_documents"),
+    ("documents", {"categories": {"$in": ["Financials"]}}, [("uploaded_at", DESCENDING), ("_id", DESCENDING)],
+     "DocumentService.list_documents by category"),
+    ("documents", {"$text": {"$search": "revenue"}}, None,
+     "DocumentService.search_documents"),
+    ("document_versions", {"document_id": "000000000000000000000000", "is_current": True}, None,
+     "DocumentVersionService.get_current_version"),
+    ("document_versions", {"document_id": "000000000000000000000000"}, [("version_number", DESCENDING)],
+     "DocumentVersionService.list_versions"),
+    ("document_access_logs", {"document_id": "000000000000000000000000"}, [("accessed_at", DESCENDING)],
+     "documents.get_document_access_logs"),
+    ("meetings", {"scheduled_at": {"$gte": 0}, "status": "scheduled"}, [("scheduled_at", ASCENDING)],
+     "meetings.get_upcoming_meetings"),
+    ("meetings", {"scheduled_at": {"$gte": 0, "$lt": 1}, "status": {"$ne": "cancelled"}}, None,
+     "meetings.get_available_slots"),
+    ("meetings", {"investor_id": "000000000000000000000000"}, [("scheduled_at", DESCENDING)],
+     "meetings.get_my_meetings"),
+    ("qa_threads", {}, [("asked_at", DESCENDING)],
+     "QAService.get_all_threads"),
+    ("alert_configs", {"alert_type": "document_view", "is_active": True}, None,
+     "AlertService.trigger_alert"),
+    ("document_access", {"timestamp": {"$gte": 0, "$lte": 1}}, None,
+     "AnalyticsService.export_analytics_report"),
+]
+
+
+def _matches(existing: dict, wanted: dict) -> bool:
+    if existing.get("name") == wanted["name"]:
+        return True
+    # Text indexes are stored as _fts/_ftsx keys, so they can only be matched by name
+    if "_fts" in existing["key"]:
+        return False
+    return list(existing["key"].items()) == list(wanted["key"].items())
+
+
+def _options_differ(existing: dict, wanted: dict) -> bool:
+    for option in ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression"):
+        if existing.get(option) != wanted.get(option):
+            return True
+    return False
+
+
+def reconcile_indexes(db, dry_run: bool = False) -> dict:
+    """
+    Build the registered indexes that are missing from the database.
+
+    Existing indexes are matched by name or key pattern, so indexes created
+    earlier under pymongo's default names are reused rather than duplicated.
+    Indexes with the same keys but different options are reported as
+    conflicts and left alone; nothing is ever dropped.
+    """
+    summary = {"created": [], "conflicts": [], "existing": 0}
+
+    for collection_name, models in INDEXES.items():
+        collection = db[collection_name]
+        existing = list(collection.list_indexes())
+
+        missing = []
+        for model in models:
+            wanted = model.document
+            match = next((index for index in existing if _matches(index, wanted)), None)
+            if match is None:
+                missing.append(model)
+            elif _options_differ(match, wanted):
+                summary["conflicts"].append(f"{collection_name}.{match['name']}")
+            else:
+                summary["existing"] += 1
+
+        if not missing:
+            continue
+
+        names = [f"{collection_name}.{model.document['name']}" for model in missing]
+        if not dry_run:
+            try:
+                collection.create_indexes(missing)
+            except OperationFailure as e:
+                print(f" Failed to build indexes on {collection_name}: {e}")
+                continue
+        summary["created"].extend(names)
+
+    for name in summary["created"]:
+        print(f" {'Missing' if dry_run else 'Created'} index {name}")
+    for name in summary["conflicts"]:
+        print(f" Index {name} exists with different options, left unchanged")
+
+    return summary
+
+
+def _winning_stages(plan: dict) -> List[str]:
+    stages = [plan.get("stage", "")]
+    if "inputStage" in plan:
+        stages.extend(_winning_stages(plan["inputStage"]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_winning_stages(child))
+    return stages
+
+
+def advise_query_shapes(db) -> List[dict]:
+    """
+    Run explain() on every registered query shape and flag collection scans
+    and in-memory sorts. Returns one report entry per shape.
+    """
+    report = []
+
+    for collection_name, query, sort, source in QUERY_SHAPES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+
+        try:
+            plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+            # Slot-based engine plans nest the classic plan under queryPlan
+            plan = plan.get("queryPlan", plan)
+        except OperationFailure as e:
+            report.append({"collection": collection_name, "source": source, "error": str(e)})
+            continue
+
+        stages = _winning_stages(plan)
+        report.append({
+            "collection": collection_name,
+            "source": source,
+            "stages": stages,
+            "collection_scan": "COLLSCAN" in stages,
+            "in_memory_sort": "SORT" in stages,
+        })
+
+    return report
@@ -6,7 +6,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 # Import authentication routers
 from routers.admin_auth import admin_auth_router, admin_router, auth_router
@@ -19,7 +19,19 @@ from routers.qa import router as qa_router
 from routers.company_info import router as company_info_router
 from routers.otp import router as otp_router
 from config import settings
+from database import setup_indexes
 from routers.meetings import router as meetings_router
+from services.cache_service import CacheService
+from services.password_hash_pool import password_hash_pool
+from services.access_log_buffer import access_log_buffer
+from services.async_cloudinary_service import cloudinary_client
+from services.upload_job_service import upload_jobs
+from services.token_denylist_service import TokenDenylistService
+from services.principal_service import PrincipalService
+from services.document_service import DocumentService
+from services.rendition_service import renditions
+from utils.metrics import registry as metrics_registry, RequestMetricsMiddleware
+from utils.structured_logging import shutdown_logging
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -34,8 +46,68 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Per-route latency and MongoDB command metrics, served at /metrics
+app.add_middleware(RequestMetricsMiddleware)
+
+
+def collect_runtime_gauges():
+    """Point-in-time gauges read at scrape time"""
+    samples = []
+    for key, value in password_hash_pool.stats().items():
+        samples.append(("dataroom_password_hash_pool", "Password hashing pool state", {"stat": key}, value))
+    for key, value in PrincipalService.cache_stats().items():
+        samples.append(("dataroom_principal_cache", "Principal cache state", {"stat": key}, value))
+    for key, value in DocumentService.cache_stats().items():
+        samples.append(("dataroom_document_cache", "Hot document metadata cache state", {"stat": key}, value))
+    for key, value in renditions.stats().items():
+        samples.append(("dataroom_rendition_cache", "Thumbnail/preview rendition cache state", {"stat": key}, value))
+    for key, value in access_log_buffer.stats().items():
+        samples.append(("dataroom_access_log_buffer", "Access log write-behind buffer state", {"stat": key}, value))
+    samples.append(("dataroom_cloudinary_breaker_open", "1 while the Cloudinary circuit breaker is open", {}, int(cloudinary_client.breaker.state == "open")))
+    samples.append(("dataroom_token_denylist_size", "Revoked tokens held in memory", {}, TokenDenylistService.stats()["size"]))
+    return samples
+
+
+metrics_registry.gauge_collector(collect_runtime_gauges)
+
+@app.on_event("startup")
+def start_cache_listener():
+    """Receive cache invalidations published by other workers"""
+    CacheService.start_listener()
+    TokenDenylistService.load()
+
+
+@app.on_event("startup")
+def reconcile_database_indexes():
+    """Build any registered index that is missing (existing ones are left alone)"""
+    if settings.RECONCILE_INDEXES_ON_STARTUP:
+        setup_indexes()
+
+
+@app.on_event("startup")
+async def start_background_workers():
+    access_log_buffer.start()
+    await upload_jobs.start()
+
+
+@app.on_event("shutdown")
+async def flush_access_log_buffer():
+    """Write buffered access logs and counters before the worker exits"""
+    await upload_jobs.stop()
+    await access_log_buffer.stop()
+    await cloudinary_client.aclose()
+
+
+@app.on_event("shutdown")
+def stop_cache_listener():
+    CacheService.stop_listener()
+    password_hash_pool.shutdown()
+    shutdown_logging()
+
+
 # Custom exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -87,7 +159,19 @@ def root():
 
 @app.get("/health")
 def health():
-    return {"status": "healthy", "version": "2.1.0"}
+    return {
+        "status": "healthy",
+        "version": "2.1.0",
+        "password_hash_pool": password_hash_pool.stats(),
+        "access_log_buffer": access_log_buffer.stats(),
+        "upload_jobs": upload_jobs.stats(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics for this worker"""
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
@@ -57,6 +57,7 @@ class DocumentResponse(BaseModel):
     tags: List[str]
     view_count: int = 0
     download_count: int = 0
+    thumbnail_url: Optional[str] = None
 
 class DocumentUpload(BaseModel):
     name: str
@@ -117,4 +118,34 @@ class DocumentStatsResponse(BaseModel):
     total_documents: int
     by_category: List[dict]
     total_views: int = 0
-    total_downloads: int = 0
\ No newline at end of file
+    total_downloads: int = 0
+
+# Direct-to-Cloudinary uploads
+class DirectUploadRequest(BaseModel):
+    filename: str
+    categories: List[str]
+    tags: List[str] = []
+    description: Optional[str] = None
+    file_size: Optional[int] = None
+
+class DirectUploadFinalize(BaseModel):
+    ticket: str
+    upload_result: dict
+
+# Version history
+class DocumentVersionResponse(BaseModel):
+    id: str
+    document_id: str
+    version_number: int
+    is_current: bool
+    file_url: str
+    download_url: Optional[str] = None
+    file_type: Optional[str] = None
+    file_size: int
+    mime_type: Optional[str] = None
+    original_filename: Optional[str] = None
+    content_sha256: Optional[str] = None
+    can_preview: bool = False
+    uploaded_by: str
+    upload_date: datetime
+    change_note: str = ""
@@ -3,6 +3,7 @@ from datetime import datetime
 from models.access_request import AccessRequestCreate, AccessRequestResponse
 from database import access_requests_collection, investors_collection
 from services.email_service import EmailService
+from services.principal_service import PrincipalService
 from bson import ObjectId
 import secrets
 
@@ -115,6 +116,7 @@ def approve_access_request(request_id: str, admin_notes: str = None):
                 }
             }
         )
+        PrincipalService.invalidate(str(existing_investor["_id"]))
         investor_id = existing_investor["investor_id"]
     else:
         # Create new investor record
@@ -17,13 +17,13 @@ from models.user import UserResponse
 # Services
 from services.admin_service import AdminService
 from services.auth_service import AuthService
+from services.principal_service import PrincipalService
 from services.otp_service import OTPService
 from services.email_service import EmailService
 
 # Database
 from database import (
-    admin_users_collection,
-    users_collection,
+    investors_collection,
     access_requests_collection,
     access_tokens_collection,
     audit_logs_collection
@@ -53,14 +53,17 @@ def get_current_admin(credentials: HTTPAuthorizationCredentials = Depends(securi
             detail="Invalid or expired token"
         )
     
-    admin = AdminService.get_admin_by_id(payload["sub"])
+    principal = PrincipalService.resolve(payload)
     
-    if not admin:
+    if not principal or principal["kind"] != "admin":
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Admin not found"
         )
     
+    admin = principal["document"]
+    admin["id"] = str(admin.pop("_id"))
+    
     if not admin.get("is_active", False):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -81,14 +84,16 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             detail="Invalid or expired token"
         )
     
-    user = users_collection.find_one({"_id": ObjectId(payload["sub"])})
+    principal = PrincipalService.resolve(payload)
     
-    if not user:
+    if not principal or principal["kind"] != "user":
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Regular user not found"
         )
     
+    user = principal["document"]
+    
     if not user.get("is_active", False):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -112,19 +117,17 @@ def get_current_user_or_admin(credentials: HTTPAuthorizationCredentials = Depend
             detail="Invalid or expired token"
         )
     
-    # Check if in admin collection
-    user = admin_users_collection.find_one({"_id": ObjectId(payload["sub"])})
-    
-    # Check if in user collection
-    if not user:
-        user = users_collection.find_one({"_id": ObjectId(payload["sub"])})
+    # Admins and regular users only - investor accounts are not accepted here
+    principal = PrincipalService.resolve(payload)
     
-    if not user:
+    if not principal or principal["kind"] not in ("admin", "user"):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found in system"
         )
     
+    user = principal["document"]
+    
     if not user.get("is_active", False):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -178,11 +181,11 @@ def register_user(admin: AdminCreate):
 
 
 @admin_auth_router.post("/login", response_model=TokenResponse)
-def login(credentials: AdminLogin):
+async def login(credentials: AdminLogin):
     """Login with username/email and password"""
     try:
-        # Authenticate user
-        user = AdminService.authenticate(credentials.username, credentials.password)
+        # Authenticate user (bcrypt runs on the dedicated hash pool)
+        user = await AdminService.authenticate_async(credentials.username, credentials.password)
         
         if not user:
             raise HTTPException(
@@ -195,7 +198,8 @@ def login(credentials: AdminLogin):
             "sub": user["id"],
             "email": user["email"],
             "role": user["role"],
-            "is_super_admin": user.get("is_super_admin", False)
+            "is_super_admin": user.get("is_super_admin", False),
+            "tv": user.get("token_version", 0)
         }
         
         access_token = AuthService.create_access_token(token_data)
@@ -440,6 +444,64 @@ def list_investors(
     return result
 
 
+@admin_router.post("/investors/{investor_id}/deactivate", response_model=dict)
+def deactivate_investor(
+    investor_id: str,
+    current_admin: dict = Depends(require_admin)
+):
+    """Deactivate an investor account (Admin only)"""
+    try:
+        obj_id = ObjectId(investor_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid investor ID"
+        )
+    
+    result = investors_collection.update_one(
+        {"_id": obj_id},
+        {"$set": {"is_active": False, "updated_at": datetime.utcnow()}}
+    )
+    PrincipalService.revoke_tokens(investor_id)
+    
+    if result.matched_count == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Investor not found"
+        )
+    
+    return {"message": "Investor deactivated successfully"}
+
+
+@admin_router.post("/investors/{investor_id}/activate", response_model=dict)
+def activate_investor(
+    investor_id: str,
+    current_admin: dict = Depends(require_admin)
+):
+    """Reactivate an investor account (Admin only)"""
+    try:
+        obj_id = ObjectId(investor_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid investor ID"
+        )
+    
+    result = investors_collection.update_one(
+        {"_id": obj_id},
+        {"$set": {"is_active": True, "updated_at": datetime.utcnow()}}
+    )
+    PrincipalService.invalidate(investor_id)
+    
+    if result.matched_count == 0:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Investor not found"
+        )
+    
+    return {"message": "Investor activated successfully"}
+
+
 # Access Request Management Routes
 
 
@@ -1,29 +1,40 @@
 import os
 import json
+import time
+import urllib.parse
 from typing import List, Optional
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Request, status
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, Query, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from bson import ObjectId
-from datetime import datetime
 
 from models.document import (
     DocumentCategoryCreate,
     DocumentCategoryResponse,
     DocumentUpload,
     DocumentResponse,
-    DocumentCategory
+    DocumentCategory,
+    DirectUploadRequest,
+    DirectUploadFinalize,
+    DocumentVersionResponse
 )
+from config import settings
 from services.document_service import DocumentService
+from services.upload_job_service import upload_jobs
+from services.direct_upload_service import DirectUploadService
+from services.document_version_service import DocumentVersionService
+from services.document_bundle_service import DocumentBundleService
 from services.permission_service import PermissionService
-from services.nda_service import NDAService
+from services.nda_service import NDAService, NDA_VERSION
 from services.auth_service import AuthService
-from database import (
-    document_categories_collection,
+from services.principal_service import PrincipalService
+from services.storage_backend import storage_backend_for
+from services.rendition_service import renditions, RENDITION_SPECS
+from utils.etag import conditional_get
+from utils.document_delivery import RENDERABLE_EXTENSIONS, thumbnail_url
+from async_database import (
     documents_collection,
-    document_access_logs_collection,
-    admin_users_collection,
-    users_collection
+    document_access_logs_collection
 )
 
 router = APIRouter(prefix="/api/documents", tags=["Documents"])
@@ -32,70 +43,20 @@ security = HTTPBearer()
 
 def get_current_user_from_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Extract user from JWT token - supports admin, regular users, and investors"""
-    from database import investors_collection
-    
     token = credentials.credentials
     payload = AuthService.verify_token(token)
     
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     
-    user_id = payload["sub"]
-    
-    # Check if it's an investor token first (most common case for this app)
-    if payload.get("is_investor"):
-        investor = investors_collection.find_one({"_id": ObjectId(user_id)})
-        if investor:
-            return {
-                "id": str(investor["_id"]),
-                "_id": investor["_id"],
-                "email": investor.get("email", ""),
-                "full_name": investor.get("full_name", ""),
-                "role": "investor",
-                "is_admin": False,
-                "is_active": investor.get("is_active", True)
-            }
-    
-    # Check if it's an admin user
-    admin_user = admin_users_collection.find_one({"_id": ObjectId(user_id)})
-    if admin_user:
-        return {
-            "id": str(admin_user["_id"]),
-            "_id": admin_user["_id"],
-            "email": admin_user["email"],
-            "full_name": admin_user["full_name"],
-            "role": admin_user.get("role", "admin"),
-            "is_admin": True,
-            "is_active": admin_user.get("is_active", True)
-        }
-    
-    # Then check regular users
-    regular_user = users_collection.find_one({"_id": ObjectId(user_id)})
-    if regular_user:
-        return {
-            "id": str(regular_user["_id"]),
-            "_id": regular_user["_id"],
-            "email": regular_user["email"],
-            "full_name": regular_user["full_name"],
-            "role": "user",
-            "is_admin": False,
-            "is_active": regular_user.get("is_active", True)
-        }
-    
-    # Finally check investors collection without the token flag
-    investor = investors_collection.find_one({"_id": ObjectId(user_id)})
-    if investor:
-        return {
-            "id": str(investor["_id"]),
-            "_id": investor["_id"],
-            "email": investor.get("email", ""),
-            "full_name": investor.get("full_name", ""),
-            "role": "investor",
-            "is_admin": False,
-            "is_active": investor.get("is_active", True)
-        }
-    
-    raise HTTPException(status_code=404, detail="User not found")
+    principal = PrincipalService.resolve(payload)
+    if not principal:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    user_data = PrincipalService.to_user_context(principal)
+    # Authorization snapshot taken at login (None for tokens issued without one)
+    user_data["authz"] = payload.get("authz")
+    return user_data
 
 get_current_user = get_current_user_from_token
 
@@ -104,6 +65,11 @@ def check_nda_acceptance(user_data: dict):
     if user_data.get("is_admin"):
         return
     
+    authz = user_data.get("authz")
+    if authz and authz.get("nda") == NDA_VERSION:
+        return
+    
+    # Not accepted at login time (or no snapshot): it may have been accepted since
     if not NDAService.has_accepted_nda(user_data["id"]):
         raise HTTPException(
             status_code=403, 
@@ -115,12 +81,46 @@ def check_access_validity(user_data: dict):
     if user_data.get("is_admin"):
         return
     
+    authz = user_data.get("authz")
+    if authz is not None:
+        if not user_data.get("is_active", True):
+            raise HTTPException(status_code=403, detail="Access has expired")
+        access_expires_at = authz.get("axp")
+        if access_expires_at is None or access_expires_at > time.time():
+            return
+    
+    # Expired per the snapshot, or no snapshot: the live check also deactivates the account
     if not PermissionService.check_access_expiry(user_data["id"]):
         raise HTTPException(
             status_code=403,
             detail="Access has expired"
         )
 
+def require_document_access(user_data: dict = Depends(get_current_user_from_token)):
+    """Require NDA acceptance and valid access (skip for admins)
+    
+    Tokens carrying an authz snapshot are checked in memory; revocation is
+    enforced by the token version check in PrincipalService.resolve. The
+    fallback database checks keep this a sync dependency (threadpool).
+    """
+    check_nda_acceptance(user_data)
+    check_access_validity(user_data)
+    return user_data
+
+def require_download_access(user_data: dict = Depends(require_document_access)):
+    """Require download permission on top of document access (skip for admins)"""
+    if user_data.get("is_admin"):
+        return user_data
+    
+    authz = user_data.get("authz")
+    can_download = authz.get("dl", False) if authz is not None else PermissionService.can_download(user_data["id"])
+    if not can_download:
+        raise HTTPException(
+            status_code=403,
+            detail="You do not have download permissions"
+        )
+    return user_data
+
 def require_admin(user_data: dict = Depends(get_current_user_from_token)):
     """Require admin role"""
     if not user_data.get("is_admin"):
@@ -131,34 +131,8 @@ def require_admin(user_data: dict = Depends(get_current_user_from_token)):
     return user_data
 
 
-# Document Categories Endpoints
-@router.get("/categories/list")
-async def get_categories_list():
-    """Get list of available document categories (enum values)"""
-    return {
-        "categories": [
-            {"value": cat.value, "label": cat.value} 
-            for cat in DocumentCategory
-        ]
-    }
-
-@router.post("/", response_model=DocumentResponse)
-async def upload_document(
-    file: UploadFile = File(...),
-    categories: str = Form(...),
-    description: Optional[str] = Form(None),
-    tags: str = Form("[]"),
-    current_user: dict = Depends(require_admin)
-):
-    """
-    Upload a document with multiple categories (Admin only)
-    
-    - **file**: The document file to upload
-    - **categories**: JSON array or comma-separated (e.g., ["Company Overview", "Financials"])
-    - **description**: Optional description
-    - **tags**: JSON array or comma-separated (e.g., ["Q4", "2024"])
-    """
-    # Parse categories - support both JSON and comma-separated
+def parse_categories(categories: str) -> List[str]:
+    """Parse and validate categories - support both JSON and comma-separated"""
     try:
         if categories.strip().startswith('['):
             categories_list = json.loads(categories)
@@ -192,8 +166,10 @@ async def upload_document(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Invalid category: '{cat}'. Valid: {', '.join(valid_categories)}"
             )
-    
-    # Parse tags
+    return categories_list
+
+def parse_tags(tags: Optional[str]) -> List[str]:
+    """Parse tags - JSON array or comma-separated (invalid JSON yields no tags)"""
     tags_list = []
     if tags and tags.strip():
         try:
@@ -206,16 +182,98 @@ async def upload_document(
                 tags_list = [str(tags_list)]
         except json.JSONDecodeError:
             tags_list = []
-    
-    # Validate file type
+    return tags_list
+
+def manifest_value(entry: dict, field: str, default: Optional[str], required: bool = True) -> str:
+    """A batch manifest's categories/tags as the string parse_categories/parse_tags expect"""
+    value = entry.get(field, default)
+    if value is None and not required:
+        return ""
+    if value is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At least one {field[:-1]} is required")
+    if isinstance(value, list):
+        if not all(isinstance(item, str) for item in value):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{field} must be a list of strings")
+        return json.dumps(value)
+    if not isinstance(value, str):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{field} must be a string or a list of strings")
+    return value
+
+def validate_file_type(filename: str):
+    """Reject file types that are not allowed in the data room"""
     allowed_types = [".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".txt", ".csv", ".zip"]
-    file_extension = os.path.splitext(file.filename)[1].lower()
+    allowed_types += RENDERABLE_EXTENSIONS
+    file_extension = os.path.splitext(filename or "")[1].lower()
     if file_extension not in allowed_types:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"File type {file_extension} not allowed"
         )
 
+
+def is_initial_range(range_header: Optional[str]) -> bool:
+    """True for a full download or a range request starting at byte 0"""
+    if not range_header:
+        return True
+    return range_header.replace(" ", "").lower().startswith("bytes=0-")
+
+def local_file_response(document: dict):
+    """Serve a locally stored document
+    
+    With LOCAL_STORAGE_ACCEL_REDIRECT_PREFIX set, nginx serves the file
+    (sendfile, ranges) from an internal location mapped to the storage
+    root. Otherwise FileResponse streams it, handling Range/If-Range and
+    using zero-copy pathsend when the ASGI server supports it.
+    """
+    storage_key = document["storage_key"]
+    path = storage_backend_for(document).local_path(storage_key)
+    filename = document.get("download_filename") or document.get("original_filename") or os.path.basename(path)
+    media_type = document.get("mime_type") or "application/octet-stream"
+    
+    if settings.LOCAL_STORAGE_ACCEL_REDIRECT_PREFIX:
+        prefix = settings.LOCAL_STORAGE_ACCEL_REDIRECT_PREFIX.rstrip("/")
+        return Response(headers={
+            "X-Accel-Redirect": f"{prefix}/{urllib.parse.quote(storage_key)}",
+            "Content-Type": media_type,
+            "Content-Disposition": f"attachment; filename*=utf-8''{urllib.parse.quote(filename)}",
+        })
+    
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Document file not found")
+    return FileResponse(path, media_type=media_type, filename=filename)
+
+
+# Document Categories Endpoints
+@router.get("/categories/list", dependencies=[Depends(conditional_get("document_categories"))])
+async def get_categories_list():
+    """Get list of available document categories (enum values)"""
+    return {
+        "categories": [
+            {"value": cat.value, "label": cat.value} 
+            for cat in DocumentCategory
+        ]
+    }
+
+@router.post("/", response_model=DocumentResponse)
+async def upload_document(
+    file: UploadFile = File(...),
+    categories: str = Form(...),
+    description: Optional[str] = Form(None),
+    tags: str = Form("[]"),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Upload a document with multiple categories (Admin only)
+    
+    - **file**: The document file to upload
+    - **categories**: JSON array or comma-separated (e.g., ["Company Overview", "Financials"])
+    - **description**: Optional description
+    - **tags**: JSON array or comma-separated (e.g., ["Q4", "2024"])
+    """
+    categories_list = parse_categories(categories)
+    tags_list = parse_tags(tags)
+    validate_file_type(file.filename)
+
     # Upload using the service
     result = await DocumentService.upload_document(
         file=file,
@@ -227,27 +285,153 @@ async def upload_document(
     
     return result
 
+@router.post("/batch")
+async def upload_documents_batch(
+    files: List[UploadFile] = File(...),
+    manifest: Optional[str] = Form(None),
+    categories: Optional[str] = Form(None),
+    tags: str = Form("[]"),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Upload many documents in one request (Admin only)
+    
+    - **files**: The files to upload
+    - **manifest**: Optional JSON array, one entry per file in the same order:
+      {"categories": [...], "tags": [...], "description": "..."}
+    - **categories** / **tags**: Defaults for files without their own manifest values
+    
+    Files are transferred concurrently and recorded with a single insert.
+    The response lists a result per file; failures do not abort the batch.
+    """
+    if len(files) > settings.UPLOAD_BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.UPLOAD_BATCH_MAX_FILES} files per batch"
+        )
+    
+    entries = []
+    if manifest:
+        try:
+            entries = json.loads(manifest)
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid manifest: {str(e)}")
+        if not isinstance(entries, list):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Manifest must be a JSON array")
+    
+    items = []
+    for index, file in enumerate(files):
+        entry = entries[index] if index < len(entries) and entries[index] is not None else {}
+        item = {"file": file, "description": ""}
+        try:
+            validate_file_type(file.filename)
+            if not isinstance(entry, dict):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Manifest entries must be JSON objects")
+            item["categories"] = parse_categories(manifest_value(entry, "categories", categories))
+            item["tags"] = parse_tags(manifest_value(entry, "tags", tags, required=False))
+            description = entry.get("description") or ""
+            if not isinstance(description, str):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="description must be a string")
+            item["description"] = description
+        except HTTPException as e:
+            item["error"] = e.detail
+        items.append(item)
+    
+    results = await DocumentService.upload_documents_batch(items, user_id=str(current_user["_id"]))
+    return {
+        "uploaded": sum(1 for result in results if result["success"]),
+        "failed": sum(1 for result in results if not result["success"]),
+        "results": results
+    }
+
+@router.post("/direct-uploads")
+def create_direct_upload(upload: DirectUploadRequest, current_user: dict = Depends(require_admin)):
+    """
+    Issue a short-lived signature for uploading straight to Cloudinary (Admin only)
+    
+    POST the file with the returned params to upload_url, then send
+    Cloudinary's response with the ticket to /direct-uploads/finalize.
+    """
+    validate_file_type(upload.filename)
+    categories_list = parse_categories(json.dumps(upload.categories))
+    
+    return DirectUploadService.create_upload(
+        filename=upload.filename,
+        categories=categories_list,
+        user_id=str(current_user["_id"]),
+        tags=upload.tags,
+        description=upload.description,
+        file_size=upload.file_size
+    )
+
+@router.post("/direct-uploads/finalize", response_model=DocumentResponse)
+async def finalize_direct_upload(upload: DirectUploadFinalize, current_user: dict = Depends(require_admin)):
+    """Record a document uploaded directly to Cloudinary (Admin only)"""
+    return await DirectUploadService.finalize(
+        ticket=upload.ticket,
+        upload_result=upload.upload_result,
+        user_id=str(current_user["_id"])
+    )
+
+@router.post("/uploads", status_code=status.HTTP_202_ACCEPTED)
+async def upload_document_in_background(
+    file: UploadFile = File(...),
+    categories: str = Form(...),
+    description: Optional[str] = Form(None),
+    tags: str = Form("[]"),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Queue a document upload and return a job id immediately (Admin only)
+    
+    Takes the same fields as POST /api/documents/. Poll
+    GET /api/documents/uploads/{job_id} for progress and the new document id.
+    """
+    categories_list = parse_categories(categories)
+    tags_list = parse_tags(tags)
+    validate_file_type(file.filename)
+
+    return await upload_jobs.submit(
+        file=file,
+        categories=categories_list,
+        user_id=str(current_user["_id"]),
+        description=description or "",
+        tags=tags_list
+    )
+
+@router.get("/uploads/{job_id}")
+async def get_upload_job(job_id: str, current_user: dict = Depends(require_admin)):
+    """Report the status and progress of a background upload (Admin only)"""
+    job = await upload_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return job
+
 
 # Document Listing & Search
 
 @router.get("/", response_model=List[DocumentResponse])
 async def list_documents(
+    response: Response,
     categories: Optional[str] = None,
     tags: Optional[str] = None,
     search: Optional[str] = None,
-    current_user: dict = Depends(get_current_user)
+    limit: Optional[int] = Query(None, ge=1, le=settings.DOCUMENT_LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(require_document_access),
+    _etag: None = Depends(conditional_get("documents"))
 ):
     """
-    List all documents with optional filters
+    List documents with optional filters, newest first
     
     - **categories**: Comma-separated (e.g., "Financials,Legal")
     - **tags**: Comma-separated
-    - **search**: Search in title and description
-    """
-    if not current_user.get("is_admin"):
-        check_nda_acceptance(current_user)
-        check_access_validity(current_user)
+    - **search**: Full-text search over title, description and tags (ranked by relevance)
+    - **limit**: Page size
+    - **cursor**: Value of the X-Next-Cursor header from the previous page
     
+    Without limit or cursor every matching document is returned.
+    """
     categories_list = None
     if categories:
         categories_list = [cat.strip() for cat in categories.split(",") if cat.strip()]
@@ -256,24 +440,31 @@ async def list_documents(
     if tags:
         tags_list = [tag.strip() for tag in tags.split(",") if tag.strip()]
     
-    documents = DocumentService.list_documents(
+    documents, next_cursor = await DocumentService.list_documents(
         categories=categories_list,
         tags=tags_list,
-        search=search
+        search=search,
+        limit=limit,
+        cursor=cursor
     )
     
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    
     return documents
 
 @router.get("/by-category/{category}")
 async def get_documents_by_category(
     category: str,
-    current_user: dict = Depends(get_current_user)
+    limit: Optional[int] = Query(None, ge=1, le=settings.DOCUMENT_LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(require_document_access)
 ):
-    """Get all documents in a specific category by name"""
-    if not current_user.get("is_admin"):
-        check_nda_acceptance(current_user)
-        check_access_validity(current_user)
+    """Get documents in a specific category by name
     
+    Pass limit (and then next_cursor) to page through it; without either
+    every document in the category is returned.
+    """
     # Validate category
     valid_categories = [cat.value for cat in DocumentCategory]
     if category not in valid_categories:
@@ -282,28 +473,97 @@ async def get_documents_by_category(
             detail=f"Invalid category. Valid: {', '.join(valid_categories)}"
         )
     
-    documents = DocumentService.list_documents(categories=[category])
+    documents, next_cursor = await DocumentService.list_documents(
+        categories=[category],
+        limit=limit,
+        cursor=cursor
+    )
     
     return {
         "category": category,
         "count": len(documents),
-        "documents": documents
+        "documents": documents,
+        "next_cursor": next_cursor
     }
 
 
+@router.get("/search")
+async def search_documents(
+    q: str = Query(..., min_length=1),
+    categories: Optional[str] = None,
+    tags: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.DOCUMENT_LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(require_document_access)
+):
+    """
+    Full-text document search with per-category and per-tag counts
+    
+    Results are ranked by relevance. The first page (no cursor) also
+    includes the total number of matches and the facet counts.
+    """
+    categories_list = [cat.strip() for cat in categories.split(",") if cat.strip()] if categories else None
+    tags_list = [tag.strip() for tag in tags.split(",") if tag.strip()] if tags else None
+    
+    return await DocumentService.search_documents(
+        q,
+        categories=categories_list,
+        tags=tags_list,
+        limit=limit,
+        cursor=cursor
+    )
+
+
+@router.get("/bundle")
+async def download_bundle(
+    request: Request,
+    category: Optional[str] = None,
+    ids: Optional[str] = None,
+    user_data: dict = Depends(require_download_access)
+):
+    """
+    Download several documents as one ZIP, streamed as it is built
+    
+    - **category**: every document in a category (e.g. Financials)
+    - **ids**: or a comma-separated selection of document ids
+    
+    Download permission is checked once for the whole bundle; each file
+    delivered is logged as a download, in one batch.
+    """
+    if category:
+        valid_categories = [cat.value for cat in DocumentCategory]
+        if category not in valid_categories:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid category. Valid: {', '.join(valid_categories)}"
+            )
+    document_ids = [document_id.strip() for document_id in ids.split(",") if document_id.strip()] if ids else None
+    
+    documents = await DocumentBundleService.select_documents(category=category, document_ids=document_ids)
+    on_complete = DocumentBundleService.access_logger(
+        user_data,
+        ip_address=request.client.host if request.client else None,
+        user_agent=request.headers.get("user-agent", "")
+    )
+    
+    filename = f"{category or 'documents'}.zip"
+    return StreamingResponse(
+        DocumentBundleService.stream_bundle(documents, on_complete=on_complete),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename*=utf-8''{urllib.parse.quote(filename)}"}
+    )
+
+
 # Document Retrieval
 
 @router.get("/{document_id}", response_model=DocumentResponse)
 async def get_document(
     document_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_document_access),
+    _etag: None = Depends(conditional_get("documents"))
 ):
     """Get a specific document by ID"""
-    if not current_user.get("is_admin"):
-        check_nda_acceptance(current_user)
-        check_access_validity(current_user)
-    
-    document = DocumentService.get_document_by_id(document_id)
+    document = await DocumentService.get_document_by_id(document_id)
     
     if not document:
         raise HTTPException(
@@ -317,84 +577,10 @@ async def get_document(
 async def get_document_url(
     document_id: str,
     request: Request,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(require_document_access)
 ):
     """Get document URL with metadata for preview/download"""
-    if not current_user.get("is_admin"):
-        check_nda_acceptance(current_user)
-        check_access_validity(current_user)
-    
-    document = documents_collection.find_one({"_id": ObjectId(document_id)})
-    
-    if not document:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Document not found"
-        )
-    
-    file_url = document.get("file_url") or document.get("file_path")
-    file_type = document.get("file_type", "").lower()
-    file_extension = document.get("file_extension", "").lower()
-    mime_type = document.get("mime_type", "application/octet-stream")
-    original_filename = document.get("original_filename", "")
-    title = document.get("title", "document")
-    
-    # Detect file extension from title if not already set
-    # This handles old documents where file_type is "raw"
-    detected_extension = ""
-    title_lower = title.lower()
-    for ext in ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.txt', '.csv', '.zip', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.svg']:
-        if title_lower.endswith(ext):
-            detected_extension = ext
-            break
-    
-    # Use detected extension if file_extension is empty or "raw"
-    if not file_extension or file_extension in ["raw", "image"]:
-        file_extension = detected_extension
-    
-    # Ensure file_extension starts with a dot
-    if file_extension and not file_extension.startswith('.'):
-        file_extension = '.' + file_extension
-    
-    # Set original_filename from title if not set
-    if not original_filename:
-        original_filename = title
-    
-    # Ensure filename has extension
-    if original_filename and file_extension and not original_filename.lower().endswith(file_extension):
-        original_filename = original_filename + file_extension
-    
-    # Create download filename
-    download_filename = original_filename if original_filename else title
-    if download_filename and file_extension and not download_filename.lower().endswith(file_extension):
-        download_filename = download_filename + file_extension
-    
-    # Determine if file can be previewed in browser
-    previewable_extensions = [".pdf", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg"]
-    can_preview = file_extension in previewable_extensions or detected_extension in previewable_extensions
-    
-    # Also check if title ends with previewable extension (fallback)
-    if not can_preview:
-        can_preview = any(title_lower.endswith(ext) for ext in previewable_extensions)
-    
-    # Create download URL with attachment flag for Cloudinary
-    download_url = file_url
-    if file_url and "cloudinary" in file_url:
-        import urllib.parse
-        
-        # For Cloudinary, fl_attachment should go right after /upload/ and before version
-        # Correct format: /upload/fl_attachment:filename/v123456/path
-        safe_filename = download_filename.replace(' ', '_')
-        # Keep dots, hyphens, underscores - they're safe for Cloudinary
-        encoded_filename = urllib.parse.quote(safe_filename, safe='.-_')
-        
-        # Handle different Cloudinary URL patterns
-        if "/raw/upload/" in file_url:
-            download_url = file_url.replace("/raw/upload/", f"/raw/upload/fl_attachment:{encoded_filename}/")
-        elif "/image/upload/" in file_url:
-            download_url = file_url.replace("/image/upload/", f"/image/upload/fl_attachment:{encoded_filename}/")
-        elif "/upload/" in file_url:
-            download_url = file_url.replace("/upload/", f"/upload/fl_attachment:{encoded_filename}/")
+    document = await DocumentService.get_delivery_info(document_id)
     
     # Log document view (only for non-admins to track investor activity)
     if not current_user.get("is_admin"):
@@ -403,40 +589,65 @@ async def get_document_url(
             user_id=current_user["id"],
             action="view",
             ip_address=request.client.host if request.client else None,
-            user_agent=request.headers.get("user-agent", "")
+            user_agent=request.headers.get("user-agent", ""),
+            user_email=current_user.get("email") or current_user.get("full_name")
         )
     
     return {
-        "url": file_url,
-        "download_url": download_url,
+        "url": document.get("file_url") or document.get("file_path"),
+        "download_url": document["download_url"],
         "document_id": document_id,
-        "file_type": file_type,
-        "file_extension": file_extension,
-        "mime_type": mime_type,
-        "original_filename": original_filename,
-        "download_filename": download_filename,
-        "can_preview": can_preview,
-        "title": title
+        "file_type": (document.get("file_type") or "").lower(),
+        "file_extension": document["file_extension"],
+        "mime_type": document.get("mime_type", "application/octet-stream"),
+        "original_filename": document["download_filename"],
+        "download_filename": document["download_filename"],
+        "can_preview": document["can_preview"],
+        "thumbnail_url": thumbnail_url({**document, "id": document_id}),
+        "title": document.get("title", "document")
     }
 
+@router.get("/{document_id}/thumbnail")
+async def get_document_thumbnail(
+    document_id: str,
+    request: Request,
+    size: str = Query("thumbnail", pattern=f"^({'|'.join(RENDITION_SPECS)})$"),
+    current_user: dict = Depends(require_document_access)
+):
+    """
+    Get a resized WebP rendition of an image document
+    
+    - **size**: "thumbnail" for listings, "preview" for the viewer
+    
+    Renditions are content-addressed, so their ETag never goes stale and
+    browsers revalidate with a 304.
+    """
+    document = await DocumentService.get_document_by_id(document_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if not renditions.can_render(document):
+        raise HTTPException(status_code=404, detail="No preview image for this document")
+    
+    etag = f'"{renditions.rendition_name(document, size)}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    path = await renditions.get(document, size)
+    return FileResponse(path, media_type="image/webp", headers=headers)
+
 @router.get("/{document_id}/download")
 async def download_document(
     document_id: str,
     request: Request,
-    user_data: dict = Depends(get_current_user)
+    user_data: dict = Depends(require_download_access)
 ):
-    """Download a document"""
-    if not user_data.get("is_admin"):
-        check_nda_acceptance(user_data)
-        check_access_validity(user_data)
-        
-        if not PermissionService.can_download(user_data["id"]):
-            raise HTTPException(
-                status_code=403,
-                detail="You do not have download permissions"
-            )
+    """Download a document
     
-    document = documents_collection.find_one({"_id": ObjectId(document_id)})
+    Locally stored documents are served directly with Range/If-Range
+    support, so PDF viewers can fetch just the pages they need.
+    """
+    document = await documents_collection.find_one({"_id": ObjectId(document_id)})
     
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
@@ -444,19 +655,92 @@ async def download_document(
     # For Cloudinary URLs, redirect to the URL
     file_url = document.get("file_url") or document.get("file_path")
     
-    # Log access
-    DocumentService.log_document_access(
-        document_id=document_id,
-        user_id=user_data["id"],
-        action="download",
-        ip_address=request.client.host,
-        user_agent=request.headers.get("user-agent", "")
-    )
+    # Log access once per download, not for every follow-up range request
+    if is_initial_range(request.headers.get("range")):
+        DocumentService.log_document_access(
+            document_id=document_id,
+            user_id=user_data["id"],
+            action="download",
+            ip_address=request.client.host if request.client else None,
+            user_agent=request.headers.get("user-agent", ""),
+            user_email=user_data.get("email") or user_data.get("full_name")
+        )
+    
+    if document.get("storage_backend") == "local":
+        return local_file_response(document)
     
     # Redirect to Cloudinary URL
     from fastapi.responses import RedirectResponse
     return RedirectResponse(url=file_url)
 
+
+# Version History
+
+@router.post("/{document_id}/versions", response_model=DocumentVersionResponse)
+async def upload_document_version(
+    document_id: str,
+    file: UploadFile = File(...),
+    change_note: Optional[str] = Form(None),
+    current_user: dict = Depends(require_admin)
+):
+    """
+    Upload a new file for an existing document (Admin only)
+    
+    The document keeps its id, metadata, counters and access logs; the
+    previous file stays available in its version history.
+    """
+    validate_file_type(file.filename)
+    
+    return await DocumentVersionService.upload_new_version(
+        document_id=document_id,
+        file=file,
+        user_id=str(current_user["_id"]),
+        change_note=change_note
+    )
+
+@router.get("/{document_id}/versions", response_model=List[DocumentVersionResponse])
+async def list_document_versions(
+    document_id: str,
+    current_user: dict = Depends(require_document_access)
+):
+    """List a document's versions, newest first"""
+    return await DocumentVersionService.list_versions(document_id)
+
+@router.get("/{document_id}/versions/{version_number}", response_model=DocumentVersionResponse)
+async def get_document_version(
+    document_id: str,
+    version_number: int,
+    current_user: dict = Depends(require_document_access)
+):
+    """Get one version of a document"""
+    return await DocumentVersionService.get_version(document_id, version_number)
+
+@router.get("/{document_id}/versions/{version_number}/download")
+async def download_document_version(
+    document_id: str,
+    version_number: int,
+    request: Request,
+    user_data: dict = Depends(require_download_access)
+):
+    """Download a specific version of a document"""
+    version = await DocumentVersionService.get_version(document_id, version_number)
+    
+    if is_initial_range(request.headers.get("range")):
+        DocumentService.log_document_access(
+            document_id=document_id,
+            user_id=user_data["id"],
+            action="download",
+            ip_address=request.client.host if request.client else None,
+            user_agent=request.headers.get("user-agent", ""),
+            user_email=user_data.get("email") or user_data.get("full_name")
+        )
+    
+    if version.get("storage_backend") == "local":
+        return local_file_response(version)
+    
+    from fastapi.responses import RedirectResponse
+    return RedirectResponse(url=version["file_url"])
+
 # Document Management
 
 
@@ -466,7 +750,7 @@ async def delete_document(
     current_user: dict = Depends(require_admin)
 ):
     """Delete a document (Admin only)"""
-    result = DocumentService.delete_document(document_id)
+    result = await DocumentService.delete_document(document_id)
     
     if not result:
         raise HTTPException(
@@ -486,11 +770,6 @@ async def update_document(
     user_data: dict = Depends(require_admin)
 ):
     """Update document metadata (Admin only)"""
-    document = documents_collection.find_one({"_id": ObjectId(document_id)})
-    
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
-    
     update_data = {}
     
     if title:
@@ -529,11 +808,7 @@ async def update_document(
             pass
     
     if update_data:
-        update_data["updated_at"] = datetime.utcnow()
-        documents_collection.update_one(
-            {"_id": ObjectId(document_id)},
-            {"$set": update_data}
-        )
+        await DocumentService.update_document(document_id, update_data)
         return {"message": "Document updated successfully"}
     
     raise HTTPException(status_code=400, detail="No updates provided")
@@ -547,19 +822,27 @@ async def get_category_stats(
     current_user: dict = Depends(require_admin)
 ):
     """Get document count statistics by category (Admin only)"""
-    stats = DocumentService.get_category_stats()
+    stats = await DocumentService.get_category_stats()
     return stats
 
+@router.get("/stats/cache")
+def get_cache_stats(current_user: dict = Depends(require_admin)):
+    """Hot document cache state and its most requested documents (Admin only)"""
+    return {
+        "document_cache": DocumentService.cache_stats(),
+        "hot_documents": DocumentService.cache_key_stats(),
+    }
+
 @router.get("/{document_id}/access-logs")
-def get_document_access_logs(
+async def get_document_access_logs(
     document_id: str,
     limit: int = 50,
     user_data: dict = Depends(require_admin)
 ):
     """Get access logs for a document (Admin only)"""
-    logs = list(document_access_logs_collection.find({
+    logs = await document_access_logs_collection.find({
         "document_id": document_id
-    }).sort("accessed_at", -1).limit(limit))
+    }).sort("accessed_at", -1).limit(limit).to_list(length=None)
     
     for log in logs:
         log["id"] = str(log.pop("_id"))
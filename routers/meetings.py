@@ -3,7 +3,8 @@ from typing import List, Optional
 from datetime import datetime, timedelta, timezone
 from models.meeting import MeetingCreate, MeetingResponse
 from services.email_service import EmailService
-from database import meetings_collection, investors_collection, admin_users_collection, access_requests_collection
+from fastapi.concurrency import run_in_threadpool
+from async_database import meetings_collection, investors_collection, admin_users_collection, access_requests_collection
 from routers.admin_auth import get_current_user_or_admin, get_current_admin
 from bson import ObjectId
 import secrets
@@ -62,19 +63,19 @@ async def schedule_meeting(
         investor = None
         
         # Try by investor_id field first (e.g., "INV-20250112-A7B3C9")
-        investor = investors_collection.find_one({"investor_id": investor_id})
+        investor = await investors_collection.find_one({"investor_id": investor_id})
         
         # Try by MongoDB _id
         if not investor:
             try:
-                investor = investors_collection.find_one({"_id": ObjectId(investor_id)})
+                investor = await investors_collection.find_one({"_id": ObjectId(investor_id)})
             except:
                 pass
         
         # Try in access_requests collection (approved requests)
         if not investor:
             try:
-                investor = access_requests_collection.find_one({
+                investor = await access_requests_collection.find_one({
                     "_id": ObjectId(investor_id),
                     "status": "approved"
                 })
@@ -84,7 +85,7 @@ async def schedule_meeting(
         # Fallback to admin users
         if not investor:
             try:
-                investor = admin_users_collection.find_one({"_id": ObjectId(investor_id)})
+                investor = await admin_users_collection.find_one({"_id": ObjectId(investor_id)})
             except:
                 pass
         
@@ -105,7 +106,7 @@ async def schedule_meeting(
             )
         
         # Check if time slot is available
-        existing_meeting = meetings_collection.find_one({
+        existing_meeting = await meetings_collection.find_one({
             "scheduled_at": scheduled_at,
             "status": {"$ne": "cancelled"}
         })
@@ -135,11 +136,12 @@ async def schedule_meeting(
         }
         
         # Insert into database
-        result = meetings_collection.insert_one(meeting_data)
+        result = await meetings_collection.insert_one(meeting_data)
         
         # Send confirmation emails
         try:
-            EmailService.send_meeting_confirmation_to_investor(
+            await run_in_threadpool(
+                EmailService.send_meeting_confirmation_to_investor,
                 investor.get("email"),
                 investor.get("full_name", "Investor"),
                 scheduled_at,
@@ -147,7 +149,8 @@ async def schedule_meeting(
                 meeting_link
             )
             
-            EmailService.send_meeting_notification_to_admin(
+            await run_in_threadpool(
+                EmailService.send_meeting_notification_to_admin,
                 investor.get("full_name", "Unknown"),
                 investor.get("email", ""),
                 scheduled_at,
@@ -193,7 +196,7 @@ async def list_meetings(
         if investor_id:
             query["investor_id"] = investor_id
         
-        meetings = list(meetings_collection.find(query).sort("scheduled_at", -1))
+        meetings = await meetings_collection.find(query).sort("scheduled_at", -1).to_list(length=None)
         
         # Convert ObjectId to string
         for meeting in meetings:
@@ -222,9 +225,9 @@ async def get_my_meetings(
     try:
         user_id = str(current_user.get("_id", current_user.get("id")))
         
-        meetings = list(meetings_collection.find({
+        meetings = await meetings_collection.find({
             "investor_id": user_id
-        }).sort("scheduled_at", -1))
+        }).sort("scheduled_at", -1).to_list(length=None)
         
         for meeting in meetings:
             meeting["id"] = str(meeting.pop("_id"))
@@ -249,10 +252,10 @@ async def get_upcoming_meetings(
     try:
         now = get_utc_now()
         
-        meetings = list(meetings_collection.find({
+        meetings = await meetings_collection.find({
             "scheduled_at": {"$gte": now},
             "status": "scheduled"
-        }).sort("scheduled_at", 1))
+        }).sort("scheduled_at", 1).to_list(length=None)
         
         for meeting in meetings:
             meeting["id"] = str(meeting.pop("_id"))
@@ -306,14 +309,19 @@ async def get_available_slots(
         current_slot = target_date.replace(hour=start_hour, minute=0, second=0)
         end_time = target_date.replace(hour=end_hour, minute=0, second=0)
         
+        # Fetch the day's bookings in one query instead of one per slot
+        booked = await meetings_collection.find(
+            {
+                "scheduled_at": {"$gte": current_slot, "$lt": end_time},
+                "status": {"$ne": "cancelled"}
+            },
+            {"scheduled_at": 1}
+        ).to_list(length=None)
+        booked_slots = {make_timezone_aware(m["scheduled_at"]) for m in booked}
+        
         while current_slot < end_time:
             # Check if slot is available
-            existing = meetings_collection.find_one({
-                "scheduled_at": current_slot,
-                "status": {"$ne": "cancelled"}
-            })
-            
-            if not existing:
+            if current_slot not in booked_slots:
                 available_slots.append({
                     "datetime": current_slot.isoformat(),
                     "time": current_slot.strftime("%I:%M %p"),
@@ -346,7 +354,7 @@ async def get_meeting(
 ):
     """Get specific meeting details"""
     try:
-        meeting = meetings_collection.find_one({"_id": ObjectId(meeting_id)})
+        meeting = await meetings_collection.find_one({"_id": ObjectId(meeting_id)})
         
         if not meeting:
             raise HTTPException(
@@ -393,7 +401,7 @@ async def reschedule_meeting(
 ):
     """Reschedule a meeting"""
     try:
-        meeting = meetings_collection.find_one({"_id": ObjectId(meeting_id)})
+        meeting = await meetings_collection.find_one({"_id": ObjectId(meeting_id)})
         
         if not meeting:
             raise HTTPException(
@@ -412,7 +420,7 @@ async def reschedule_meeting(
             )
         
         # Check if new time slot is available
-        existing = meetings_collection.find_one({
+        existing = await meetings_collection.find_one({
             "scheduled_at": new_scheduled_at,
             "status": {"$ne": "cancelled"},
             "_id": {"$ne": ObjectId(meeting_id)}
@@ -427,7 +435,7 @@ async def reschedule_meeting(
         old_time = make_timezone_aware(meeting["scheduled_at"])
         
         # Update meeting
-        meetings_collection.update_one(
+        await meetings_collection.update_one(
             {"_id": ObjectId(meeting_id)},
             {
                 "$set": {
@@ -439,7 +447,8 @@ async def reschedule_meeting(
         
         # Send notification emails
         try:
-            EmailService.send_meeting_rescheduled_email(
+            await run_in_threadpool(
+                EmailService.send_meeting_rescheduled_email,
                 meeting["investor_email"],
                 meeting["investor_name"],
                 old_time,
@@ -473,7 +482,7 @@ async def cancel_meeting(
 ):
     """Cancel a meeting"""
     try:
-        meeting = meetings_collection.find_one({"_id": ObjectId(meeting_id)})
+        meeting = await meetings_collection.find_one({"_id": ObjectId(meeting_id)})
         
         if not meeting:
             raise HTTPException(
@@ -488,7 +497,7 @@ async def cancel_meeting(
             )
         
         # Update meeting status
-        meetings_collection.update_one(
+        await meetings_collection.update_one(
             {"_id": ObjectId(meeting_id)},
             {
                 "$set": {
@@ -503,7 +512,8 @@ async def cancel_meeting(
         # Send cancellation email
         try:
             scheduled_at = make_timezone_aware(meeting["scheduled_at"])
-            EmailService.send_meeting_cancelled_email(
+            await run_in_threadpool(
+                EmailService.send_meeting_cancelled_email,
                 meeting["investor_email"],
                 meeting["investor_name"],
                 scheduled_at,
@@ -535,7 +545,7 @@ async def mark_meeting_completed(
 ):
     """Mark a meeting as completed (Admin only)"""
     try:
-        meeting = meetings_collection.find_one({"_id": ObjectId(meeting_id)})
+        meeting = await meetings_collection.find_one({"_id": ObjectId(meeting_id)})
         
         if not meeting:
             raise HTTPException(
@@ -543,7 +553,7 @@ async def mark_meeting_completed(
                 detail="Meeting not found"
             )
         
-        meetings_collection.update_one(
+        await meetings_collection.update_one(
             {"_id": ObjectId(meeting_id)},
             {
                 "$set": {
@@ -577,7 +587,7 @@ async def delete_meeting(
 ):
     """Delete a meeting (Admin only)"""
     try:
-        result = meetings_collection.delete_one({"_id": ObjectId(meeting_id)})
+        result = await meetings_collection.delete_one({"_id": ObjectId(meeting_id)})
         
         if result.deleted_count == 0:
             raise HTTPException(
@@ -640,14 +650,14 @@ async def brevo_meeting_webhook(payload: dict):
                 "updated_at": get_utc_now()
             }
             
-            meetings_collection.insert_one(meeting_record)
+            await meetings_collection.insert_one(meeting_record)
             print(f"Created meeting from Brevo: {meeting_record['investor_email']}")
             
         elif event_type == "meeting_cancelled":
             # Update meeting status if we have it
             brevo_id = meeting_data.get("meeting_id")
             if brevo_id:
-                meetings_collection.update_one(
+                await meetings_collection.update_one(
                     {"brevo_meeting_id": brevo_id},
                     {
                         "$set": {
@@ -664,7 +674,7 @@ async def brevo_meeting_webhook(payload: dict):
             # Log that meeting started
             brevo_id = meeting_data.get("meeting_id")
             if brevo_id:
-                meetings_collection.update_one(
+                await meetings_collection.update_one(
                     {"brevo_meeting_id": brevo_id},
                     {
                         "$set": {
@@ -1,8 +1,12 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks
-from database import access_requests_collection, users_collection, investors_collection
+from fastapi.concurrency import run_in_threadpool
+from async_database import access_requests_collection, users_collection, investors_collection
 from services.email_service import EmailService
 from services.auth_service import AuthService
+from services.principal_service import PrincipalService
+from services.permission_service import PermissionService
 from datetime import datetime, timedelta
+from typing import Optional
 import random
 import string
 from pydantic import BaseModel, EmailStr
@@ -31,7 +35,7 @@ async def request_otp(request: OTPRequest, background_tasks: BackgroundTasks):
         print(f"OTP requested for {email} - Purpose: {purpose}")
         
         if purpose == "access_request":
-            access_request = access_requests_collection.find_one({"email": email})
+            access_request = await access_requests_collection.find_one({"email": email})
             
             if not access_request:
                 raise HTTPException(
@@ -49,7 +53,7 @@ async def request_otp(request: OTPRequest, background_tasks: BackgroundTasks):
             otp = generate_otp()
             otp_expiry = datetime.utcnow() + timedelta(minutes=10)
             
-            access_requests_collection.update_one(
+            await access_requests_collection.update_one(
                 {"_id": access_request["_id"]},
                 {
                     "$set": {
@@ -65,15 +69,15 @@ async def request_otp(request: OTPRequest, background_tasks: BackgroundTasks):
             
         elif purpose == "login":
             # First check investors_collection (where approved access requests create records)
-            user = investors_collection.find_one({"email": email, "is_active": True})
+            user = await investors_collection.find_one({"email": email, "is_active": True})
             
             # If not found in investors, check users_collection as fallback
             if not user:
-                user = users_collection.find_one({"email": email})
+                user = await users_collection.find_one({"email": email})
             
             # If still not found, check if there's an approved access request
             if not user:
-                approved_request = access_requests_collection.find_one({
+                approved_request = await access_requests_collection.find_one({
                     "email": email,
                     "status": "approved"
                 })
@@ -86,7 +90,7 @@ async def request_otp(request: OTPRequest, background_tasks: BackgroundTasks):
                         "_id": approved_request["_id"]
                     }
                     # Also insert into investors collection for future logins
-                    investors_collection.update_one(
+                    await investors_collection.update_one(
                         {"email": email},
                         {
                             "$set": {
@@ -103,7 +107,9 @@ async def request_otp(request: OTPRequest, background_tasks: BackgroundTasks):
                         upsert=True
                     )
                     # Refresh user from investors collection to get the proper _id
-                    user = investors_collection.find_one({"email": email})
+                    user = await investors_collection.find_one({"email": email})
+                    if user:
+                        PrincipalService.invalidate(str(user["_id"]))
             
             if not user:
                 raise HTTPException(
@@ -115,7 +121,7 @@ async def request_otp(request: OTPRequest, background_tasks: BackgroundTasks):
             otp_expiry = datetime.utcnow() + timedelta(minutes=10)
             
             # Update OTP in investors collection
-            investors_collection.update_one(
+            await investors_collection.update_one(
                 {"email": email},
                 {
                     "$set": {
@@ -173,7 +179,7 @@ async def request_otp(request: OTPRequest, background_tasks: BackgroundTasks):
         </html>
         """
         
-        email_sent = EmailService.send_email(email, subject, body)
+        email_sent = await run_in_threadpool(EmailService.send_email, email, subject, body)
         
         if not email_sent:
             raise HTTPException(status_code=500, detail="Failed to send OTP email")
@@ -205,7 +211,7 @@ async def verify_otp(request: OTPVerify):
         print(f"Verifying OTP for {email} - Purpose: {purpose}")
         
         if purpose == "access_request":
-            access_request = access_requests_collection.find_one({"email": email})
+            access_request = await access_requests_collection.find_one({"email": email})
             
             if not access_request:
                 raise HTTPException(status_code=404, detail="Access request not found")
@@ -227,21 +233,21 @@ async def verify_otp(request: OTPVerify):
             attempts = access_request.get("otp_attempts", 0)
             
             if attempts >= max_attempts:
-                access_requests_collection.update_one(
+                await access_requests_collection.update_one(
                     {"_id": access_request["_id"]},
                     {"$unset": {"otp": "", "otp_expiry": ""}}
                 )
                 raise HTTPException(status_code=400, detail="Too many attempts. Please request a new OTP.")
             
             if access_request["otp"] != otp_code:
-                access_requests_collection.update_one(
+                await access_requests_collection.update_one(
                     {"_id": access_request["_id"]},
                     {"$inc": {"otp_attempts": 1}}
                 )
                 remaining = max_attempts - attempts - 1
                 raise HTTPException(status_code=400, detail=f"Invalid OTP. {remaining} attempts remaining.")
             
-            access_requests_collection.update_one(
+            await access_requests_collection.update_one(
                 {"_id": access_request["_id"]},
                 {
                     "$set": {
@@ -264,11 +270,11 @@ async def verify_otp(request: OTPVerify):
             
         elif purpose == "login":
             # Check investors_collection (where login OTPs are now stored)
-            user = investors_collection.find_one({"email": email})
+            user = await investors_collection.find_one({"email": email})
             
             # Fallback to users_collection if not found
             if not user:
-                user = users_collection.find_one({"email": email})
+                user = await users_collection.find_one({"email": email})
                 collection_to_update = users_collection
             else:
                 collection_to_update = investors_collection
@@ -286,21 +292,21 @@ async def verify_otp(request: OTPVerify):
             attempts = user.get("otp_attempts", 0)
             
             if attempts >= max_attempts:
-                collection_to_update.update_one(
+                await collection_to_update.update_one(
                     {"_id": user["_id"]},
                     {"$unset": {"otp": "", "otp_expiry": ""}}
                 )
                 raise HTTPException(status_code=400, detail="Too many attempts. Please request a new OTP.")
             
             if user["otp"] != otp_code:
-                collection_to_update.update_one(
+                await collection_to_update.update_one(
                     {"_id": user["_id"]},
                     {"$inc": {"otp_attempts": 1}}
                 )
                 remaining = max_attempts - attempts - 1
                 raise HTTPException(status_code=400, detail=f"Invalid OTP. {remaining} attempts remaining.")
             
-            collection_to_update.update_one(
+            await collection_to_update.update_one(
                 {"_id": user["_id"]},
                 {
                     "$set": {"last_login": datetime.utcnow()},
@@ -316,9 +322,11 @@ async def verify_otp(request: OTPVerify):
                 "email": user["email"],
                 "full_name": user.get("full_name", ""),
                 "role": "investor",
-                "is_investor": True
+                "is_investor": True,
+                "tv": user.get("token_version", 0)
             }
-            access_token = AuthService.create_access_token(token_data)
+            authz = await run_in_threadpool(PermissionService.authorization_snapshot, str(user["_id"]))
+            access_token = AuthService.create_access_token(token_data, authz=authz)
             
             return {
                 "success": True,
@@ -358,7 +366,6 @@ async def resend_otp(request: OTPRequest, background_tasks: BackgroundTasks):
 
 from fastapi import Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from bson import ObjectId
 
 security = HTTPBearer()
 
@@ -381,8 +388,9 @@ def get_current_investor(credentials: HTTPAuthorizationCredentials = Depends(sec
             detail="Not an investor token"
         )
     
-    # Get investor from database
-    investor = investors_collection.find_one({"_id": ObjectId(payload["sub"])})
+    # Get investor from the shared principal cache
+    principal = PrincipalService.resolve(payload)
+    investor = principal["document"] if principal and principal["kind"] == "investor" else None
     
     if not investor:
         raise HTTPException(
@@ -417,6 +425,8 @@ async def get_current_investor_info(investor: dict = Depends(get_current_investo
 
 
 @router.post("/logout")
-async def logout():
-    """Logout investor (client should clear token)"""
+def logout(credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))):
+    """Logout investor: the bearer token is revoked until it expires"""
+    if credentials:
+        AuthService.revoke_token(credentials.credentials)
     return {"success": True, "message": "Logged out successfully"}
\ No newline at end of file
@@ -66,6 +66,8 @@ def update_permission_level(level_id: str, update: PermissionLevelUpdate):
             {"_id": ObjectId(level_id)},
             {"$set": update_data}
         )
+        PermissionService.invalidate_cache()
+        PermissionService.revoke_level_tokens(level_id)
     
     return {"message": "Permission level updated successfully"}
 
@@ -77,6 +79,8 @@ def delete_permission_level(level_id: str):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Permission level not found")
     
+    PermissionService.invalidate_cache()
+    PermissionService.revoke_level_tokens(level_id)
     return {"message": "Permission level deleted successfully"}
 
 @router.get("/user/{user_id}/permissions")
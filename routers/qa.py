@@ -1,12 +1,11 @@
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from bson import ObjectId
 from models.qa import QuestionCreate, AnswerCreate, QAThreadResponse
 from routers.admin_auth import require_admin
 from services.qa import QAService
 from services.auth_service import AuthService
-from database import admin_users_collection, investors_collection
+from services.principal_service import PrincipalService
 
 router = APIRouter(prefix="/api/qa", tags=["Q&A"])
 security = HTTPBearer()
@@ -20,43 +19,11 @@ def get_current_user_or_investor(credentials: HTTPAuthorizationCredentials = Dep
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
     
-    user_id = payload["sub"]
+    principal = PrincipalService.resolve(payload)
+    if not principal:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    # Check if it's an investor token first
-    if payload.get("is_investor"):
-        investor = investors_collection.find_one({"_id": ObjectId(user_id)})
-        if investor:
-            return {
-                "id": str(investor["_id"]),
-                "email": investor.get("email", ""),
-                "full_name": investor.get("full_name", ""),
-                "role": "investor",
-                "is_admin": False
-            }
-    
-    # Then check admin users
-    admin_user = admin_users_collection.find_one({"_id": ObjectId(user_id)})
-    if admin_user:
-        return {
-            "id": str(admin_user["_id"]),
-            "email": admin_user.get("email", ""),
-            "full_name": admin_user.get("full_name", ""),
-            "role": admin_user.get("role", "admin"),
-            "is_admin": True
-        }
-    
-    # Finally check investors collection without the token flag
-    investor = investors_collection.find_one({"_id": ObjectId(user_id)})
-    if investor:
-        return {
-            "id": str(investor["_id"]),
-            "email": investor.get("email", ""),
-            "full_name": investor.get("full_name", ""),
-            "role": "investor",
-            "is_admin": False
-        }
-    
-    raise HTTPException(status_code=404, detail="User not found")
+    return PrincipalService.to_user_context(principal)
 
 
 @router.post("/questions", response_model=dict)
@@ -4,6 +4,9 @@ from models.user import UserCreate, UserResponse, UserUpdate
 from database import users_collection
 from bson import ObjectId
 from datetime import datetime
+from services.principal_service import PrincipalService
+from services.cache_service import CacheService
+from services.permission_service import CACHE_NAMESPACE as PERMISSIONS_NAMESPACE
 
 router = APIRouter(prefix="/api/users", tags=["Users"])
 
@@ -71,6 +74,11 @@ def update_user(user_id: str, update: UserUpdate):
             {"_id": ObjectId(user_id)},
             {"$set": update_data}
         )
+        if "is_active" in update_data or "permission_level_id" in update_data:
+            CacheService.delete(PERMISSIONS_NAMESPACE, user_id)
+            PrincipalService.revoke_tokens(user_id)
+        else:
+            PrincipalService.invalidate(user_id)
     
     return {"message": "User updated successfully"}
 
@@ -81,6 +89,7 @@ def delete_user(user_id: str):
         {"_id": ObjectId(user_id)},
         {"$set": {"is_active": False}}
     )
+    PrincipalService.revoke_tokens(user_id)
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
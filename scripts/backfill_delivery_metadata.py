@@ -0,0 +1,75 @@
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from pymongo import UpdateOne
+
+from database import documents_collection
+from services.cache_service import CacheService
+from services.collection_version_service import CollectionVersionService
+from utils.document_delivery import DELIVERY_VERSION, delivery_fields
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def main():
+    """
+    Store precomputed delivery fields (file_extension, download_filename,
+    download_url, can_preview) on documents that predate them, fixing
+    file_type on old uploads recorded as "raw".
+
+    Usage: python scripts/backfill_delivery_metadata.py [--batch-size N] [--dry-run]
+
+    Documents are processed in _id order in batches of one bulk_write each.
+    Only documents below the current DELIVERY_VERSION are selected, so an
+    interrupted run simply picks up where it stopped when run again.
+    """
+    args = sys.argv[1:]
+    dry_run = "--dry-run" in args
+    batch_size = DEFAULT_BATCH_SIZE
+    if "--batch-size" in args:
+        batch_size = int(args[args.index("--batch-size") + 1])
+
+    pending = {"$or": [
+        {"delivery_version": {"$exists": False}},
+        {"delivery_version": {"$lt": DELIVERY_VERSION}},
+    ]}
+    total = documents_collection.count_documents(pending)
+    print(f" {total} document(s) need delivery metadata (version {DELIVERY_VERSION})")
+
+    last_id = None
+    updated = 0
+    while True:
+        query = dict(pending)
+        if last_id is not None:
+            query = {"$and": [pending, {"_id": {"$gt": last_id}}]}
+
+        batch = list(documents_collection.find(query).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        # The version guard keeps a concurrent upload/update from being overwritten
+        operations = [
+            UpdateOne({"_id": document["_id"], **pending}, {"$set": delivery_fields(document)})
+            for document in batch
+        ]
+        if dry_run:
+            updated += len(operations)
+        else:
+            updated += documents_collection.bulk_write(operations, ordered=False).modified_count
+        print(f" {'Would update' if dry_run else 'Updated'} {updated}/{total}")
+
+    if updated and not dry_run:
+        # Running workers may hold the old fields in their hot document cache
+        CacheService.publish_invalidation("document", "*")
+        CollectionVersionService.bump("documents")
+
+    print(f" Done: {updated} document(s) {'would be ' if dry_run else ''}updated")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from jose import jwt
+from config import settings
+from services.auth_service import AuthService, ALGORITHM, _verified_tokens
+
+ITERATIONS = 20000
+
+
+def legacy_verify(token: str) -> dict:
+    """verify_token as it was: decode on every call and print to stdout"""
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+    print(f" Token verified for user: {payload.get('sub')}", file=sys.stderr)
+    return payload
+
+
+def decode_only(token: str) -> dict:
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+
+
+def bench(label: str, func, token: str, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(token)
+    elapsed = time.perf_counter() - start
+    per_call_us = elapsed / iterations * 1_000_000
+    print(f"{label:<28} {per_call_us:10.2f} us/call")
+    return per_call_us
+
+
+def main():
+    """Compare per-request token verification cost before and after the cache"""
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else ITERATIONS
+    token = AuthService.create_access_token({"sub": "bench-user", "email": "bench@sayetech.io", "role": "investor"})
+
+    print(f"Verifying one token {iterations} times (legacy prints go to stderr)\n")
+    legacy = bench("legacy (decode + print)", legacy_verify, token, iterations)
+    bench("decode only", decode_only, token, iterations)
+    _verified_tokens.clear()
+    cached = bench("verify_token (cached)", AuthService.verify_token, token, iterations)
+    print(f"\nSpeed-up over legacy: {legacy / cached:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import db
+from indexes import reconcile_indexes, advise_query_shapes
+
+
+def main():
+    """
+    Show missing indexes and explain() every registered query shape.
+
+    Usage: python scripts/index_advisor.py [--apply]
+    --apply builds the missing indexes before running the advisor.
+    """
+    apply = "--apply" in sys.argv[1:]
+
+    print("=" * 60)
+    print("INDEX REGISTRY")
+    print("=" * 60)
+    summary = reconcile_indexes(db, dry_run=not apply)
+    if not summary["created"] and not summary["conflicts"]:
+        print(" All registered indexes are present")
+
+    print("\n" + "=" * 60)
+    print("QUERY SHAPES")
+    print("=" * 60)
+    flagged = 0
+    for entry in advise_query_shapes(db):
+        label = f"{entry['collection']:<22} {entry['source']}"
+        if "error" in entry:
+            print(f" ERROR     {label}: {entry['error']}")
+            flagged += 1
+        elif entry["collection_scan"]:
+            print(f" COLLSCAN  {label}")
+            flagged += 1
+        elif entry["in_memory_sort"]:
+            print(f" SORT      {label}")
+            flagged += 1
+        else:
+            print(f" ok        {label} ({' <- '.join(entry['stages'])})")
+
+    print(f"\n {flagged} query shape(s) need attention")
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from async_database import documents_collection, document_access_logs_collection
+from config import settings
+
+# Document counter incremented for each logged action
+COUNTER_FIELDS = {"view": "view_count", "download": "download_count"}
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class AccessLogBuffer:
+    """
+    Write-behind buffer for document access logs and view/download counters.
+
+    Requests only append to memory. A background task flushes every
+    flush_interval seconds (sooner once max_batch entries are waiting):
+    logs go out in one insert_many and counter increments are coalesced
+    per document into one bulk_write. A failed write is queued again for
+    the next flush; entries beyond max_buffered are dropped rather than
+    growing memory while MongoDB is unavailable. Handlers registered with
+    on_counters_flushed are awaited with the ids of the documents whose
+    counters were written.
+    """
+
+    def __init__(self, flush_interval: float, max_batch: int, max_buffered: int):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_buffered = max_buffered
+        self._entries: List[dict] = []
+        self._counters: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._flush_handlers: List[Callable[[List[str]], Awaitable[None]]] = []
+        self.flushed_entries = 0
+        self.flushed_counter_updates = 0
+        self.dropped = 0
+        self.failed_flushes = 0
+        self.last_flush_seconds = 0.0
+
+    def add(self, entry: dict) -> None:
+        """Queue one access log entry and its counter increment"""
+        if len(self._entries) >= self.max_buffered:
+            self.dropped += 1
+            return
+
+        self._entries.append(entry)
+        field = COUNTER_FIELDS.get(entry.get("action"))
+        if field:
+            self._counters[entry["document_id"]][field] += 1
+
+        if len(self._entries) >= self.max_batch and self._wakeup is not None:
+            self._wakeup.set()
+
+    def add_many(self, entries: List[dict]) -> None:
+        """Queue several entries together (e.g. one per file of a bundle download)"""
+        if len(self._entries) + len(entries) > self.max_buffered:
+            self.dropped += len(entries)
+            return
+
+        self._entries.extend(entries)
+        for entry in entries:
+            field = COUNTER_FIELDS.get(entry.get("action"))
+            if field:
+                self._counters[entry["document_id"]][field] += 1
+
+        if len(self._entries) >= self.max_batch and self._wakeup is not None:
+            self._wakeup.set()
+
+    def on_counters_flushed(self, handler: Callable[[List[str]], Awaitable[None]]) -> None:
+        """Register an async handler called with the document ids whose counters each flush wrote"""
+        self._flush_handlers.append(handler)
+
+    async def flush(self) -> None:
+        """Write everything buffered so far; whatever fails to write is queued again"""
+        if not self._entries and not self._counters:
+            return
+
+        entries, self._entries = self._entries, []
+        counters, self._counters = self._counters, defaultdict(lambda: defaultdict(int))
+
+        updates = []
+        update_ids = []
+        for document_id, fields in counters.items():
+            try:
+                updates.append(UpdateOne({"_id": ObjectId(document_id)}, {"$inc": dict(fields)}))
+                update_ids.append(document_id)
+            except Exception:
+                continue
+
+        started_at = time.perf_counter()
+        try:
+            if entries:
+                try:
+                    await document_access_logs_collection.insert_many(entries, ordered=False)
+                    self.flushed_entries += len(entries)
+                except BulkWriteError as e:
+                    # insert_many set each entry's _id, so a duplicate key means it was written earlier
+                    failed = [
+                        entries[error["index"]]
+                        for error in e.details.get("writeErrors", [])
+                        if error.get("code") != DUPLICATE_KEY_ERROR
+                    ]
+                    self.flushed_entries += len(entries) - len(failed)
+                    if failed:
+                        self.failed_flushes += 1
+                        print(f"Access log flush failed for {len(failed)} entries, queued again")
+                        self._requeue(failed, {})
+                except PyMongoError as e:
+                    self.failed_flushes += 1
+                    print(f"Access log flush failed, {len(entries)} entries queued again: {e}")
+                    self._requeue(entries, counters)
+                    return
+
+            if updates:
+                failed_ids = set()
+                try:
+                    await documents_collection.bulk_write(updates, ordered=False)
+                    self.flushed_counter_updates += len(updates)
+                except BulkWriteError as e:
+                    failed_ids = {update_ids[error["index"]] for error in e.details.get("writeErrors", [])}
+                    self.flushed_counter_updates += len(updates) - len(failed_ids)
+                    self.failed_flushes += 1
+                    self._requeue([], {document_id: counters[document_id] for document_id in failed_ids})
+                except PyMongoError as e:
+                    # Increments may be applied twice if the write landed before the error
+                    self.failed_flushes += 1
+                    print(f"Access counter flush failed, {len(updates)} updates queued again: {e}")
+                    self._requeue([], counters)
+                    return
+
+                flushed_ids = [document_id for document_id in update_ids if document_id not in failed_ids]
+                if flushed_ids:
+                    for handler in self._flush_handlers:
+                        try:
+                            await handler(flushed_ids)
+                        except Exception as e:
+                            print(f"Access counter flush handler failed: {e}")
+        finally:
+            self.last_flush_seconds = time.perf_counter() - started_at
+
+    def _requeue(self, entries: List[dict], counters: Dict[str, Dict[str, int]]) -> None:
+        """Put back what a failed flush took out, keeping at most max_buffered entries"""
+        room = max(self.max_buffered - len(self._entries), 0)
+        self._entries[:0] = entries[:room]
+        self.dropped += max(len(entries) - room, 0)
+        for document_id, fields in counters.items():
+            for field, count in fields.items():
+                self._counters[document_id][field] += count
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Access log flush error: {e}")
+
+    def start(self) -> None:
+        """Start the background flusher (call from a startup hook)"""
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write whatever is still buffered
+        
+        The flusher is woken and awaited rather than cancelled, so a flush
+        already in flight completes instead of losing the batch it holds.
+        """
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "buffered_entries": len(self._entries),
+            "buffered_documents": len(self._counters),
+            "flushed_entries": self.flushed_entries,
+            "flushed_counter_updates": self.flushed_counter_updates,
+            "dropped": self.dropped,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_seconds": round(self.last_flush_seconds, 4),
+        }
+
+
+access_log_buffer = AccessLogBuffer(
+    flush_interval=settings.ACCESS_LOG_FLUSH_INTERVAL_SECONDS,
+    max_batch=settings.ACCESS_LOG_MAX_BATCH,
+    max_buffered=settings.ACCESS_LOG_MAX_BUFFERED,
+)
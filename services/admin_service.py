@@ -1,5 +1,7 @@
 from database import admin_users_collection
+from async_database import admin_users_collection as async_admin_users_collection
 from services.auth_service import AuthService
+from services.principal_service import PrincipalService
 from bson import ObjectId
 from datetime import datetime
 from typing import Optional, List
@@ -78,6 +80,30 @@ class AdminService:
         
         return user
     
+    @staticmethod
+    async def authenticate_async(username_or_email: str, password: str) -> Optional[dict]:
+        """Authenticate without blocking the event loop (bcrypt runs on the hash pool)"""
+        user = await async_admin_users_collection.find_one({
+            "$or": [
+                {"username": username_or_email},
+                {"email": username_or_email}
+            ]
+        })
+        
+        if not user:
+            return None
+        
+        if not user.get("is_active", False):
+            raise ValueError("Account is inactive")
+        
+        if not await AuthService.verify_password_async(password, user["password_hash"]):
+            return None
+        
+        user["id"] = str(user.pop("_id"))
+        user.pop("password_hash", None)
+        
+        return user
+    
     @staticmethod
     def get_admin_by_id(admin_id: str) -> Optional[dict]:
         """Get admin by ID"""
@@ -120,6 +146,10 @@ class AdminService:
                 {"_id": ObjectId(admin_id)},
                 {"$set": {**update_data, "updated_at": datetime.utcnow()}}
             )
+            if update_data.get("is_active") is False or "role" in update_data:
+                PrincipalService.revoke_tokens(admin_id)
+            else:
+                PrincipalService.invalidate(admin_id)
             return result.modified_count > 0
         except:
             return False
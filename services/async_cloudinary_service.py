@@ -0,0 +1,313 @@
+# services/async_cloudinary_service.py
+import asyncio
+import hashlib
+import hmac
+import random
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+import httpx
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+
+from config import settings
+from services.cloudinary_service import CloudinaryService
+
+# Parameters Cloudinary excludes when computing a request signature
+UNSIGNED_PARAMS = {"file", "api_key", "resource_type", "cloud_name", "signature"}
+
+# Responses worth retrying; everything else is returned to the caller as-is
+RETRY_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failures and rejects calls for
+    `reset_seconds`. After that a single call is let through as a probe
+    (another one only if it has not reported back within `reset_seconds`);
+    its success closes the breaker and its failure opens it again.
+    """
+
+    def __init__(self, threshold: int, reset_seconds: float):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_started_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "open":
+            return False
+
+        now = time.monotonic()
+        if self.probe_started_at is not None and now - self.probe_started_at < self.reset_seconds:
+            return False
+        self.probe_started_at = now
+        return True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probe_started_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probe_started_at = None
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class AsyncCloudinaryClient:
+    """
+    Cloudinary REST client on a pooled httpx.AsyncClient.
+
+    Uploads and deletes are signed locally with the API secret, so no SDK
+    call (and no blocking socket) ever runs on the event loop. Requests are
+    retried with exponential backoff and guarded by a circuit breaker so a
+    Cloudinary outage fails fast instead of tying up workers. Point base_url
+    at a local fake server to test it.
+    """
+
+    def __init__(
+        self,
+        cloud_name: str,
+        api_key: str,
+        api_secret: str,
+        base_url: str,
+        timeout: float,
+        max_retries: int,
+        breaker: CircuitBreaker,
+    ):
+        self.cloud_name = cloud_name
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.breaker = breaker
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=f"{self.base_url}/{self.cloud_name}",
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # Signing
+
+    def sign(self, params: dict) -> str:
+        """Cloudinary signature: SHA-1 of the sorted key=value pairs followed by the API secret"""
+        to_sign = "&".join(
+            f"{key}={','.join(map(str, value)) if isinstance(value, (list, tuple)) else value}"
+            for key, value in sorted(params.items())
+            if key not in UNSIGNED_PARAMS and value not in (None, "")
+        )
+        return hashlib.sha1(f"{to_sign}{self.api_secret}".encode("utf-8")).hexdigest()
+
+    def verify_upload_response(self, public_id: str, version, signature: str) -> bool:
+        """Check the signature Cloudinary puts on upload responses (public_id + version)"""
+        expected = self.sign({"public_id": public_id, "version": version})
+        return hmac.compare_digest(expected, str(signature or ""))
+
+    def upload_url(self, resource_type: str) -> str:
+        return f"{self.base_url}/{self.cloud_name}/{resource_type}/upload"
+
+    def signed_params(self, params: dict) -> dict:
+        params = {key: value for key, value in params.items() if value is not None}
+        params["timestamp"] = int(time.time())
+        params["signature"] = self.sign(params)
+        params["api_key"] = self.api_key
+        return params
+
+    # Transport
+
+    async def _request(self, method: str, path: str, **kwargs) -> dict:
+        if not self.breaker.allow():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Document storage is temporarily unavailable, please retry shortly"
+            )
+
+        client = self._get_client()
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                # Exponential backoff with jitter: ~0.25s, 0.5s, 1s, ...
+                await asyncio.sleep(0.25 * (2 ** (attempt - 1)) * (0.5 + random.random()))
+            try:
+                response = await client.request(method, path, **kwargs)
+            except httpx.TransportError as e:
+                last_error = str(e) or e.__class__.__name__
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES:
+                last_error = f"HTTP {response.status_code}"
+                continue
+
+            self.breaker.record_success()
+            if response.status_code >= 400:
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail=f"Cloudinary request failed: {self._error_message(response)}"
+                )
+            return response.json()
+
+        self.breaker.record_failure()
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=f"Cloudinary request failed after {self.max_retries + 1} attempts: {last_error}"
+        )
+
+    @staticmethod
+    def _error_message(response: httpx.Response) -> str:
+        try:
+            return response.json().get("error", {}).get("message", response.text)
+        except ValueError:
+            return response.text
+
+    # API
+
+    async def upload(
+        self,
+        file_obj,
+        filename: str,
+        folder: str = "dataroom_documents",
+        public_id: Optional[str] = None,
+        resource_type: str = "auto",
+        chunk_size: int = 6 * 1024 * 1024,
+        progress: Optional[Callable[[int, int], Awaitable[None]]] = None,
+    ) -> dict:
+        """
+        Upload a seekable file object, in chunks when it is larger than chunk_size.
+
+        Chunks are read off the event loop and sent with Content-Range and a
+        shared X-Unique-Upload-Id, as Cloudinary's chunked upload API expects.
+        progress, if given, is awaited with (bytes_sent, total) after each chunk.
+        """
+        if resource_type == "auto":
+            resource_type = CloudinaryService.resource_type_for(filename)
+
+        file_obj.seek(0, 2)
+        total = file_obj.tell()
+        file_obj.seek(0)
+
+        params = self.signed_params({"folder": folder, "public_id": public_id})
+        path = f"/{resource_type}/upload"
+
+        if total <= chunk_size:
+            data = await run_in_threadpool(file_obj.read)
+            result = await self._request("POST", path, data=params, files={"file": (filename, data)})
+            if progress:
+                await progress(total, total)
+            return result
+
+        upload_id = uuid.uuid4().hex
+        offset = 0
+        result = None
+        while offset < total:
+            chunk = await run_in_threadpool(file_obj.read, chunk_size)
+            if not chunk:
+                break
+            headers = {
+                "Content-Range": f"bytes {offset}-{offset + len(chunk) - 1}/{total}",
+                "X-Unique-Upload-Id": upload_id,
+            }
+            result = await self._request(
+                "POST", path, data=params, files={"file": (filename, chunk)}, headers=headers
+            )
+            offset += len(chunk)
+            if progress:
+                await progress(offset, total)
+        return result
+
+    async def destroy(self, public_id: str, resource_type: str = "raw") -> dict:
+        """Delete an asset"""
+        params = self.signed_params({"public_id": public_id})
+        return await self._request("POST", f"/{resource_type}/destroy", data=params)
+
+    async def resource(self, public_id: str, resource_type: str = "raw") -> dict:
+        """Fetch asset details from the Admin API (HTTP basic auth)"""
+        return await self._request(
+            "GET",
+            f"/resources/{resource_type}/upload/{public_id}",
+            auth=(self.api_key, self.api_secret),
+        )
+
+    async def stream(self, url: str, chunk_size: int = 256 * 1024):
+        """Stream a delivered asset (absolute URL) without buffering it"""
+        if not self.breaker.allow():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Document storage is temporarily unavailable, please retry shortly"
+            )
+
+        try:
+            async with self._get_client().stream("GET", url) as response:
+                if response.status_code in RETRY_STATUS_CODES:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                if response.status_code >= 400:
+                    raise HTTPException(
+                        status_code=status.HTTP_502_BAD_GATEWAY,
+                        detail=f"Cloudinary delivery failed: HTTP {response.status_code}"
+                    )
+                async for chunk in response.aiter_bytes(chunk_size):
+                    yield chunk
+        except httpx.TransportError as e:
+            self.breaker.record_failure()
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"Cloudinary delivery failed: {str(e) or e.__class__.__name__}"
+            )
+
+    async def fetch(self, url: str, max_bytes: int) -> bytes:
+        """Download a delivered asset (absolute URL), refusing anything over max_bytes"""
+        chunks = []
+        received = 0
+        async for chunk in self.stream(url):
+            received += len(chunk)
+            if received > max_bytes:
+                raise HTTPException(
+                    status_code=413,
+                    detail="Document is too large to render a preview"
+                )
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def stats(self) -> dict:
+        return {"breaker_state": self.breaker.state, "consecutive_failures": self.breaker.failures}
+
+
+cloudinary_client = AsyncCloudinaryClient(
+    cloud_name=settings.CLOUDINARY_CLOUD_NAME,
+    api_key=settings.CLOUDINARY_API_KEY,
+    api_secret=settings.CLOUDINARY_API_SECRET,
+    base_url=settings.CLOUDINARY_API_BASE_URL,
+    timeout=settings.CLOUDINARY_TIMEOUT_SECONDS,
+    max_retries=settings.CLOUDINARY_MAX_RETRIES,
+    breaker=CircuitBreaker(
+        threshold=settings.CLOUDINARY_BREAKER_THRESHOLD,
+        reset_seconds=settings.CLOUDINARY_BREAKER_RESET_SECONDS,
+    ),
+)
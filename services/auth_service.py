@@ -1,9 +1,17 @@
+import hashlib
+import logging
+import time
+import uuid
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional
 from config import settings
 from database import admin_users_collection
+from services.password_hash_pool import password_hash_pool
+from services.token_denylist_service import TokenDenylistService
+from utils.structured_logging import get_logger, log_event
+from utils.ttl_cache import TTLCache
 from bson import ObjectId
 
 # Password hashing
@@ -13,6 +21,14 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 
+logger = get_logger("auth")
+
+# Verified token payloads keyed by SHA-256 of the token; entries expire at the token's exp
+_verified_tokens = TTLCache(
+    maxsize=settings.TOKEN_CACHE_MAX_ENTRIES,
+    ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+
 class AuthService:
     @staticmethod
     def _truncate_password(password: str) -> str:
@@ -39,51 +55,108 @@ class AuthService:
             return False
     
     @staticmethod
-    def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-        """Create JWT access token."""
+    async def hash_password_async(password: str) -> str:
+        """Hash a password on the dedicated bcrypt pool."""
+        return await password_hash_pool.run(AuthService.hash_password, password)
+    
+    @staticmethod
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+        """Verify a password on the dedicated bcrypt pool."""
+        return await password_hash_pool.run(AuthService.verify_password, plain_password, hashed_password)
+    
+    @staticmethod
+    def create_access_token(
+        data: dict,
+        expires_delta: Optional[timedelta] = None,
+        authz: Optional[dict] = None
+    ) -> str:
+        """
+        Create JWT access token.
+        
+        authz is an optional authorization snapshot (see
+        PermissionService.authorization_snapshot) embedded as the "authz" claim so
+        document gates can be evaluated without a database lookup.
+        """
         to_encode = data.copy()
+        if authz is not None:
+            to_encode["authz"] = authz
         
         if expires_delta:
             expire = datetime.utcnow() + expires_delta
         else:
             expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
         
-        to_encode.update({"exp": expire})
+        # jti identifies this token so it can be revoked on logout
+        to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
         
         try:
             encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
-            print(f" Token created, expires at: {expire}")
+            log_event(logger, logging.INFO, "token_created", sub=data.get("sub"), expires_at=expire)
             return encoded_jwt
         except Exception as e:
-            print(f" Error creating token: {e}")
+            log_event(logger, logging.ERROR, "token_create_failed", error=str(e))
             raise
     
+    @staticmethod
+    def _token_cache_key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+    
+    @staticmethod
+    def _token_id(payload: dict, cache_key: bytes) -> str:
+        # Tokens issued before jti was added are identified by their hash
+        return payload.get("jti") or cache_key.hex()
+    
     @staticmethod
     def verify_token(token: str) -> Optional[dict]:
-        """Verify and decode JWT token."""
+        """Verify and decode JWT token (verified payloads are cached until exp)."""
+        key = AuthService._token_cache_key(token)
+        payload = _verified_tokens.get(key)
+        if payload is not None:
+            if TokenDenylistService.is_denied(AuthService._token_id(payload, key)):
+                log_event(logger, logging.INFO, "token_revoked", sample_rate=settings.AUTH_LOG_SAMPLE_RATE, sub=payload.get("sub"))
+                return None
+            return dict(payload)
+        
         try:
             payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-            
-            # Check expiration
-            exp = payload.get("exp")
-            if exp:
-                exp_datetime = datetime.fromtimestamp(exp)
-                if datetime.utcnow() > exp_datetime:
-                    print(f" Token expired at {exp_datetime}")
-                    return None
-            
-            print(f" Token verified for user: {payload.get('sub')}")
-            return payload
-            
         except jwt.ExpiredSignatureError:
-            print(" Token has expired")
+            log_event(logger, logging.INFO, "token_expired", sample_rate=settings.AUTH_LOG_SAMPLE_RATE)
             return None
         except jwt.JWTError as e:
-            print(f" JWT Error: {e}")
+            log_event(logger, logging.WARNING, "token_invalid", sample_rate=settings.AUTH_LOG_SAMPLE_RATE, error=str(e))
             return None
         except Exception as e:
-            print(f" Token verification error: {e}")
+            log_event(logger, logging.ERROR, "token_verify_failed", error=str(e))
+            return None
+        
+        # Purpose-bound tokens (e.g. direct upload tickets) are never access tokens
+        if "typ" in payload or "aud" in payload:
+            log_event(logger, logging.WARNING, "token_invalid", sample_rate=settings.AUTH_LOG_SAMPLE_RATE, error="not an access token")
+            return None
+        
+        if TokenDenylistService.is_denied(AuthService._token_id(payload, key)):
+            log_event(logger, logging.INFO, "token_revoked", sample_rate=settings.AUTH_LOG_SAMPLE_RATE, sub=payload.get("sub"))
             return None
+        
+        # jose has already rejected expired tokens; keep the entry until exp at most
+        exp = payload.get("exp")
+        ttl = exp - time.time() if exp else None
+        _verified_tokens.set(key, payload, ttl)
+        
+        log_event(logger, logging.DEBUG, "token_verified", sample_rate=settings.AUTH_LOG_SAMPLE_RATE, sub=payload.get("sub"))
+        return dict(payload)
+    
+    @staticmethod
+    def revoke_token(token: str) -> bool:
+        """Revoke a token until it expires (logout); returns False for invalid tokens"""
+        payload = AuthService.verify_token(token)
+        if not payload or not payload.get("exp"):
+            return False
+        
+        jti = AuthService._token_id(payload, AuthService._token_cache_key(token))
+        TokenDenylistService.deny(jti, payload["exp"])
+        log_event(logger, logging.INFO, "token_revoked_on_logout", sub=payload.get("sub"))
+        return True
     
     @staticmethod
     def authenticate_admin(email: str, password: str) -> Optional[dict]:
@@ -0,0 +1,257 @@
+import json
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+import redis
+from bson import json_util
+from fastapi.concurrency import run_in_threadpool
+
+from config import settings
+
+KEY_PREFIX = "dataroom"
+INVALIDATION_CHANNEL = f"{KEY_PREFIX}:cache-invalidation"
+
+# Seconds to stop talking to Redis after a connection failure
+RETRY_AFTER_SECONDS = 30
+
+# Identifies this worker so it can ignore its own invalidation broadcasts
+WORKER_ID = uuid.uuid4().hex
+
+
+class CacheService:
+    """
+    Shared Redis cache for hot, rarely-changing data.
+
+    Keys are namespaced as dataroom:<namespace>:<key> and expire after
+    settings.CACHE_TTL unless a ttl is given. Values are stored with bson's
+    json_util so ObjectId and datetime survive the round trip.
+
+    Deletes are broadcast on a pub/sub channel so every worker can drop its own
+    in-process copies (see on_invalidate). If Redis is unreachable the cache
+    degrades to a no-op and callers fall through to MongoDB.
+    """
+
+    _client: Optional[redis.Redis] = None
+    _disabled_until: float = 0.0
+    _handlers: Dict[str, List[Callable[[str], None]]] = {}
+    _listener = None
+    _listener_retry: Optional[threading.Timer] = None
+    _listener_missed = False
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_client() -> Optional[redis.Redis]:
+        """Return the shared Redis client, or None while Redis is marked unavailable"""
+        if time.monotonic() < CacheService._disabled_until:
+            return None
+
+        if CacheService._client is None:
+            with CacheService._lock:
+                if CacheService._client is None:
+                    CacheService._client = redis.Redis.from_url(
+                        settings.REDIS_URL,
+                        socket_connect_timeout=0.5,
+                        socket_timeout=0.5,
+                        health_check_interval=30,
+                    )
+        return CacheService._client
+
+    @staticmethod
+    def _mark_unavailable(error: Exception) -> None:
+        print(f"Redis unavailable, caching disabled for {RETRY_AFTER_SECONDS}s: {error}")
+        CacheService._disabled_until = time.monotonic() + RETRY_AFTER_SECONDS
+
+    @staticmethod
+    def make_key(namespace: str, key: str) -> str:
+        return f"{KEY_PREFIX}:{namespace}:{key}"
+
+    @staticmethod
+    def get(namespace: str, key: str) -> Any:
+        """Return the cached value, or None on a miss"""
+        client = CacheService.get_client()
+        if client is None:
+            return None
+
+        try:
+            raw = client.get(CacheService.make_key(namespace, key))
+        except redis.RedisError as e:
+            CacheService._mark_unavailable(e)
+            return None
+
+        if raw is None:
+            return None
+        return json_util.loads(raw)
+
+    @staticmethod
+    def set(namespace: str, key: str, value: Any, ttl: Optional[int] = None) -> bool:
+        """Store a value for ttl seconds (defaults to settings.CACHE_TTL)"""
+        client = CacheService.get_client()
+        if client is None:
+            return False
+
+        try:
+            client.set(
+                CacheService.make_key(namespace, key),
+                json_util.dumps(value),
+                ex=ttl or settings.CACHE_TTL,
+            )
+            return True
+        except redis.RedisError as e:
+            CacheService._mark_unavailable(e)
+            return False
+
+    @staticmethod
+    def get_or_set(namespace: str, key: str, loader: Callable[[], Any], ttl: Optional[int] = None) -> Any:
+        """Return the cached value or load, cache and return it (None results are not cached)"""
+        value = CacheService.get(namespace, key)
+        if value is not None:
+            return value
+
+        value = loader()
+        if value is not None:
+            CacheService.set(namespace, key, value, ttl)
+        return value
+
+    @staticmethod
+    def delete(namespace: str, key: str) -> None:
+        """Delete a key and tell every worker to drop local copies of it"""
+        client = CacheService.get_client()
+        if client is not None:
+            try:
+                client.delete(CacheService.make_key(namespace, key))
+            except redis.RedisError as e:
+                CacheService._mark_unavailable(e)
+
+        CacheService.publish_invalidation(namespace, key)
+
+    @staticmethod
+    def invalidate_namespace(namespace: str) -> None:
+        """Delete every key in a namespace and broadcast a namespace-wide invalidation"""
+        client = CacheService.get_client()
+        if client is not None:
+            try:
+                keys = list(client.scan_iter(match=CacheService.make_key(namespace, "*"), count=500))
+                if keys:
+                    client.delete(*keys)
+            except redis.RedisError as e:
+                CacheService._mark_unavailable(e)
+
+        CacheService.publish_invalidation(namespace, "*")
+
+    # Cross-worker invalidation
+
+    @staticmethod
+    def on_invalidate(namespace: str, handler: Callable[[str], None]) -> None:
+        """Register a local handler called with the key ("*" for all) on every invalidation"""
+        CacheService._handlers.setdefault(namespace, []).append(handler)
+
+    @staticmethod
+    def _dispatch(namespace: str, key: str) -> None:
+        for handler in CacheService._handlers.get(namespace, []):
+            try:
+                handler(key)
+            except Exception as e:
+                print(f"Cache invalidation handler failed for {namespace}:{key}: {e}")
+
+    @staticmethod
+    def publish_invalidation(namespace: str, key: str) -> None:
+        """Run local handlers now and broadcast the invalidation to other workers"""
+        CacheService._dispatch(namespace, key)
+        CacheService._broadcast(namespace, key)
+
+    @staticmethod
+    async def publish_invalidation_async(namespace: str, key: str) -> None:
+        """publish_invalidation for async callers: the Redis publish runs off the event loop"""
+        CacheService._dispatch(namespace, key)
+        await run_in_threadpool(CacheService._broadcast, namespace, key)
+
+    @staticmethod
+    def _broadcast(namespace: str, key: str) -> None:
+        client = CacheService.get_client()
+        if client is None:
+            return
+
+        message = json.dumps({"origin": WORKER_ID, "namespace": namespace, "key": key})
+        try:
+            client.publish(INVALIDATION_CHANNEL, message)
+        except redis.RedisError as e:
+            CacheService._mark_unavailable(e)
+
+    @staticmethod
+    def _handle_message(message: dict) -> None:
+        try:
+            data = json.loads(message["data"])
+        except (TypeError, ValueError):
+            return
+
+        if data.get("origin") == WORKER_ID:
+            return
+        CacheService._dispatch(data.get("namespace", ""), data.get("key", "*"))
+
+    @staticmethod
+    def _on_listener_error(error: Exception, pubsub, thread) -> None:
+        """Keep the listener alive across Redis restarts; pubsub reconnects on the next read"""
+        print(f"Cache invalidation listener error: {error}")
+        time.sleep(RETRY_AFTER_SECONDS)
+
+    @staticmethod
+    def start_listener() -> None:
+        """Subscribe this worker to invalidation broadcasts (call once at startup)
+        
+        If Redis cannot be reached the subscription is retried in the
+        background every RETRY_AFTER_SECONDS until it succeeds.
+        """
+        if CacheService._listener is not None:
+            return
+
+        client = CacheService.get_client()
+        if client is None:
+            CacheService._schedule_listener_retry()
+            return
+
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{INVALIDATION_CHANNEL: CacheService._handle_message})
+            CacheService._listener = pubsub.run_in_thread(
+                sleep_time=1.0,
+                daemon=True,
+                exception_handler=CacheService._on_listener_error,
+            )
+            print("Cache invalidation listener started")
+        except redis.RedisError as e:
+            CacheService._mark_unavailable(e)
+            CacheService._schedule_listener_retry()
+            return
+
+        if CacheService._listener_missed:
+            # Broadcasts sent while unsubscribed were missed: drop every in-process copy
+            CacheService._listener_missed = False
+            for namespace in list(CacheService._handlers):
+                CacheService._dispatch(namespace, "*")
+
+    @staticmethod
+    def _schedule_listener_retry() -> None:
+        with CacheService._lock:
+            CacheService._listener_missed = True
+            if CacheService._listener_retry is not None and CacheService._listener_retry.is_alive():
+                return
+            timer = threading.Timer(RETRY_AFTER_SECONDS, CacheService._retry_listener)
+            timer.daemon = True
+            CacheService._listener_retry = timer
+            timer.start()
+
+    @staticmethod
+    def _retry_listener() -> None:
+        CacheService._listener_retry = None
+        CacheService.start_listener()
+
+    @staticmethod
+    def stop_listener() -> None:
+        if CacheService._listener_retry is not None:
+            CacheService._listener_retry.cancel()
+            CacheService._listener_retry = None
+        if CacheService._listener is not None:
+            CacheService._listener.stop()
+            CacheService._listener = None
@@ -164,4 +164,14 @@ class CloudinaryService:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Cloudinary upload from bytes failed: {str(e)}"
-            )
\ No newline at end of file
+            )
+
+    @staticmethod
+    def resource_type_for(filename: str) -> str:
+        """Pick the Cloudinary resource type from the file's MIME type"""
+        mime_type, _ = mimetypes.guess_type(filename or "")
+        if mime_type and mime_type.startswith('image'):
+            return 'image'
+        if mime_type and mime_type.startswith('video'):
+            return 'video'
+        return 'raw'
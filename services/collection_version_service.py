@@ -0,0 +1,70 @@
+from typing import Iterable, Tuple
+
+from async_database import collection_versions_collection as async_versions_collection
+from config import settings
+from database import collection_versions_collection
+from services.cache_service import CacheService
+from utils.ttl_cache import TTLCache
+
+CACHE_NAMESPACE = "collection_version"
+
+# Version counters this worker has read. Bumps are broadcast, so the TTL
+# only bounds staleness while Redis pub/sub is unavailable.
+_versions = TTLCache(maxsize=256, ttl=settings.COLLECTION_VERSION_CACHE_SECONDS)
+
+# Bumped on every local invalidation so a read that raced a bump is not cached
+_generation = [0]
+
+
+class CollectionVersionService:
+    """
+    Monotonic change counters for data served with ETags.
+
+    Each counter lives in collection_versions ({_id: name, version: n}) and
+    is bumped by every write path that changes what the named resource
+    returns. Reads come from an in-process cache, so computing an ETag
+    normally costs no database round trip at all.
+    """
+
+    @staticmethod
+    def bump(name: str) -> None:
+        """Record a change to `name` (sync callers)"""
+        collection_versions_collection.update_one({"_id": name}, {"$inc": {"version": 1}}, upsert=True)
+        CacheService.publish_invalidation(CACHE_NAMESPACE, name)
+
+    @staticmethod
+    async def bump_async(name: str) -> None:
+        """Record a change to `name` (async callers)"""
+        await async_versions_collection.update_one({"_id": name}, {"$inc": {"version": 1}}, upsert=True)
+        await CacheService.publish_invalidation_async(CACHE_NAMESPACE, name)
+
+    @staticmethod
+    async def current(names: Iterable[str]) -> Tuple[int, ...]:
+        """Current version of each named counter (0 if never bumped)"""
+        names = list(names)
+        versions = {name: _versions.get(name) for name in names}
+        missing = [name for name, version in versions.items() if version is None]
+        if missing:
+            generation = _generation[0]
+            found = await async_versions_collection.find({"_id": {"$in": missing}}).to_list(length=None)
+            stored = {document["_id"]: document.get("version", 0) for document in found}
+            for name in missing:
+                versions[name] = stored.get(name, 0)
+                if generation == _generation[0]:
+                    _versions.set(name, versions[name])
+        return tuple(versions[name] for name in names)
+
+    @staticmethod
+    def _drop_local(name: str) -> None:
+        _generation[0] += 1
+        if name == "*":
+            _versions.clear()
+        else:
+            _versions.delete(name)
+
+    @staticmethod
+    def cache_stats() -> dict:
+        return _versions.stats()
+
+
+CacheService.on_invalidate(CACHE_NAMESPACE, CollectionVersionService._drop_local)
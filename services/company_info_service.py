@@ -6,50 +6,73 @@ from database import (
     awards_collection,
     media_coverage_collection
 )
+from services.cache_service import CacheService
+from services.collection_version_service import CollectionVersionService
+
+# Company information is shared by every investor and changes rarely. It is edited
+# directly in MongoDB, so an edit shows up after CACHE_TTL unless an admin calls
+# POST /api/company/cache/invalidate
+CACHE_NAMESPACE = "company"
 
 class CompanyInfoService:
-    
+
     @staticmethod
     def get_key_metrics() -> List[dict]:
         """Get current key metrics"""
-        metrics = list(key_metrics_collection.find().sort("display_order", 1))
-        for metric in metrics:
-            metric["id"] = str(metric.pop("_id"))
-        return metrics
-    
+        def load():
+            metrics = list(key_metrics_collection.find().sort("display_order", 1))
+            for metric in metrics:
+                metric["id"] = str(metric.pop("_id"))
+            return metrics
+
+        return CacheService.get_or_set(CACHE_NAMESPACE, "key_metrics", load)
+
     @staticmethod
     def get_milestones(limit: int = 20) -> List[dict]:
         """Get company milestones"""
-        milestones = list(milestones_collection.find().sort("date", -1).limit(limit))
-        for milestone in milestones:
-            milestone["id"] = str(milestone.pop("_id"))
-        return milestones
-    
+        def load():
+            milestones = list(milestones_collection.find().sort("date", -1).limit(limit))
+            for milestone in milestones:
+                milestone["id"] = str(milestone.pop("_id"))
+            return milestones
+
+        return CacheService.get_or_set(CACHE_NAMESPACE, f"milestones:{limit}", load)
+
     @staticmethod
     def get_testimonials(featured_only: bool = False) -> List[dict]:
         """Get customer testimonials"""
-        query = {"is_featured": True} if featured_only else {}
-        testimonials = list(testimonials_collection.find(query).sort("date_added", -1))
-        for testimonial in testimonials:
-            testimonial["id"] = str(testimonial.pop("_id"))
-        return testimonials
-    
+        def load():
+            query = {"is_featured": True} if featured_only else {}
+            testimonials = list(testimonials_collection.find(query).sort("date_added", -1))
+            for testimonial in testimonials:
+                testimonial["id"] = str(testimonial.pop("_id"))
+            return testimonials
+
+        key = "testimonials:featured" if featured_only else "testimonials:all"
+        return CacheService.get_or_set(CACHE_NAMESPACE, key, load)
+
     @staticmethod
     def get_awards() -> List[dict]:
         """Get company awards"""
-        awards = list(awards_collection.find().sort("date_received", -1))
-        for award in awards:
-            award["id"] = str(award.pop("_id"))
-        return awards
-    
+        def load():
+            awards = list(awards_collection.find().sort("date_received", -1))
+            for award in awards:
+                award["id"] = str(award.pop("_id"))
+            return awards
+
+        return CacheService.get_or_set(CACHE_NAMESPACE, "awards", load)
+
     @staticmethod
     def get_media_coverage(limit: int = 10) -> List[dict]:
         """Get media coverage"""
-        coverage = list(media_coverage_collection.find().sort("publish_date", -1).limit(limit))
-        for item in coverage:
-            item["id"] = str(item.pop("_id"))
-        return coverage
-    
+        def load():
+            coverage = list(media_coverage_collection.find().sort("publish_date", -1).limit(limit))
+            for item in coverage:
+                item["id"] = str(item.pop("_id"))
+            return coverage
+
+        return CacheService.get_or_set(CACHE_NAMESPACE, f"media_coverage:{limit}", load)
+
     @staticmethod
     def get_executive_summary() -> dict:
         """Get executive summary data"""
@@ -60,3 +83,9 @@ class CompanyInfoService:
             "awards": CompanyInfoService.get_awards(),
             "media_coverage": CompanyInfoService.get_media_coverage(limit=5)
         }
+
+    @staticmethod
+    def invalidate_cache():
+        """Drop cached company information on every worker and change its ETags"""
+        CacheService.invalidate_namespace(CACHE_NAMESPACE)
+        CollectionVersionService.bump(CACHE_NAMESPACE)
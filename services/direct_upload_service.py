@@ -0,0 +1,159 @@
+import hashlib
+import hmac
+import time
+import uuid
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+from jose import JWTError, jwt
+
+from async_database import documents_collection
+from config import settings
+from services.async_cloudinary_service import cloudinary_client
+from services.cloudinary_service import CloudinaryService
+from services.document_service import DocumentService
+from utils.upload_stream import max_upload_bytes
+
+TICKET_TYPE = "direct_upload"
+TICKET_AUDIENCE = "dataroom:direct-upload"
+TICKET_ALGORITHM = "HS256"
+
+
+def _ticket_key() -> str:
+    """Signing key for tickets, derived from SECRET_KEY so a ticket never verifies as an access token"""
+    return hmac.new(settings.SECRET_KEY.encode("utf-8"), TICKET_AUDIENCE.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+class DirectUploadService:
+    """
+    Browser-to-Cloudinary uploads that never pass through the API server.
+
+    create_upload() signs the Cloudinary upload parameters and issues a
+    short-lived ticket binding them to the admin, target public_id, size cap
+    and document metadata. finalize() accepts the client-reported upload
+    result only if Cloudinary's response signature checks out and it
+    matches the ticket. The size, URL and resource type recorded are read
+    back from Cloudinary's Admin API, since the signature does not cover
+    them; an oversized asset is destroyed.
+    """
+
+    @staticmethod
+    def create_upload(
+        filename: str,
+        categories: List[str],
+        user_id: str,
+        tags: Optional[List[str]] = None,
+        description: Optional[str] = None,
+        file_size: Optional[int] = None,
+    ) -> dict:
+        max_bytes = max_upload_bytes()
+        if file_size is not None and file_size > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File exceeds the {settings.MAX_FILE_SIZE_MB}MB upload limit"
+            )
+
+        resource_type = CloudinaryService.resource_type_for(filename)
+        safe_filename = filename.replace(" ", "_").replace(".", "_")
+        # The folder is part of public_id (no folder param) so Cloudinary returns it unchanged
+        public_id = f"dataroom_documents/{user_id}/{uuid.uuid4()}_{safe_filename}"
+        expires_at = int(time.time()) + settings.DIRECT_UPLOAD_TTL_SECONDS
+
+        ticket = jwt.encode(
+            {
+                "typ": TICKET_TYPE,
+                "aud": TICKET_AUDIENCE,
+                "sub": user_id,
+                "pid": public_id,
+                "rt": resource_type,
+                "fn": filename,
+                "max": max_bytes,
+                "cat": categories,
+                "tags": tags or [],
+                "desc": description or "",
+                "exp": expires_at,
+            },
+            _ticket_key(),
+            algorithm=TICKET_ALGORITHM,
+        )
+
+        return {
+            "upload_url": cloudinary_client.upload_url(resource_type),
+            "params": cloudinary_client.signed_params({"public_id": public_id}),
+            "resource_type": resource_type,
+            "max_file_size": max_bytes,
+            "expires_at": expires_at,
+            "ticket": ticket,
+        }
+
+    @staticmethod
+    def _decode_ticket(ticket: str, user_id: str) -> dict:
+        try:
+            claims = jwt.decode(ticket, _ticket_key(), algorithms=[TICKET_ALGORITHM], audience=TICKET_AUDIENCE)
+        except JWTError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Upload ticket is invalid or expired")
+
+        if claims.get("typ") != TICKET_TYPE:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Upload ticket is invalid or expired")
+        if claims.get("sub") != user_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Upload ticket was issued to another user")
+        return claims
+
+    @staticmethod
+    async def finalize(ticket: str, upload_result: dict, user_id: str) -> dict:
+        """Verify a client-reported Cloudinary upload and create its documents record"""
+        claims = DirectUploadService._decode_ticket(ticket, user_id)
+
+        public_id = upload_result.get("public_id")
+        if public_id != claims["pid"]:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Upload does not match the ticket")
+        if not cloudinary_client.verify_upload_response(public_id, upload_result.get("version"), upload_result.get("signature")):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Upload result signature is invalid")
+
+        # Finalizing twice returns the record created the first time
+        existing = await documents_collection.find_one({"cloudinary_public_id": public_id})
+        if existing:
+            existing["id"] = str(existing.pop("_id"))
+            return existing
+
+        # Only public_id and version are signed: take size, URL and type from Cloudinary itself
+        asset = await cloudinary_client.resource(public_id, resource_type=claims["rt"])
+        if str(asset.get("version")) != str(upload_result.get("version")) or asset.get("resource_type") != claims["rt"]:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Upload does not match the ticket")
+
+        size = int(asset.get("bytes") or 0)
+        if size > claims["max"]:
+            await cloudinary_client.destroy(public_id, resource_type=claims["rt"])
+            raise HTTPException(
+                status_code=413,
+                detail=f"File exceeds the {settings.MAX_FILE_SIZE_MB}MB upload limit"
+            )
+
+        if not asset.get("secure_url"):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file has no delivery URL")
+        for field in ("bytes", "secure_url"):
+            if upload_result.get(field) is not None and str(upload_result[field]) != str(asset.get(field)):
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Upload result {field} does not match the stored file")
+
+        document_data = DocumentService.build_document_record(
+            filename=claims["fn"],
+            stored={
+                "storage_backend": "cloudinary",
+                "storage_key": public_id,
+                "file_url": asset["secure_url"],
+                "cloudinary_public_id": public_id,
+                "cloudinary_resource_type": claims["rt"],
+            },
+            size=size,
+            sha256=None,
+            categories=claims["cat"],
+            user_id=user_id,
+            description=claims["desc"],
+            tags=claims["tags"],
+        )
+        document_data["cloudinary_etag"] = asset.get("etag")
+
+        result = await documents_collection.insert_one(document_data)
+        await DocumentService.documents_changed()
+        document_data["id"] = str(result.inserted_id)
+        return document_data
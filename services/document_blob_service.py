@@ -0,0 +1,75 @@
+from datetime import datetime
+from typing import Awaitable, Callable, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from async_database import document_blobs_collection
+from services.storage_backend import get_storage_backend, storage_backend_for
+
+# Attempts at joining or creating a blob before storing without deduplication
+ACQUIRE_ATTEMPTS = 3
+
+
+class DocumentBlobService:
+    """
+    Content-addressed storage shared between documents.
+
+    Every stored file is recorded once in document_blobs under its SHA-256
+    (unique index) with a reference count. Uploading content that is
+    already stored reuses the existing asset instead of transferring it
+    again; deleting a document only removes the asset with its last
+    reference. Documents whose content has no blob (older uploads, direct
+    browser uploads) own their asset outright.
+    """
+
+    @staticmethod
+    async def acquire(sha256: str, size: int, store: Callable[[], Awaitable[dict]]) -> Tuple[dict, bool]:
+        """
+        Take a reference to stored content with this digest, calling store()
+        to transfer it only when nothing is stored yet. Returns (stored, reused).
+        """
+        for _ in range(ACQUIRE_ATTEMPTS):
+            blob = await document_blobs_collection.find_one_and_update(
+                {"sha256": sha256, "refcount": {"$gt": 0}},
+                {"$inc": {"refcount": 1}, "$set": {"last_referenced_at": datetime.utcnow()}},
+                return_document=ReturnDocument.AFTER,
+            )
+            if blob is not None:
+                return blob["stored"], True
+
+            stored = await store()
+            try:
+                await document_blobs_collection.insert_one({
+                    "sha256": sha256,
+                    "size": size,
+                    "stored": stored,
+                    "refcount": 1,
+                    "created_at": datetime.utcnow(),
+                    "last_referenced_at": datetime.utcnow(),
+                })
+                return stored, False
+            except DuplicateKeyError:
+                # The same content was stored concurrently: keep theirs, drop ours
+                await get_storage_backend(stored["storage_backend"]).delete(stored)
+
+        return await store(), False
+
+    @staticmethod
+    async def release(document: dict) -> None:
+        """Drop a document's reference to its content, deleting the asset with the last one"""
+        sha256 = document.get("content_sha256")
+        if sha256:
+            blob = await document_blobs_collection.find_one_and_update(
+                {"sha256": sha256, "stored.storage_key": document.get("storage_key")},
+                {"$inc": {"refcount": -1}},
+                return_document=ReturnDocument.AFTER,
+            )
+            if blob is not None:
+                if blob["refcount"] > 0:
+                    return
+                # Only the caller that removes the blob record deletes the asset
+                if await document_blobs_collection.find_one_and_delete({"_id": blob["_id"], "refcount": {"$lte": 0}}) is None:
+                    return
+
+        await storage_backend_for(document).delete(document)
@@ -0,0 +1,225 @@
+import asyncio
+import os
+import uuid
+import zipfile
+from datetime import datetime
+from typing import List, Optional
+
+from bson import ObjectId
+from fastapi import HTTPException, status
+
+from async_database import documents_collection
+from config import settings
+from services.document_service import DocumentService
+from services.storage_backend import storage_backend_for
+
+# Everything a bundle needs from each documents record
+BUNDLE_PROJECTION = {
+    "title": 1,
+    "file_url": 1,
+    "file_path": 1,
+    "file_size": 1,
+    "file_extension": 1,
+    "original_filename": 1,
+    "download_filename": 1,
+    "uploaded_at": 1,
+    "storage_backend": 1,
+    "storage_key": 1,
+    "cloudinary_public_id": 1,
+    "cloudinary_resource_type": 1,
+}
+
+# Worth deflating at the normal level; everything else in a data room (PDF, Office, images, zip) is already compressed
+COMPRESSIBLE_EXTENSIONS = {".txt", ".csv"}
+
+# Every entry is deflated: a streamed ZIP_STORED entry needs a data descriptor, which
+# Java's ZipInputStream (and tools built on it) rejects. Level 1 costs little on
+# already-compressed files.
+COMPRESSIBLE_LEVEL = 6
+COMPRESSED_LEVEL = 1
+
+ERRORS_ENTRY_NAME = "_MISSING_FILES.txt"
+
+
+class _ZipSink:
+    """Write-only file object collecting what zipfile writes until it is drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+class DocumentBundleService:
+    """
+    ZIP downloads of several documents, streamed as they are built.
+
+    The archive is written to an unseekable sink, so zipfile uses data
+    descriptors and nothing is buffered beyond the chunks in flight; every
+    entry is deflated so those descriptors stay readable everywhere. Up to
+    BUNDLE_FETCH_CONCURRENCY files are fetched from storage at once, each
+    through a queue of at most BUNDLE_PREFETCH_CHUNKS chunks, while entries
+    are written in order. A file that cannot be fetched is left out (or
+    ends short if it failed part way) and listed in _MISSING_FILES.txt.
+    """
+
+    @staticmethod
+    async def select_documents(category: Optional[str] = None, document_ids: Optional[List[str]] = None) -> List[dict]:
+        """Documents of a category (newest first) or a selection (in the given order)"""
+        if bool(category) == bool(document_ids):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Provide either a category or a list of document ids"
+            )
+
+        if category:
+            documents = await documents_collection.find(
+                {"categories": category}, BUNDLE_PROJECTION
+            ).sort([("uploaded_at", -1), ("_id", -1)]).to_list(length=settings.BUNDLE_MAX_DOCUMENTS + 1)
+        else:
+            try:
+                object_ids = list(dict.fromkeys(ObjectId(document_id) for document_id in document_ids))
+            except Exception:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid document id")
+            if len(object_ids) > settings.BUNDLE_MAX_DOCUMENTS:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"A bundle can hold at most {settings.BUNDLE_MAX_DOCUMENTS} documents"
+                )
+            found = await documents_collection.find(
+                {"_id": {"$in": object_ids}}, BUNDLE_PROJECTION
+            ).to_list(length=None)
+            by_id = {document["_id"]: document for document in found}
+            documents = [by_id[object_id] for object_id in object_ids if object_id in by_id]
+
+        if not documents:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No documents to download")
+        if len(documents) > settings.BUNDLE_MAX_DOCUMENTS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"A bundle can hold at most {settings.BUNDLE_MAX_DOCUMENTS} documents"
+            )
+
+        total_size = sum(document.get("file_size") or 0 for document in documents)
+        if total_size > settings.BUNDLE_MAX_TOTAL_MB * 1024 * 1024:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Bundle exceeds the {settings.BUNDLE_MAX_TOTAL_MB}MB limit, select fewer documents"
+            )
+        return documents
+
+    @staticmethod
+    def entry_names(documents: List[dict]) -> List[str]:
+        """Flat, unique archive names taken from each document's download filename"""
+        names = []
+        seen = set()
+        for document in documents:
+            name = document.get("download_filename") or document.get("original_filename") or document.get("title") or "document"
+            name = name.replace("/", "_").replace("\\", "_").strip() or "document"
+            stem, extension = os.path.splitext(name)
+            candidate = name
+            counter = 2
+            while candidate.lower() in seen:
+                candidate = f"{stem} ({counter}){extension}"
+                counter += 1
+            seen.add(candidate.lower())
+            names.append(candidate)
+        return names
+
+    @staticmethod
+    async def _fetch(document: dict, queue: asyncio.Queue, semaphore: asyncio.Semaphore) -> None:
+        """Feed a document's chunks into its queue, ending with None or the exception raised"""
+        try:
+            async with semaphore:
+                stream = storage_backend_for(document).stream(document, settings.BUNDLE_CHUNK_KB * 1024)
+                async for chunk in stream:
+                    await queue.put(chunk)
+            await queue.put(None)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(e)
+
+    @staticmethod
+    async def stream_bundle(documents: List[dict], on_complete=None):
+        """
+        Yield the ZIP archive of documents chunk by chunk.
+
+        on_complete(delivered_ids) is called once the stream ends (or the
+        client goes away) with the ids of the files written in full.
+        """
+        semaphore = asyncio.Semaphore(settings.BUNDLE_FETCH_CONCURRENCY)
+        queues = [asyncio.Queue(maxsize=settings.BUNDLE_PREFETCH_CHUNKS) for _ in documents]
+        # Tasks start in order, so the semaphore hands out fetch slots in archive order
+        tasks = [
+            asyncio.create_task(DocumentBundleService._fetch(document, queue, semaphore))
+            for document, queue in zip(documents, queues)
+        ]
+
+        sink = _ZipSink()
+        delivered = []
+        missing = []
+        try:
+            with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+                for document, name, queue in zip(documents, DocumentBundleService.entry_names(documents), queues):
+                    first = await queue.get()
+                    if isinstance(first, Exception):
+                        missing.append(f"{name}: {getattr(first, 'detail', None) or first}")
+                        continue
+
+                    info = zipfile.ZipInfo(name, date_time=(document.get("uploaded_at") or datetime.utcnow()).timetuple()[:6])
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    # No public setter before Python 3.13 (compress_level)
+                    info._compresslevel = COMPRESSIBLE_LEVEL if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS else COMPRESSED_LEVEL
+                    info.file_size = document.get("file_size") or 0
+
+                    chunk = first
+                    with archive.open(info, "w") as entry:
+                        while chunk is not None:
+                            if isinstance(chunk, Exception):
+                                missing.append(f"{name}: incomplete ({getattr(chunk, 'detail', None) or chunk})")
+                                break
+                            entry.write(chunk)
+                            yield sink.drain()
+                            chunk = await queue.get()
+                        else:
+                            delivered.append(str(document["_id"]))
+                    yield sink.drain()
+
+                if missing:
+                    archive.writestr(
+                        ERRORS_ENTRY_NAME,
+                        "These files could not be included in the download:\n" + "\n".join(missing) + "\n"
+                    )
+            yield sink.drain()
+        finally:
+            for task in tasks:
+                task.cancel()
+            if on_complete is not None:
+                on_complete(delivered)
+
+    @staticmethod
+    def access_logger(user_data: dict, ip_address: Optional[str], user_agent: Optional[str]):
+        """on_complete callback logging one download per delivered file, queued as one batch"""
+        bundle_id = uuid.uuid4().hex
+
+        def log(document_ids: List[str]) -> None:
+            DocumentService.log_bundle_access(
+                document_ids=document_ids,
+                bundle_id=bundle_id,
+                user_id=user_data["id"],
+                ip_address=ip_address,
+                user_agent=user_agent,
+                user_email=user_data.get("email") or user_data.get("full_name"),
+            )
+
+        return log
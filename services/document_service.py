@@ -1,18 +1,115 @@
-import uuid
+import asyncio
+import base64
+import json
 import os
 import mimetypes
+import re
 from datetime import datetime
 from typing import List, Optional
 from bson import ObjectId
 from fastapi import HTTPException, status
+from pymongo.errors import BulkWriteError
 
-from services.cloudinary_service import CloudinaryService
+from services.storage_backend import get_storage_backend, storage_backend_for
+from services.document_blob_service import DocumentBlobService
+from services.rendition_service import renditions
 from utils.cloudinary_config import initialize_cloudinary
-from database import documents_collection, document_access_logs_collection
+from async_database import documents_collection, document_versions_collection
+from services.access_log_buffer import access_log_buffer
+from services.cache_service import CacheService
+from services.collection_version_service import CollectionVersionService
+from utils.ttl_cache import TTLCache
+from utils.upload_stream import measure_upload
+from utils.document_delivery import DELIVERY_PROJECTION, delivery_fields, thumbnail_url
+from config import settings
 
 # Initialize Cloudinary once
 initialize_cloudinary()
 
+# Fields returned by listings (everything DocumentResponse needs)
+DOCUMENT_LIST_PROJECTION = {
+    "title": 1,
+    "description": 1,
+    "file_path": 1,
+    "file_url": 1,
+    "file_type": 1,
+    "file_extension": 1,
+    "categories": 1,
+    "file_size": 1,
+    "uploaded_at": 1,
+    "uploaded_by": 1,
+    "tags": 1,
+    "view_count": 1,
+    "download_count": 1,
+}
+
+# Newest first; _id breaks ties between documents uploaded in the same millisecond
+DOCUMENT_LIST_SORT = [("uploaded_at", -1), ("_id", -1)]
+
+
+CACHE_NAMESPACE = "document"
+
+# Hot document metadata keyed by (document_id, "document" | "delivery").
+# Entries are dropped when an access log flush changes their view/download counters.
+_document_cache = TTLCache(
+    maxsize=settings.DOCUMENT_CACHE_MAX_ENTRIES,
+    ttl=settings.DOCUMENT_CACHE_TTL_SECONDS,
+    track_keys=settings.DOCUMENT_CACHE_MAX_ENTRIES * 4,
+)
+
+# Bumped on every local invalidation so a read that raced a write is not cached
+_cache_generation = [0]
+
+# Text search results: most relevant first
+DOCUMENT_SEARCH_SORT = {"score": -1, "_id": -1}
+
+# Tag facet buckets returned with search results
+SEARCH_TAG_FACET_LIMIT = 50
+
+
+def encode_cursor(document: dict, by_score: bool = False) -> str:
+    """Opaque keyset cursor pointing just past `document` in listing (or search relevance) order"""
+    if by_score:
+        payload = {"s": document["score"], "i": str(document["_id"])}
+    else:
+        uploaded_at = document.get("uploaded_at")
+        payload = {
+            "t": uploaded_at.isoformat() if isinstance(uploaded_at, datetime) else None,
+            "i": str(document["_id"]),
+        }
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, by_score: bool = False) -> dict:
+    """Turn a cursor back into the filter selecting everything after it"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_id = ObjectId(payload["i"])
+        if by_score:
+            score = float(payload["s"])
+        elif "s" in payload:
+            raise ValueError("relevance cursor used for a listing")
+        else:
+            uploaded_at = datetime.fromisoformat(payload["t"]) if payload.get("t") else None
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    if by_score:
+        return {"$or": [
+            {"score": {"$lt": score}},
+            {"score": score, "_id": {"$lt": last_id}},
+        ]}
+
+    # Documents without uploaded_at sort last
+    if uploaded_at is None:
+        return {"uploaded_at": None, "_id": {"$lt": last_id}}
+    return {"$or": [
+        {"uploaded_at": {"$lt": uploaded_at}},
+        {"uploaded_at": uploaded_at, "_id": {"$lt": last_id}},
+        {"uploaded_at": None},
+    ]}
+
 
 class DocumentService:
     @staticmethod
@@ -24,130 +121,495 @@ class DocumentService:
         tags: Optional[List[str]] = None,
         title: Optional[str] = None,
     ):
-        # Ensure tags is a list
-        if tags is None:
-            tags = []
+        # Stream the upload once: enforce MAX_FILE_SIZE_MB and hash it without buffering it
+        measured = await measure_upload(file)
+
+        document_data = await DocumentService.prepare_document(
+            file_obj=file.file,
+            filename=file.filename,
+            measured=measured,
+            categories=categories,
+            user_id=user_id,
+            description=description,
+            tags=tags,
+            title=title,
+        )
 
-        filename = file.filename
-        title = title or filename
+        # Insert into MongoDB; without a record nothing would ever release the content reference
+        try:
+            result = await documents_collection.insert_one(document_data)
+        except BaseException:
+            await DocumentService.release_content(document_data)
+            raise
+        document_data["id"] = str(result.inserted_id)
+        await DocumentService.documents_changed()
         
-        # Extract file extension and MIME type
-        file_extension = os.path.splitext(filename)[1].lower() if filename else ""
-        mime_type, _ = mimetypes.guess_type(filename)
-        if not mime_type:
-            mime_type = "application/octet-stream"
+        # Images get their thumbnail/preview while the upload is still at hand
+        await renditions.pregenerate(document_data, file.file)
+        document_data["thumbnail_url"] = thumbnail_url(document_data)
+        return document_data
 
-        # Read file bytes
-        file_bytes = await file.read()
+    @staticmethod
+    async def upload_documents_batch(items: List[dict], user_id: str) -> List[dict]:
+        """
+        Upload many files concurrently and insert their records with one insert_many.
+        
+        Each item holds file, categories, tags and description, or an "error"
+        already found while validating it. At most UPLOAD_BATCH_CONCURRENCY
+        transfers run at once. Returns one result per item, in order; a failed
+        file never aborts the rest of the batch.
+        """
+        semaphore = asyncio.Semaphore(settings.UPLOAD_BATCH_CONCURRENCY)
+        
+        async def transfer(item: dict):
+            if item.get("error"):
+                return None, item["error"]
+            file = item["file"]
+            try:
+                async with semaphore:
+                    measured = await measure_upload(file)
+                    document_data = await DocumentService.prepare_document(
+                        file_obj=file.file,
+                        filename=file.filename,
+                        measured=measured,
+                        categories=item["categories"],
+                        user_id=user_id,
+                        description=item.get("description"),
+                        tags=item.get("tags"),
+                    )
+                return document_data, None
+            except HTTPException as e:
+                return None, e.detail
+            except Exception as e:
+                return None, str(e)
+        
+        outcomes = await asyncio.gather(*(transfer(item) for item in items))
+        
+        documents = [document for document, _ in outcomes if document is not None]
+        insert_errors = {}
+        if documents:
+            # insert_many sets _id on each record in place
+            try:
+                await documents_collection.insert_many(documents, ordered=False)
+            except BulkWriteError as e:
+                # The other records were inserted; report the failed ones per file
+                for write_error in e.details.get("writeErrors", []):
+                    insert_errors[id(documents[write_error["index"]])] = write_error.get("errmsg", "Could not save document")
+            await DocumentService.documents_changed()
+        
+        results = []
+        for item, (document, error) in zip(items, outcomes):
+            filename = item["file"].filename if item.get("file") else item.get("filename")
+            if document is not None and id(document) in insert_errors:
+                # Its stored content stays with no record pointing at it: give the reference back
+                await DocumentService.release_content(document)
+                results.append({"filename": filename, "success": False, "error": insert_errors[id(document)]})
+            elif document is not None:
+                results.append({"filename": filename, "success": True, "document_id": str(document["_id"])})
+            else:
+                results.append({"filename": filename, "success": False, "error": error})
+        return results
 
-        # Generate unique public ID
-        safe_filename = filename.replace(" ", "_").replace(".", "_")
-        public_id = f"dataroom_documents/{user_id}/{uuid.uuid4()}_{safe_filename}"
+    @staticmethod
+    async def prepare_document(
+        file_obj,
+        filename: str,
+        measured: dict,
+        categories: List[str],
+        user_id: str,
+        description: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        title: Optional[str] = None,
+        progress=None,
+    ) -> dict:
+        """Store an already measured file and build its documents record (not inserted)"""
+        # The _id is fixed up front so backends can embed it in the file URL
+        document_id = ObjectId()
+        stored = await DocumentService.store_file(file_obj, filename, measured, user_id, document_id, progress)
 
-        # Upload to Cloudinary
-        upload_result = CloudinaryService.upload_file_from_bytes(
-            file_bytes=file_bytes,
+        record = DocumentService.build_document_record(
             filename=filename,
-            public_id=public_id,
-            folder="dataroom_documents",
+            stored=stored,
+            size=measured["size"],
+            sha256=measured["sha256"],
+            categories=categories,
+            user_id=user_id,
+            description=description,
+            tags=tags,
+            title=title,
         )
+        record["_id"] = document_id
+        return record
 
-        # Prepare document data for MongoDB
-        document_data = {
-            "title": title,
+    @staticmethod
+    async def store_file(file_obj, filename: str, measured: dict, user_id: str, document_id: ObjectId, progress=None) -> dict:
+        """Store a measured file with the configured backend and return its storage fields
+        
+        Content that is already stored (same SHA-256) is referenced instead
+        of being transferred again.
+        """
+        async def store():
+            return await get_storage_backend().save(
+                file_obj,
+                filename=filename,
+                user_id=user_id,
+                document_id=document_id,
+                progress=progress,
+            )
+        
+        if measured.get("sha256"):
+            stored, reused = await DocumentBlobService.acquire(measured["sha256"], measured["size"], store)
+            if reused:
+                print(f"Reusing stored content {measured['sha256'][:12]} for {filename}")
+                if progress:
+                    await progress(measured["size"], measured["size"])
+        else:
+            stored = await store()
+        return {**stored, "file_url": storage_backend_for(stored).url_for(stored, document_id)}
+
+    @staticmethod
+    def build_document_record(
+        filename: str,
+        stored: dict,
+        size: int,
+        sha256: Optional[str],
+        categories: List[str],
+        user_id: str,
+        description: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        title: Optional[str] = None,
+    ) -> dict:
+        """Shape the documents record for a stored file (`stored` comes from StorageBackend.save)"""
+        record = {
+            "title": title or filename,
             "description": description or "",
             "categories": categories,
-            "file_path": upload_result["secure_url"],
-            "file_url": upload_result["secure_url"],  
-            "file_type": file_extension,  # Store actual file extension
-            "file_extension": file_extension,
-            "mime_type": mime_type,
-            "original_filename": filename,
-            "file_size": upload_result["bytes"],
+            **DocumentService.file_fields(filename, stored, size, sha256),
             "uploaded_at": datetime.utcnow(),
             "uploaded_by": user_id,
-            "tags": tags,
+            "tags": tags or [],
             "view_count": 0,
             "download_count": 0,
-            "cloudinary_public_id": upload_result["public_id"],
-            "cloudinary_resource_type": upload_result.get("resource_type", "raw"),
         }
+        record.update(delivery_fields(record))
+        return record
 
-        # Insert into MongoDB
-        result = documents_collection.insert_one(document_data)
-        document_data["id"] = str(result.inserted_id)
-        return document_data
+    @staticmethod
+    def file_fields(filename: str, stored: dict, size: int, sha256: Optional[str]) -> dict:
+        """The fields describing a document's file (shared by documents and document_versions)"""
+        # Extract file extension and MIME type
+        file_extension = os.path.splitext(filename)[1].lower() if filename else ""
+        mime_type, _ = mimetypes.guess_type(filename)
+        if not mime_type:
+            mime_type = "application/octet-stream"
+
+        return {
+            "file_path": stored["file_url"],
+            "file_url": stored["file_url"],
+            "file_type": file_extension,  # Store actual file extension
+            "file_extension": file_extension,
+            "mime_type": mime_type,
+            "original_filename": filename,
+            "file_size": size,
+            "content_sha256": sha256,
+            "storage_backend": stored["storage_backend"],
+            "storage_key": stored["storage_key"],
+            "cloudinary_public_id": stored.get("cloudinary_public_id"),
+            "cloudinary_resource_type": stored.get("cloudinary_resource_type"),
+        }
 
     @staticmethod
-    def list_documents(
+    async def list_documents(
         categories: Optional[List[str]] = None,
         tags: Optional[List[str]] = None,
         search: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
     ):
-        """List documents with optional filters"""
-        query = {}
+        """List documents with optional filters, newest first
+        
+        With a limit or cursor, pages are keyset-paginated on (uploaded_at, _id).
+        Without either, every matching document is returned in one list, as
+        listings always did. Only the fields DocumentResponse needs are
+        fetched. Returns (documents, next_cursor); next_cursor is None on the
+        last page and when not paginating.
+        """
+        paginate = limit is not None or cursor is not None
+        if search and search.strip():
+            page = await DocumentService.search_documents(
+                search, categories=categories, tags=tags, limit=limit, cursor=cursor, facets=False, paginate=paginate
+            )
+            return page["documents"], page["next_cursor"]
+        
+        limit = min(limit or settings.DOCUMENT_LIST_DEFAULT_LIMIT, settings.DOCUMENT_LIST_MAX_LIMIT)
+        conditions = []
         
         if categories:
-            query["categories"] = {"$in": categories}
+            conditions.append({"categories": {"$in": categories}})
         
         if tags:
-            query["tags"] = {"$in": tags}
+            conditions.append({"tags": {"$in": tags}})
         
-        if search:
-            query["$or"] = [
-                {"title": {"$regex": search, "$options": "i"}},
-                {"description": {"$regex": search, "$options": "i"}},
-            ]
+        if cursor:
+            conditions.append(decode_cursor(cursor))
+        
+        query = {"$and": conditions} if len(conditions) > 1 else (conditions[0] if conditions else {})
         
-        documents = list(documents_collection.find(query))
+        find = documents_collection.find(query, DOCUMENT_LIST_PROJECTION).sort(DOCUMENT_LIST_SORT)
+        if not paginate:
+            documents = await find.to_list(length=None)
+        else:
+            # One extra document tells us whether there is a next page
+            documents = await find.limit(limit + 1).to_list(length=limit + 1)
+        
+        next_cursor = None
+        if paginate and len(documents) > limit:
+            documents = documents[:limit]
+            next_cursor = encode_cursor(documents[-1])
         
         # Convert ObjectId to string and ensure file_url exists
         for doc in documents:
-            doc["id"] = str(doc["_id"])
+            doc["id"] = str(doc.pop("_id"))
             if "file_url" not in doc and "file_path" in doc:
                 doc["file_url"] = doc["file_path"]
+            doc["thumbnail_url"] = thumbnail_url(doc)
         
-        return documents
+        return documents, next_cursor
 
     @staticmethod
-    def get_document_by_id(document_id: str):
-        """Get a single document by ID"""
+    async def search_documents(
+        search: str,
+        categories: Optional[List[str]] = None,
+        tags: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        facets: bool = True,
+        paginate: bool = True,
+    ) -> dict:
+        """Search documents through the document_search_index text index
+        
+        Results are ranked by textScore and paginated on (score, _id). Terms
+        shorter than DOCUMENT_TEXT_SEARCH_MIN_LENGTH can't be matched by the
+        text index (it only matches whole stemmed words), so they fall back
+        to a case-insensitive title prefix match in listing order. The first
+        page also carries the total and per-category/per-tag counts, all
+        computed by one $facet aggregation. paginate=False returns every
+        match in one page.
+        """
+        limit = min(limit or settings.DOCUMENT_LIST_DEFAULT_LIMIT, settings.DOCUMENT_LIST_MAX_LIMIT)
+        term = search.strip()
+        by_score = len(term) >= settings.DOCUMENT_TEXT_SEARCH_MIN_LENGTH
+        
+        match = {}
+        if by_score:
+            match["$text"] = {"$search": term}
+        else:
+            match["title"] = {"$regex": f"^{re.escape(term)}", "$options": "i"}
+        if categories:
+            match["categories"] = {"$in": categories}
+        if tags:
+            match["tags"] = {"$in": tags}
+        
+        pipeline = [{"$match": match}]
+        if by_score:
+            pipeline.append({"$addFields": {"score": {"$meta": "textScore"}}})
+        
+        results = []
+        if cursor:
+            results.append({"$match": decode_cursor(cursor, by_score=by_score)})
+        results.append({"$sort": DOCUMENT_SEARCH_SORT if by_score else dict(DOCUMENT_LIST_SORT)})
+        if paginate:
+            results.append({"$limit": limit + 1})
+        results.append({"$project": {**DOCUMENT_LIST_PROJECTION, **({"score": 1} if by_score else {})}})
+        
+        facet = {"results": results}
+        # Counts don't change between pages, so only the first page pays for them
+        with_facets = facets and not cursor
+        if with_facets:
+            facet["total"] = [{"$count": "count"}]
+            facet["categories"] = [
+                {"$unwind": "$categories"},
+                {"$group": {"_id": "$categories", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+            ]
+            facet["tags"] = [
+                {"$unwind": "$tags"},
+                {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1, "_id": 1}},
+                {"$limit": SEARCH_TAG_FACET_LIMIT},
+            ]
+        pipeline.append({"$facet": facet})
+        
+        output = (await documents_collection.aggregate(pipeline).to_list(length=1))[0]
+        
+        documents = output["results"]
+        next_cursor = None
+        if paginate and len(documents) > limit:
+            documents = documents[:limit]
+            next_cursor = encode_cursor(documents[-1], by_score=by_score)
+        
+        for doc in documents:
+            doc["id"] = str(doc.pop("_id"))
+            if "file_url" not in doc and "file_path" in doc:
+                doc["file_url"] = doc["file_path"]
+            doc["thumbnail_url"] = thumbnail_url(doc)
+        
+        page = {"documents": documents, "next_cursor": next_cursor, "mode": "text" if by_score else "prefix"}
+        if with_facets:
+            page["total"] = output["total"][0]["count"] if output["total"] else 0
+            page["facets"] = {
+                "categories": [{"value": b["_id"], "count": b["count"]} for b in output["categories"]],
+                "tags": [{"value": b["_id"], "count": b["count"]} for b in output["tags"]],
+            }
+        return page
+
+    @staticmethod
+    async def get_document_by_id(document_id: str):
+        """Get a single document by ID (served from the hot document cache when possible)"""
+        cached = _document_cache.get((document_id, "document"))
+        if cached is not None:
+            return dict(cached)
+        
+        generation = _cache_generation[0]
         try:
-            document = documents_collection.find_one({"_id": ObjectId(document_id)})
+            document = await documents_collection.find_one({"_id": ObjectId(document_id)})
             if not document:
                 return None
             
             document["id"] = str(document["_id"])
             if "file_url" not in document and "file_path" in document:
                 document["file_url"] = document["file_path"]
-            
-            return document
+            document["thumbnail_url"] = thumbnail_url(document)
         except Exception:
             return None
+        
+        if generation == _cache_generation[0]:
+            _document_cache.set((document_id, "document"), document)
+        return dict(document)
 
     @staticmethod
-    def get_document_url(document_id: str):
-        document = documents_collection.find_one({"_id": ObjectId(document_id)})
+    async def get_document_url(document_id: str):
+        document = await documents_collection.find_one({"_id": ObjectId(document_id)})
         if not document:
             raise HTTPException(status_code=404, detail="Document not found")
         return document.get("file_url") or document.get("file_path")
 
     @staticmethod
-    def delete_document(document_id: str):
-        document = documents_collection.find_one({"_id": ObjectId(document_id)})
+    async def get_delivery_info(document_id: str) -> dict:
+        """Preview/download metadata for a document in one projected read (cached)"""
+        cached = _document_cache.get((document_id, "delivery"))
+        if cached is not None:
+            return dict(cached)
+        
+        try:
+            object_id = ObjectId(document_id)
+        except Exception:
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        generation = _cache_generation[0]
+        document = await documents_collection.find_one({"_id": object_id}, DELIVERY_PROJECTION)
         if not document:
             raise HTTPException(status_code=404, detail="Document not found")
+        
+        # Not backfilled yet: derive in memory rather than failing
+        if "delivery_version" not in document:
+            document.update(delivery_fields(document))
+        
+        if generation == _cache_generation[0]:
+            _document_cache.set((document_id, "delivery"), document)
+        return dict(document)
 
-        CloudinaryService.delete_file(
-            public_id=document["cloudinary_public_id"],
-            resource_type=document["cloudinary_resource_type"],
+    @staticmethod
+    async def update_document(document_id: str, update_data: dict):
+        """Apply a metadata update, keeping the stored delivery fields in step with the title"""
+        document = await documents_collection.find_one({"_id": ObjectId(document_id)})
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
+        
+        update_data = dict(update_data)
+        update_data.update(delivery_fields({**document, **update_data}))
+        update_data["updated_at"] = datetime.utcnow()
+        await documents_collection.update_one(
+            {"_id": ObjectId(document_id)},
+            {"$set": update_data}
         )
+        await DocumentService.documents_changed(document_id)
+        return {**document, **update_data}
 
-        documents_collection.delete_one({"_id": ObjectId(document_id)})
+    @staticmethod
+    async def delete_document(document_id: str):
+        # Claiming the record first means concurrent deletes release its content only once
+        document = await documents_collection.find_one_and_delete({"_id": ObjectId(document_id)})
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        await DocumentService.documents_changed(document_id)
+        await DocumentService.release_content(document)
+
+        # Files only superseded versions still reference go with the history
+        versions = await document_versions_collection.find(
+            {"document_id": document_id, "is_current": False}
+        ).to_list(length=None)
+        for version in versions:
+            await DocumentService.release_content(version)
+            await renditions.discard(version)
+        await document_versions_collection.delete_many({"document_id": document_id})
+        await renditions.discard(document)
         return {"message": "Document deleted successfully"}
 
     @staticmethod
-    def get_category_stats():
+    async def release_content(record: dict) -> None:
+        """Release a record's stored content; a storage failure is logged rather than aborting the caller's cleanup"""
+        try:
+            await DocumentBlobService.release(record)
+        except Exception as e:
+            location = record.get("storage_key") or record.get("cloudinary_public_id") or record.get("file_url")
+            print(f"Could not delete stored content {record.get('storage_backend') or 'cloudinary'}:{location}, left orphaned: {e}")
+
+    # Hot document cache
+
+    @staticmethod
+    def _drop_local(document_id: str) -> int:
+        _cache_generation[0] += 1
+        if document_id == "*":
+            count = len(_document_cache)
+            _document_cache.clear()
+            return count
+        return _document_cache.delete_where(lambda key: key[0] == document_id)
+
+    @staticmethod
+    async def invalidate(document_id: str) -> None:
+        """Drop a document's cached metadata on every worker (call after any write to it)"""
+        await CacheService.publish_invalidation_async(CACHE_NAMESPACE, str(document_id))
+
+    @staticmethod
+    async def documents_changed(document_id: Optional[str] = None) -> None:
+        """Call after any write to documents: changes listing ETags and drops the document's cached copy"""
+        await CollectionVersionService.bump_async("documents")
+        if document_id:
+            await DocumentService.invalidate(document_id)
+
+    @staticmethod
+    async def counters_flushed(document_ids: List[str]) -> None:
+        """Access log flush wrote view/download counters: responses carrying them changed"""
+        await CollectionVersionService.bump_async("documents")
+        for document_id in document_ids:
+            await DocumentService.invalidate(document_id)
+
+    @staticmethod
+    def cache_stats() -> dict:
+        return _document_cache.stats()
+
+    @staticmethod
+    def cache_key_stats(limit: int = 20) -> List[dict]:
+        """Hit/miss counts for the most requested documents"""
+        return [
+            {"document_id": entry["key"][0], "kind": entry["key"][1], "hits": entry["hits"], "misses": entry["misses"]}
+            for entry in _document_cache.key_stats(limit)
+        ]
+
+    @staticmethod
+    async def get_category_stats():
         """Get document count by category"""
         pipeline = [
             {"$unwind": "$categories"},
@@ -155,10 +617,10 @@ class DocumentService:
             {"$sort": {"count": -1}},
         ]
         
-        results = list(documents_collection.aggregate(pipeline))
+        results = await documents_collection.aggregate(pipeline).to_list(length=None)
         
         stats = {
-            "total_documents": documents_collection.count_documents({}),
+            "total_documents": await documents_collection.count_documents({}),
             "by_category": [
                 {"category": r["_id"], "count": r["count"]} for r in results
             ],
@@ -172,40 +634,49 @@ class DocumentService:
         user_id: str,
         action: str,
         ip_address: str = None,
-        user_agent: str = None
+        user_agent: str = None,
+        user_email: str = None
     ):
-        """Log document access (view/download) for analytics"""
-        from database import investors_collection
+        """Log document access (view/download) for analytics
         
-        # Try to get user email for display
-        user_email = None
-        try:
-            user = investors_collection.find_one({"_id": ObjectId(user_id)})
-            if user:
-                user_email = user.get("email", user.get("full_name", user_id))
-        except:
-            user_email = user_id
-        
-        log_entry = {
+        The entry and the document's view/download counter are written in
+        batches by the access log buffer, so this never waits on MongoDB.
+        """
+        access_log_buffer.add({
             "document_id": document_id,
             "user_id": user_id,
-            "user_email": user_email,
+            "user_email": user_email or user_id,
             "action": action,
             "ip_address": ip_address,
             "user_agent": user_agent,
             "accessed_at": datetime.utcnow(),
-        }
-        
-        document_access_logs_collection.insert_one(log_entry)
-        
-        # Also increment the view/download count on the document
-        if action == "view":
-            documents_collection.update_one(
-                {"_id": ObjectId(document_id)},
-                {"$inc": {"view_count": 1}}
-            )
-        elif action == "download":
-            documents_collection.update_one(
-                {"_id": ObjectId(document_id)},
-                {"$inc": {"download_count": 1}}
-            )
\ No newline at end of file
+        })
+
+    @staticmethod
+    def log_bundle_access(
+        document_ids: List[str],
+        bundle_id: str,
+        user_id: str,
+        ip_address: str = None,
+        user_agent: str = None,
+        user_email: str = None
+    ):
+        """Log a bundle download: one download entry per file, queued as a single batch"""
+        accessed_at = datetime.utcnow()
+        access_log_buffer.add_many([
+            {
+                "document_id": document_id,
+                "user_id": user_id,
+                "user_email": user_email or user_id,
+                "action": "download",
+                "bundle_id": bundle_id,
+                "ip_address": ip_address,
+                "user_agent": user_agent,
+                "accessed_at": accessed_at,
+            }
+            for document_id in document_ids
+        ])
+
+
+CacheService.on_invalidate(CACHE_NAMESPACE, DocumentService._drop_local)
+access_log_buffer.on_counters_flushed(DocumentService.counters_flushed)
@@ -0,0 +1,207 @@
+from datetime import datetime
+from typing import List, Optional
+
+from bson import ObjectId
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from async_database import documents_collection, document_versions_collection
+from services.document_service import DocumentService
+from services.rendition_service import renditions
+from utils.document_delivery import delivery_fields
+from utils.upload_stream import measure_upload
+
+# File fields copied between a document and its version records
+VERSION_FILE_FIELDS = (
+    "file_path",
+    "file_url",
+    "file_type",
+    "file_extension",
+    "mime_type",
+    "original_filename",
+    "file_size",
+    "content_sha256",
+    "storage_backend",
+    "storage_key",
+    "cloudinary_public_id",
+    "cloudinary_resource_type",
+)
+
+# Attempts at moving the is_current flag when racing a newer version
+CURRENT_FLAG_ATTEMPTS = 3
+
+
+class DocumentVersionService:
+    """
+    File history for documents, kept in document_versions.
+
+    The documents record stays the entry point: it always describes the
+    current file and keeps its own id, title, categories, counters and
+    access logs. Each upload of a new file appends a version record; a
+    partial unique index on {document_id} where is_current is true makes
+    the current-version lookup a single index hit however long the
+    history is.
+
+    Content references: the documents record holds the reference to the
+    current file and every non-current version record holds one for its
+    own file, so superseded files survive until the document is deleted.
+    """
+
+    @staticmethod
+    def _version_record(document_id: str, version_number: int, fields: dict, title: str,
+                        uploaded_by: str, upload_date: datetime, change_note: Optional[str], is_current: bool) -> dict:
+        record = {key: fields.get(key) for key in VERSION_FILE_FIELDS}
+        # Older documents only recorded file_path
+        record["file_url"] = record["file_url"] or record["file_path"]
+        record["file_path"] = record["file_path"] or record["file_url"]
+        if record.get("storage_backend") == "local":
+            # Local files are served by the API; the document's own URL always serves the current file
+            url = f"/api/documents/{document_id}/versions/{version_number}/download"
+            record["file_url"] = record["file_path"] = url
+        record.update(delivery_fields({**record, "title": title}))
+        record.update({
+            "document_id": document_id,
+            "version_number": version_number,
+            "is_current": is_current,
+            "uploaded_by": uploaded_by,
+            "upload_date": upload_date,
+            "change_note": change_note or "",
+        })
+        return record
+
+    @staticmethod
+    async def _ensure_baseline(document: dict) -> None:
+        """Record a document's original file as version 1 the first time it gets a new version"""
+        document_id = str(document["_id"])
+        result = await documents_collection.update_one(
+            {"_id": document["_id"], "current_version": {"$exists": False}},
+            {"$set": {"current_version": 1}},
+        )
+        if not result.modified_count:
+            return
+
+        baseline = DocumentVersionService._version_record(
+            document_id, 1, document, document.get("title", ""),
+            uploaded_by=document.get("uploaded_by", ""),
+            upload_date=document.get("uploaded_at") or datetime.utcnow(),
+            change_note="Original upload",
+            is_current=True,
+        )
+        try:
+            await document_versions_collection.insert_one(baseline)
+        except DuplicateKeyError:
+            pass
+
+    @staticmethod
+    async def _mark_current(document_id: str, version_number: int) -> None:
+        """Move the is_current flag to version_number unless a newer version has taken over"""
+        for _ in range(CURRENT_FLAG_ATTEMPTS):
+            await document_versions_collection.update_many(
+                {"document_id": document_id, "is_current": True, "version_number": {"$ne": version_number}},
+                {"$set": {"is_current": False, "superseded_at": datetime.utcnow()}},
+            )
+            try:
+                await document_versions_collection.update_one(
+                    {"document_id": document_id, "version_number": version_number},
+                    {"$set": {"is_current": True}},
+                )
+                return
+            except DuplicateKeyError:
+                # Another upload flagged its version in between; retry only if ours is still the newest
+                document = await documents_collection.find_one({"_id": ObjectId(document_id)}, {"current_version": 1})
+                if not document or document.get("current_version") != version_number:
+                    return
+
+    @staticmethod
+    async def upload_new_version(document_id: str, file, user_id: str, change_note: Optional[str] = None) -> dict:
+        """Replace a document's file, keeping the previous one in its history"""
+        try:
+            object_id = ObjectId(document_id)
+        except Exception:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+
+        document = await documents_collection.find_one({"_id": object_id})
+        if not document:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+
+        measured = await measure_upload(file)
+        await DocumentVersionService._ensure_baseline(document)
+
+        # Store first: a failed transfer must not leave a reserved version without a record
+        stored = await DocumentService.store_file(file.file, file.filename, measured, user_id, object_id)
+        fields = DocumentService.file_fields(file.filename, stored, measured["size"], measured["sha256"])
+        now = datetime.utcnow()
+
+        # Reserve the version number; concurrent uploads each get their own
+        reserved = await documents_collection.find_one_and_update(
+            {"_id": object_id},
+            {"$inc": {"current_version": 1}},
+            projection={"current_version": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if reserved is None:
+            await DocumentService.release_content(fields)
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
+        version_number = reserved["current_version"]
+
+        version = DocumentVersionService._version_record(
+            document_id, version_number, fields, document.get("title", ""),
+            uploaded_by=user_id, upload_date=now, change_note=change_note, is_current=False,
+        )
+        try:
+            await document_versions_collection.insert_one(version)
+        except Exception:
+            # Hand the number back unless a newer upload has reserved past it
+            await documents_collection.update_one(
+                {"_id": object_id, "current_version": version_number},
+                {"$inc": {"current_version": -1}},
+            )
+            await DocumentService.release_content(fields)
+            raise
+
+        # Point the document at the new file unless a newer version was reserved meanwhile,
+        # in which case this one simply stays in the history
+        update = {**fields, "updated_at": now}
+        update.update(delivery_fields({**document, **update}))
+        previous = await documents_collection.find_one_and_update(
+            {"_id": object_id, "current_version": version_number},
+            {"$set": update},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if previous is not None:
+            await DocumentVersionService._mark_current(document_id, version_number)
+            await DocumentService.documents_changed(document_id)
+            await renditions.pregenerate(update, file.file)
+
+        version["id"] = str(version.pop("_id"))
+        version["is_current"] = previous is not None
+        return version
+
+    @staticmethod
+    async def list_versions(document_id: str) -> List[dict]:
+        """Every version of a document, newest first (a document never re-uploaded has none)"""
+        versions = await document_versions_collection.find(
+            {"document_id": document_id}
+        ).sort("version_number", -1).to_list(length=None)
+        for version in versions:
+            version["id"] = str(version.pop("_id"))
+        return versions
+
+    @staticmethod
+    async def get_version(document_id: str, version_number: int) -> dict:
+        version = await document_versions_collection.find_one(
+            {"document_id": document_id, "version_number": version_number}
+        )
+        if not version:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Version not found")
+        version["id"] = str(version.pop("_id"))
+        return version
+
+    @staticmethod
+    async def get_current_version(document_id: str) -> Optional[dict]:
+        """Served by the partial current-version index"""
+        version = await document_versions_collection.find_one({"document_id": document_id, "is_current": True})
+        if version:
+            version["id"] = str(version.pop("_id"))
+        return version
@@ -2,10 +2,13 @@ from datetime import datetime
 from typing import Optional
 from database import nda_acceptances_collection, users_collection
 from bson import ObjectId
+from services.cache_service import CacheService
 
 # Hardcoded NDA version — no config/settings needed
 NDA_VERSION = "1.0"
 
+CACHE_NAMESPACE = "nda"
+
 class NDAService:
     @staticmethod
     def get_nda_content() -> dict:
@@ -81,6 +84,7 @@ be bound by the terms of this Non-Disclosure Agreement.
         }
         
         result = nda_acceptances_collection.insert_one(acceptance_data)
+        CacheService.delete(CACHE_NAMESPACE, f"{user_id}:{NDA_VERSION}")
         return {
             "message": "NDA accepted successfully",
             "acceptance_id": str(result.inserted_id)
@@ -89,16 +93,19 @@ be bound by the terms of this Non-Disclosure Agreement.
     @staticmethod
     def has_accepted_nda(user_id: str) -> bool:
         """Check if user has accepted current NDA version"""
-        acceptance = nda_acceptances_collection.find_one({
-            "user_id": user_id,
-            "nda_version": NDA_VERSION,  
-            "is_active": True
-        })
-        return acceptance is not None
+        return NDAService.get_user_nda_acceptance(user_id) is not None
     
     @staticmethod
     def get_user_nda_acceptance(user_id: str) -> Optional[dict]:
-        """Get user's NDA acceptance record"""
+        """Get user's NDA acceptance record (only accepted records are cached)"""
+        return CacheService.get_or_set(
+            CACHE_NAMESPACE,
+            f"{user_id}:{NDA_VERSION}",
+            lambda: NDAService._load_nda_acceptance(user_id)
+        )
+    
+    @staticmethod
+    def _load_nda_acceptance(user_id: str) -> Optional[dict]:
         acceptance = nda_acceptances_collection.find_one({
             "user_id": user_id,
             "nda_version": NDA_VERSION,  
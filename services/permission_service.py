@@ -1,7 +1,13 @@
+import calendar
 from datetime import datetime
 from typing import Optional, List
 from database import permission_levels_collection, users_collection, access_tokens_collection, investors_collection
 from bson import ObjectId
+from services.cache_service import CacheService
+from services.principal_service import PrincipalService
+from services.nda_service import NDAService, NDA_VERSION
+
+CACHE_NAMESPACE = "permissions"
 
 class PermissionService:
     @staticmethod
@@ -45,6 +51,14 @@ class PermissionService:
     @staticmethod
     def get_user_permissions(user_id: str) -> Optional[dict]:
         """Get user's permission level - supports both users and investors"""
+        return CacheService.get_or_set(
+            CACHE_NAMESPACE,
+            user_id,
+            lambda: PermissionService._load_user_permissions(user_id)
+        )
+    
+    @staticmethod
+    def _load_user_permissions(user_id: str) -> Optional[dict]:
         # First check users_collection
         user = users_collection.find_one({"_id": ObjectId(user_id)})
         
@@ -132,6 +146,7 @@ class PermissionService:
                 {"_id": ObjectId(user_id)},
                 {"$set": {"is_active": False}}
             )
+            PrincipalService.revoke_tokens(user_id)
             return False
         
         return True
@@ -143,4 +158,48 @@ class PermissionService:
             {"_id": ObjectId(user_id)},
             {"$set": {"permission_level_id": permission_level_id}}
         )
-        return result.modified_count > 0
\ No newline at end of file
+        CacheService.delete(CACHE_NAMESPACE, user_id)
+        PrincipalService.revoke_tokens(user_id)
+        return result.modified_count > 0
+    
+    @staticmethod
+    def authorization_snapshot(user_id: str) -> dict:
+        """
+        Compact authorization claims embedded in access tokens at login:
+        permission level (lvl), download permission (dl), accepted NDA version (nda)
+        and access expiry as a UTC epoch (axp, None when access does not expire).
+        """
+        permissions = PermissionService.get_user_permissions(user_id) or {}
+        
+        access_expires_at = None
+        if permissions.get("has_expiry"):
+            user = users_collection.find_one({"_id": ObjectId(user_id)}, {"email": 1})
+            token = access_tokens_collection.find_one({
+                "email": user["email"],
+                "is_active": True
+            }) if user else None
+            # No active access token means access is already over
+            expires_at = token.get("expires_at") if token else datetime.utcnow()
+            if expires_at:
+                access_expires_at = calendar.timegm(expires_at.utctimetuple())
+        
+        return {
+            "lvl": permissions.get("id"),
+            "dl": bool(permissions.get("can_download", False)),
+            "nda": NDA_VERSION if NDAService.has_accepted_nda(user_id) else None,
+            "axp": access_expires_at
+        }
+    
+    @staticmethod
+    def revoke_level_tokens(level_id: str):
+        """Revoke tokens of every user on a permission level (their authz claims are stale)"""
+        users_collection.update_many(
+            {"permission_level_id": level_id},
+            {"$inc": {"token_version": 1}}
+        )
+        PrincipalService.invalidate("*")
+    
+    @staticmethod
+    def invalidate_cache():
+        """Drop all cached permissions (call after a permission level changes)"""
+        CacheService.invalidate_namespace(CACHE_NAMESPACE)
\ No newline at end of file
@@ -0,0 +1,137 @@
+from typing import Optional
+from bson import ObjectId
+from fastapi import HTTPException, status
+from config import settings
+from database import admin_users_collection, investors_collection, users_collection
+from services.cache_service import CacheService
+from utils.ttl_cache import TTLCache
+
+# Fields that must never be held in the identity cache
+PRIVATE_FIELDS = {"password_hash": 0, "otp": 0, "otp_expiry": 0, "otp_attempts": 0}
+
+CACHE_NAMESPACE = "principal"
+
+# Resolved principals keyed by (token subject, role claim, investor flag)
+_principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_MAX_ENTRIES,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+class PrincipalService:
+    """Single place where a verified token payload is turned into an account"""
+
+    @staticmethod
+    def _cache_key(payload: dict) -> tuple:
+        return (payload.get("sub"), payload.get("role"), bool(payload.get("is_investor")))
+
+    @staticmethod
+    def _load(user_id: str, is_investor: bool) -> Optional[dict]:
+        """Look the subject up in investors, admin_users and users (investors first for investor tokens)"""
+        try:
+            object_id = ObjectId(user_id)
+        except Exception:
+            return None
+
+        lookups = [
+            ("admin", admin_users_collection),
+            ("user", users_collection),
+            ("investor", investors_collection),
+        ]
+        if is_investor:
+            lookups.insert(0, lookups.pop())
+
+        for kind, collection in lookups:
+            document = collection.find_one({"_id": object_id}, PRIVATE_FIELDS)
+            if document:
+                return {"kind": kind, "document": document}
+
+        return None
+
+    @staticmethod
+    def resolve(payload: dict) -> Optional[dict]:
+        """
+        Resolve a verified token payload to {"kind", "document"}.
+
+        kind is one of "investor", "admin" or "user". Hits are served from the
+        in-process cache, so a warm request costs no database round trip.
+        """
+        user_id = payload.get("sub")
+        if not user_id:
+            return None
+
+        key = PrincipalService._cache_key(payload)
+        principal = _principal_cache.get(key)
+        if principal is None:
+            principal = PrincipalService._load(user_id, bool(payload.get("is_investor")))
+            if principal is None:
+                return None
+            _principal_cache.set(key, principal)
+
+        # Tokens carry the account's token_version ("tv") at issue time; bumping it revokes them
+        if payload.get("tv", 0) != principal["document"].get("token_version", 0):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Session has been revoked, please sign in again"
+            )
+
+        return {"kind": principal["kind"], "document": dict(principal["document"])}
+
+    @staticmethod
+    def to_user_context(principal: dict) -> dict:
+        """Shape a principal the way document/Q&A/company routes expect it"""
+        document = principal["document"]
+        kind = principal["kind"]
+
+        if kind == "admin":
+            role = document.get("role", "admin")
+        else:
+            role = kind
+
+        return {
+            "id": str(document["_id"]),
+            "_id": document["_id"],
+            "email": document.get("email", ""),
+            "full_name": document.get("full_name", ""),
+            "role": role,
+            "is_admin": kind == "admin",
+            "is_active": document.get("is_active", True)
+        }
+
+    @staticmethod
+    def _drop_local(user_id: str) -> int:
+        if user_id == "*":
+            count = len(_principal_cache)
+            _principal_cache.clear()
+            return count
+        return _principal_cache.delete_where(lambda key: key[0] == user_id)
+
+    @staticmethod
+    def invalidate(user_id: str) -> None:
+        """Drop every cached principal for a user on all workers (call after any account change)"""
+        CacheService.publish_invalidation(CACHE_NAMESPACE, str(user_id))
+
+    @staticmethod
+    def revoke_tokens(user_id: str) -> None:
+        """Revoke every token issued to a user so far by bumping their token_version"""
+        try:
+            object_id = ObjectId(user_id)
+        except Exception:
+            return
+
+        for collection in (admin_users_collection, users_collection, investors_collection):
+            if collection.update_one({"_id": object_id}, {"$inc": {"token_version": 1}}).matched_count:
+                break
+
+        PrincipalService.invalidate(user_id)
+
+    @staticmethod
+    def clear_cache() -> None:
+        _principal_cache.clear()
+
+    @staticmethod
+    def cache_stats() -> dict:
+        return _principal_cache.stats()
+
+
+CacheService.on_invalidate(CACHE_NAMESPACE, PrincipalService._drop_local)
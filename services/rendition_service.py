@@ -0,0 +1,264 @@
+import asyncio
+import hashlib
+import io
+import os
+import time
+from typing import Dict, Optional
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from config import settings
+from services.storage_backend import storage_backend_for
+from utils.document_delivery import RENDERABLE_EXTENSIONS
+
+# Longest edge (px) and WebP quality of each rendition
+RENDITION_SPECS = {
+    "thumbnail": (320, 75),
+    "preview": (1280, 82),
+}
+
+# Cache hits refresh a file's mtime (its LRU position) at most this often
+TOUCH_INTERVAL_SECONDS = 60
+
+# Eviction trims the cache to this fraction of its cap so it does not run on every write
+EVICTION_TARGET_RATIO = 0.9
+
+
+class RenditionCache:
+    """
+    Size-bounded on-disk LRU cache of rendered images.
+
+    Recency is the file mtime, refreshed on hits, so every worker sharing
+    the directory sees the same LRU order. Each worker counts the bytes it
+    writes; once its count passes the cap it rescans the directory and
+    deletes the least recently used files down to EVICTION_TARGET_RATIO.
+    Files are written via a temporary name and an atomic rename.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self._bytes: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path_for(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def get(self, name: str) -> Optional[str]:
+        path = self.path_for(name)
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        now = time.time()
+        if now - mtime > TOUCH_INTERVAL_SECONDS:
+            try:
+                os.utime(path, (now, now))
+            except FileNotFoundError:
+                # Evicted by another worker in between; the caller still gets its answer next time
+                pass
+        return path
+
+    def put(self, name: str, data: bytes) -> str:
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path_for(name)
+        temp_path = f"{path}.{os.getpid()}.part"
+        with open(temp_path, "wb") as target:
+            target.write(data)
+        os.replace(temp_path, path)
+
+        if self._bytes is None:
+            self._bytes = self._scan()[1]
+        else:
+            self._bytes += len(data)
+        if self._bytes > self.max_bytes:
+            self._evict()
+        return path
+
+    def discard(self, prefix: str) -> int:
+        """Remove every rendition whose name starts with prefix"""
+        removed = 0
+        for entry in self._entries():
+            if entry.name.startswith(prefix):
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        self._bytes = None
+        return removed
+
+    def _entries(self):
+        try:
+            return [entry for entry in os.scandir(self.root) if entry.is_file() and not entry.name.endswith(".part")]
+        except FileNotFoundError:
+            return []
+
+    def _scan(self):
+        files = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files, sum(size for _, size, _ in files)
+
+    def _evict(self) -> None:
+        files, total = self._scan()
+        target = self.max_bytes * EVICTION_TARGET_RATIO
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._bytes = total
+
+    def stats(self) -> dict:
+        return {
+            "bytes": self._bytes or 0,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class RenditionService:
+    """
+    Resized WebP thumbnails and previews of image documents.
+
+    Renditions are rendered with Pillow at upload time (pregenerate) or on
+    first request, and kept in a RenditionCache. Names are derived from the
+    document's content hash, so documents sharing content share renditions
+    and a new version of a document gets new ones.
+    """
+
+    def __init__(self, cache: RenditionCache, source_max_bytes: int):
+        self.cache = cache
+        self.source_max_bytes = source_max_bytes
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._lock_users: Dict[str, int] = {}
+
+    @staticmethod
+    def can_render(document: dict) -> bool:
+        return (document.get("file_extension") or "").lower() in RENDERABLE_EXTENSIONS
+
+    @staticmethod
+    def source_key(document: dict) -> str:
+        if document.get("content_sha256"):
+            return document["content_sha256"]
+        # Uploads recorded before content hashing: key on where the file lives
+        location = document.get("storage_key") or document.get("file_url") or document.get("file_path") or ""
+        return hashlib.sha256(location.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def rendition_name(document: dict, kind: str) -> str:
+        size, quality = RENDITION_SPECS[kind]
+        return f"{RenditionService.source_key(document)}-{kind}-{size}q{quality}.webp"
+
+    @staticmethod
+    def render(data: bytes, kind: str) -> bytes:
+        """Rasterize an image into a WebP rendition (CPU bound: run off the event loop)"""
+        size, quality = RENDITION_SPECS[kind]
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                # Only the header has been read: refuse decompression bombs before decoding
+                width, height = image.size
+                if width * height > settings.RENDITION_MAX_PIXELS:
+                    raise ValueError(f"{width}x{height} image exceeds RENDITION_MAX_PIXELS")
+                # JPEGs are decoded straight at a reduced scale
+                image.draft("RGB", (size, size))
+                image = ImageOps.exif_transpose(image)
+                has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+                image = image.convert("RGBA" if has_alpha else "RGB")
+                image.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+                output = io.BytesIO()
+                image.save(output, "WEBP", quality=quality, method=4)
+                return output.getvalue()
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+            raise HTTPException(
+                status_code=422,
+                detail="Could not render a preview for this document"
+            )
+
+    def _store(self, document: dict, data: bytes, kinds) -> Dict[str, str]:
+        paths = {}
+        for kind in kinds:
+            name = self.rendition_name(document, kind)
+            paths[kind] = self.cache.get(name) or self.cache.put(name, self.render(data, kind))
+        return paths
+
+    async def get(self, document: dict, kind: str) -> str:
+        """Path of a cached rendition, rendering it on first request"""
+        if not self.can_render(document):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No preview image for this document")
+
+        name = self.rendition_name(document, kind)
+        path = await run_in_threadpool(self.cache.get, name)
+        if path:
+            return path
+
+        # One render per rendition per worker; concurrent requests wait for it
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        self._lock_users[name] = self._lock_users.get(name, 0) + 1
+        try:
+            async with lock:
+                path = await run_in_threadpool(self.cache.get, name)
+                if path:
+                    return path
+                data = await storage_backend_for(document).read(document, self.source_max_bytes)
+                return (await run_in_threadpool(self._store, document, data, [kind]))[kind]
+        finally:
+            # Keep the lock until every waiter has had it, or a late request would render again
+            self._lock_users[name] -= 1
+            if not self._lock_users[name]:
+                del self._lock_users[name]
+                self._locks.pop(name, None)
+
+    async def pregenerate(self, document: dict, file_obj) -> None:
+        """Render every rendition of a just-uploaded image from its upload file (best effort)"""
+        if not settings.RENDITION_PREGENERATE or not self.can_render(document):
+            return
+        if (document.get("file_size") or 0) > self.source_max_bytes:
+            return
+
+        def read():
+            file_obj.seek(0)
+            return file_obj.read()
+
+        try:
+            data = await run_in_threadpool(read)
+            await run_in_threadpool(self._store, document, data, list(RENDITION_SPECS))
+        except Exception as e:
+            # The first request renders it instead
+            print(f"Rendition pregeneration failed for {document.get('original_filename')}: {e}")
+
+    async def discard(self, document: dict) -> None:
+        """Drop a document's renditions (documents sharing its content re-render on demand)"""
+        if self.can_render(document):
+            await run_in_threadpool(self.cache.discard, self.source_key(document))
+
+    def stats(self) -> dict:
+        return self.cache.stats()
+
+
+renditions = RenditionService(
+    cache=RenditionCache(
+        root=settings.RENDITION_CACHE_DIR or os.path.join(settings.UPLOAD_DIR, "renditions"),
+        max_bytes=settings.RENDITION_CACHE_MAX_MB * 1024 * 1024,
+    ),
+    source_max_bytes=settings.RENDITION_SOURCE_MAX_MB * 1024 * 1024,
+)
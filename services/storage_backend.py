@@ -0,0 +1,210 @@
+import os
+import shutil
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, Optional
+
+from bson import ObjectId
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+
+from config import settings
+from services.async_cloudinary_service import cloudinary_client
+
+# Copy buffer for writing uploads to local storage
+LOCAL_COPY_BUFFER_BYTES = 1024 * 1024
+
+Progress = Optional[Callable[[int, int], Awaitable[None]]]
+
+
+class StorageBackend(ABC):
+    """
+    Where document bytes live.
+
+    save() stores a file and returns the storage fields of the documents
+    record: storage_backend, storage_key, file_url, plus the cloudinary_*
+    fields for Cloudinary. delete() removes what save() stored.
+    """
+
+    name = ""
+
+    @abstractmethod
+    async def save(self, file_obj, filename: str, user_id: str, document_id: ObjectId, progress: Progress = None) -> dict:
+        """Store a file and return its storage fields"""
+
+    @abstractmethod
+    async def delete(self, document: dict) -> None:
+        """Remove what save() stored"""
+
+    def url_for(self, stored: dict, document_id: ObjectId) -> str:
+        """file_url for a document record pointing at stored content"""
+        return stored["file_url"]
+
+    @abstractmethod
+    async def read(self, document: dict, max_bytes: int) -> bytes:
+        """A stored file's bytes, for server-side processing of small files"""
+
+    @abstractmethod
+    def stream(self, document: dict, chunk_size: int):
+        """Async iterator over a stored file's bytes"""
+
+
+class CloudinaryStorageBackend(StorageBackend):
+    """Documents on Cloudinary, delivered from its CDN"""
+
+    name = "cloudinary"
+
+    async def save(self, file_obj, filename: str, user_id: str, document_id: ObjectId, progress: Progress = None) -> dict:
+        safe_filename = filename.replace(" ", "_").replace(".", "_")
+        public_id = f"dataroom_documents/{user_id}/{uuid.uuid4()}_{safe_filename}"
+
+        # Upload to Cloudinary in chunks straight from the file
+        upload_result = await cloudinary_client.upload(
+            file_obj,
+            filename=filename,
+            public_id=public_id,
+            folder="dataroom_documents",
+            chunk_size=settings.CLOUDINARY_CHUNK_SIZE_MB * 1024 * 1024,
+            progress=progress,
+        )
+        return {
+            "storage_backend": self.name,
+            "storage_key": upload_result["public_id"],
+            "file_url": upload_result["secure_url"],
+            "cloudinary_public_id": upload_result["public_id"],
+            "cloudinary_resource_type": upload_result.get("resource_type", "raw"),
+        }
+
+    async def delete(self, document: dict) -> None:
+        await cloudinary_client.destroy(
+            public_id=document["cloudinary_public_id"],
+            resource_type=document.get("cloudinary_resource_type", "raw"),
+        )
+
+    async def read(self, document: dict, max_bytes: int) -> bytes:
+        return await cloudinary_client.fetch(document.get("file_url") or document["file_path"], max_bytes)
+
+    def stream(self, document: dict, chunk_size: int):
+        return cloudinary_client.stream(document.get("file_url") or document["file_path"], chunk_size)
+
+
+class LocalStorageBackend(StorageBackend):
+    """
+    Documents on a local or NFS-mounted directory, served by the API itself.
+
+    Files are written under <root>/<user_id>/ via a temporary name and an
+    atomic rename, so a reader never sees a partial file. Downloads go
+    through GET /api/documents/{id}/download (see local_path()).
+    """
+
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def local_path(self, storage_key: str) -> str:
+        """Absolute path for a storage key, refusing anything outside the root"""
+        path = os.path.abspath(os.path.join(self.root, storage_key))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document file not found")
+        return path
+
+    def _write(self, file_obj, storage_key: str) -> int:
+        path = self.local_path(storage_key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.part"
+        file_obj.seek(0)
+        try:
+            with open(temp_path, "wb") as target:
+                shutil.copyfileobj(file_obj, target, LOCAL_COPY_BUFFER_BYTES)
+                target.flush()
+                os.fsync(target.fileno())
+                size = target.tell()
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        return size
+
+    async def save(self, file_obj, filename: str, user_id: str, document_id: ObjectId, progress: Progress = None) -> dict:
+        safe_filename = os.path.basename(filename).replace(" ", "_") or "document"
+        storage_key = f"{user_id}/{uuid.uuid4()}_{safe_filename}"
+
+        size = await run_in_threadpool(self._write, file_obj, storage_key)
+        if progress:
+            await progress(size, size)
+
+        return {
+            "storage_backend": self.name,
+            "storage_key": storage_key,
+            "file_url": self.url_for({}, document_id),
+            "cloudinary_public_id": None,
+            "cloudinary_resource_type": None,
+        }
+
+    def url_for(self, stored: dict, document_id: ObjectId) -> str:
+        # Served by the API, so the URL is per document even when content is shared
+        return f"/api/documents/{document_id}/download"
+
+    def _read(self, storage_key: str, max_bytes: int) -> bytes:
+        path = self.local_path(storage_key)
+        try:
+            with open(path, "rb") as source:
+                data = source.read(max_bytes + 1)
+        except FileNotFoundError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document file not found")
+        if len(data) > max_bytes:
+            raise HTTPException(status_code=413, detail="Document is too large to render a preview")
+        return data
+
+    async def read(self, document: dict, max_bytes: int) -> bytes:
+        return await run_in_threadpool(self._read, document["storage_key"], max_bytes)
+
+    async def stream(self, document: dict, chunk_size: int):
+        path = self.local_path(document["storage_key"])
+        try:
+            source = await run_in_threadpool(open, path, "rb")
+        except FileNotFoundError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document file not found")
+        try:
+            while True:
+                chunk = await run_in_threadpool(source.read, chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            source.close()
+
+    async def delete(self, document: dict) -> None:
+        try:
+            await run_in_threadpool(os.remove, self.local_path(document["storage_key"]))
+        except FileNotFoundError:
+            pass
+
+
+_backends: Dict[str, StorageBackend] = {
+    CloudinaryStorageBackend.name: CloudinaryStorageBackend(),
+    LocalStorageBackend.name: LocalStorageBackend(
+        settings.LOCAL_STORAGE_ROOT or os.path.join(settings.UPLOAD_DIR, "documents")
+    ),
+}
+
+
+def get_storage_backend(name: Optional[str] = None) -> StorageBackend:
+    """Backend by name; defaults to settings.STORAGE_BACKEND for new uploads"""
+    name = name or settings.STORAGE_BACKEND
+    backend = _backends.get(name)
+    if backend is None:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Unknown storage backend: {name}"
+        )
+    return backend
+
+
+def storage_backend_for(document: dict) -> StorageBackend:
+    """Backend holding an existing document (records from before backends were tracked are on Cloudinary)"""
+    return get_storage_backend(document.get("storage_backend") or CloudinaryStorageBackend.name)
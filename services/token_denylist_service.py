@@ -0,0 +1,96 @@
+import threading
+import time
+from typing import Dict, Optional
+
+import redis
+
+from services.cache_service import CacheService
+
+CACHE_NAMESPACE = "token-denylist"
+
+# Expired entries are swept once the denylist grows past this many entries
+PURGE_THRESHOLD = 10000
+
+# jti -> token exp (epoch seconds); entries are never evicted before exp
+_denied: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+class TokenDenylistService:
+    """
+    Revoked token ids (jti), held in process memory so the per-request check is
+    a single dict lookup with no database or Redis round trip.
+
+    Revocations are mirrored to Redis (loaded by new workers at startup) and
+    broadcast over the cache invalidation channel to running workers. Each
+    entry expires at the token's own exp, after which the token is rejected
+    by signature validation anyway.
+    """
+
+    @staticmethod
+    def _add_local(jti: str, exp: float) -> None:
+        now = time.time()
+        if exp <= now:
+            return
+        with _lock:
+            _denied[jti] = exp
+            if len(_denied) > PURGE_THRESHOLD:
+                for expired in [key for key, value in _denied.items() if value <= now]:
+                    del _denied[expired]
+
+    @staticmethod
+    def is_denied(jti: Optional[str]) -> bool:
+        """True if the token id has been revoked and has not yet expired"""
+        if not jti:
+            return False
+        exp = _denied.get(jti)
+        return exp is not None and exp > time.time()
+
+    @staticmethod
+    def deny(jti: str, exp: float) -> None:
+        """Revoke a token id until exp on every worker"""
+        TokenDenylistService._add_local(jti, exp)
+
+        ttl = int(exp - time.time()) + 1
+        if ttl > 0:
+            CacheService.set(CACHE_NAMESPACE, jti, exp, ttl=ttl)
+        CacheService.publish_invalidation(CACHE_NAMESPACE, f"{jti}:{exp}")
+
+    @staticmethod
+    def _on_broadcast(key: str) -> None:
+        if key == "*":
+            # Broadcasts may have been missed: reload the whole denylist
+            TokenDenylistService.load()
+            return
+        jti, _, exp = key.rpartition(":")
+        try:
+            TokenDenylistService._add_local(jti, float(exp))
+        except ValueError:
+            return
+
+    @staticmethod
+    def load() -> int:
+        """Populate the local denylist from Redis (call once at startup)"""
+        client = CacheService.get_client()
+        if client is None:
+            return 0
+
+        prefix = CacheService.make_key(CACHE_NAMESPACE, "")
+        loaded = 0
+        try:
+            for key in client.scan_iter(match=f"{prefix}*", count=500):
+                jti = key.decode()[len(prefix):] if isinstance(key, bytes) else key[len(prefix):]
+                exp = CacheService.get(CACHE_NAMESPACE, jti)
+                if exp is not None:
+                    TokenDenylistService._add_local(jti, float(exp))
+                    loaded += 1
+        except redis.RedisError as e:
+            CacheService._mark_unavailable(e)
+        return loaded
+
+    @staticmethod
+    def stats() -> dict:
+        return {"size": len(_denied)}
+
+
+CacheService.on_invalidate(CACHE_NAMESPACE, TokenDenylistService._on_broadcast)
@@ -0,0 +1,264 @@
+import asyncio
+import os
+import shutil
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from async_database import documents_collection, upload_jobs_collection
+from config import settings
+from services.document_service import DocumentService
+from utils.upload_stream import measure_upload
+
+STAGING_DIR = os.path.join(settings.UPLOAD_DIR, "staging")
+
+# Staged files live on this host's disk; jobs record where they were staged
+HOST = socket.gethostname()
+
+
+class UploadJobService:
+    """
+    Background document uploads.
+
+    submit() validates and stages the file on local disk, records a job in
+    upload_jobs and returns at once; a small pool of asyncio workers pushes
+    staged files to Cloudinary and creates the documents record, updating
+    the job's progress as chunks go out. Jobs are claimed atomically, so a
+    job queued on one worker is never processed twice.
+
+    A claimed job holds a lease (UPLOAD_JOB_LEASE_SECONDS) renewed with
+    every progress report. At startup, jobs whose lease ran out are queued
+    again if their staged file is on this host, and failed otherwise, so
+    pollers always reach a terminal state.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @staticmethod
+    def _copy_to_staging(file_obj, path: str) -> None:
+        os.makedirs(STAGING_DIR, exist_ok=True)
+        file_obj.seek(0)
+        with open(path, "wb") as staged:
+            shutil.copyfileobj(file_obj, staged, length=1024 * 1024)
+
+    @staticmethod
+    def to_response(job: dict) -> dict:
+        total = job.get("bytes_total") or 0
+        uploaded = job.get("bytes_uploaded") or 0
+        return {
+            "job_id": job["_id"],
+            "status": job["status"],
+            "filename": job["filename"],
+            "bytes_total": total,
+            "bytes_uploaded": uploaded,
+            "progress": round(uploaded / total * 100, 1) if total else 0.0,
+            "document_id": job.get("document_id"),
+            "error": job.get("error"),
+            "created_at": job["created_at"],
+            "finished_at": job.get("finished_at"),
+        }
+
+    async def submit(
+        self,
+        file,
+        categories: List[str],
+        user_id: str,
+        description: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+    ) -> dict:
+        """Stage an upload and queue it; returns the job as reported by the status endpoint"""
+        measured = await measure_upload(file)
+
+        job_id = uuid.uuid4().hex
+        staged_path = os.path.join(STAGING_DIR, job_id)
+        await run_in_threadpool(self._copy_to_staging, file.file, staged_path)
+
+        job = {
+            "_id": job_id,
+            "status": "queued",
+            "filename": file.filename,
+            "staged_path": staged_path,
+            "host": HOST,
+            "sha256": measured["sha256"],
+            "bytes_total": measured["size"],
+            "bytes_uploaded": 0,
+            "categories": categories,
+            "tags": tags or [],
+            "description": description or "",
+            "user_id": user_id,
+            "document_id": None,
+            "error": None,
+            "created_at": datetime.utcnow(),
+            "finished_at": None,
+        }
+        await upload_jobs_collection.insert_one(job)
+        self._enqueue(job_id)
+        return self.to_response(job)
+
+    async def get_job(self, job_id: str) -> Optional[dict]:
+        job = await upload_jobs_collection.find_one({"_id": job_id})
+        return self.to_response(job) if job else None
+
+    def _enqueue(self, job_id: str) -> None:
+        if self._queue is None:
+            raise HTTPException(status_code=503, detail="Upload workers are not running")
+        self._queue.put_nowait(job_id)
+
+    @staticmethod
+    def _lease_expiry() -> datetime:
+        return datetime.utcnow() + timedelta(seconds=settings.UPLOAD_JOB_LEASE_SECONDS)
+
+    async def _process(self, job_id: str) -> None:
+        job = await upload_jobs_collection.find_one_and_update(
+            {"_id": job_id, "status": "queued"},
+            {"$set": {
+                "status": "uploading",
+                "started_at": datetime.utcnow(),
+                "lease_expires_at": self._lease_expiry(),
+            }},
+        )
+        if not job:
+            return
+
+        async def report_progress(sent: int, total: int):
+            await upload_jobs_collection.update_one(
+                {"_id": job_id},
+                {"$set": {"bytes_uploaded": sent, "lease_expires_at": self._lease_expiry()}}
+            )
+
+        update = {}
+        try:
+            with open(job["staged_path"], "rb") as staged:
+                document_data = await DocumentService.prepare_document(
+                    file_obj=staged,
+                    filename=job["filename"],
+                    measured={"size": job["bytes_total"], "sha256": job["sha256"]},
+                    categories=job["categories"],
+                    user_id=job["user_id"],
+                    description=job["description"],
+                    tags=job["tags"],
+                    progress=report_progress,
+                )
+            try:
+                result = await documents_collection.insert_one(document_data)
+            except BaseException:
+                # A retry stores the file again, so this reference would never be released
+                await DocumentService.release_content(document_data)
+                raise
+            update.update({"status": "completed", "document_id": str(result.inserted_id)})
+            await DocumentService.documents_changed()
+        except asyncio.CancelledError:
+            if update.get("status") == "completed":
+                # The document is recorded; retrying would upload it a second time
+                update["finished_at"] = datetime.utcnow()
+                await upload_jobs_collection.update_one({"_id": job_id}, {"$set": update})
+                try:
+                    os.remove(job["staged_path"])
+                except OSError:
+                    pass
+            else:
+                # Shutting down: keep the staged file and hand the job back to the queue
+                await upload_jobs_collection.update_one(
+                    {"_id": job_id},
+                    {"$set": {"status": "queued", "bytes_uploaded": 0}}
+                )
+            raise
+        except HTTPException as e:
+            update.update({"status": "failed", "error": e.detail})
+        except Exception as e:
+            print(f"Upload job {job_id} failed: {e}")
+            update.update({"status": "failed", "error": str(e)})
+
+        update["finished_at"] = datetime.utcnow()
+        await upload_jobs_collection.update_one({"_id": job_id}, {"$set": update})
+        try:
+            os.remove(job["staged_path"])
+        except OSError:
+            pass
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._process(job_id)
+            except Exception as e:
+                print(f"Upload worker error on job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def start(self) -> None:
+        """Start the workers and recover jobs left by a restart or a dead worker (call from a startup hook)"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+        await self._recover()
+
+    async def _fail(self, job: dict, error: str) -> None:
+        result = await upload_jobs_collection.update_one(
+            {"_id": job["_id"], "status": job["status"]},
+            {"$set": {"status": "failed", "error": error, "finished_at": datetime.utcnow()}}
+        )
+        if result.modified_count and os.path.exists(job["staged_path"]):
+            try:
+                os.remove(job["staged_path"])
+            except OSError:
+                pass
+
+    async def _recover(self) -> None:
+        """Re-queue or fail jobs left behind by a restart or a dead worker"""
+        now = datetime.utcnow()
+        stale_before = now - timedelta(seconds=settings.UPLOAD_JOB_LEASE_SECONDS)
+        jobs = await upload_jobs_collection.find(
+            {"status": {"$in": ["queued", "uploading"]}},
+            {"status": 1, "staged_path": 1, "host": 1, "created_at": 1, "started_at": 1, "lease_expires_at": 1}
+        ).to_list(length=None)
+
+        for job in jobs:
+            staged_here = job.get("host", HOST) == HOST and os.path.exists(job["staged_path"])
+
+            if job["status"] == "uploading":
+                lease_expires_at = job.get("lease_expires_at") or (
+                    (job.get("started_at") or now) + timedelta(seconds=settings.UPLOAD_JOB_LEASE_SECONDS)
+                )
+                if lease_expires_at > now:
+                    # Still held by a live worker
+                    continue
+                if not staged_here:
+                    await self._fail(job, "Upload was interrupted")
+                    continue
+                result = await upload_jobs_collection.update_one(
+                    {"_id": job["_id"], "status": "uploading", "lease_expires_at": job.get("lease_expires_at")},
+                    {"$set": {"status": "queued", "bytes_uploaded": 0}}
+                )
+                if result.modified_count:
+                    self._queue.put_nowait(job["_id"])
+                continue
+
+            if staged_here:
+                self._queue.put_nowait(job["_id"])
+            elif job.get("host", HOST) == HOST:
+                await self._fail(job, "Staged file is no longer available")
+            elif job["created_at"] < stale_before:
+                await self._fail(job, "Upload was staged on another server that never processed it")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {"workers": len(self._tasks), "queued": self._queue.qsize() if self._queue else 0}
+
+
+upload_jobs = UploadJobService(workers=settings.UPLOAD_JOB_WORKERS)
@@ -0,0 +1,38 @@
+import os
+
+# Settings are read from the environment at import time
+for name, value in {
+    "MONGODB_URL": "mongodb://localhost:27017", "DATABASE_NAME": "dataroom_test", "BREVO_API_KEY": "",
+    "BREVO_SENDER_EMAIL": "test@example.com", "BREVO_SENDER_NAME": "Test", "SMTP_HOST": "localhost",
+    "SMTP_PORT": "25", "SMTP_USERNAME": "", "SMTP_PASSWORD": "", "FROM_EMAIL": "test@example.com",
+    "SMTP_USE_TLS": "false", "SMTP_USE_SSL": "false", "ADMIN_EMAIL": "test@example.com",
+    "SECRET_KEY": "test-secret-key-with-enough-length", "OTP_EXPIRY_MINUTES": "10", "OTP_MAX_ATTEMPTS": "3",
+    "OTP_LENGTH": "6", "UPLOAD_DIR": "/tmp/dataroom-test-uploads", "MAX_FILE_SIZE_MB": "5",
+    "ALLOWED_EXTENSIONS": '[".pdf"]', "ALLOWED_FILE_TYPES": '["application/pdf"]', "NDA_VERSION": "1.0",
+    "REDIS_URL": "redis://localhost:6399/0", "CACHE_TTL": "300", "SLACK_WEBHOOK_URL": "", "CALENDLY_API_KEY": "",
+    "CLOUDINARY_CLOUD_NAME": "demo", "CLOUDINARY_API_KEY": "key", "CLOUDINARY_API_SECRET": "secret",
+}.items():
+    os.environ.setdefault(name, value)
+
+from fastapi.testclient import TestClient
+
+from main import app
+from services.auth_service import AuthService
+from services.direct_upload_service import DirectUploadService
+
+
+def test_upload_ticket_is_not_an_access_token():
+    ticket = DirectUploadService.create_upload("report.pdf", ["Financials"], user_id="5f0000000000000000000001")["ticket"]
+
+    assert AuthService.verify_token(ticket) is None
+
+    response = TestClient(app).get("/api/documents/", headers={"Authorization": f"Bearer {ticket}"})
+    assert response.status_code == 401
+
+
+def test_upload_ticket_still_verifies_as_a_ticket():
+    user_id = "5f0000000000000000000001"
+    ticket = DirectUploadService.create_upload("report.pdf", ["Financials"], user_id=user_id)["ticket"]
+
+    claims = DirectUploadService._decode_ticket(ticket, user_id)
+    assert claims["fn"] == "report.pdf"
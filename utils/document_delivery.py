@@ -0,0 +1,100 @@
+# utils/document_delivery.py
+import urllib.parse
+
+# Bump when the derivation below changes so the backfill picks documents up again
+DELIVERY_VERSION = 1
+
+KNOWN_EXTENSIONS = [
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".txt", ".csv", ".zip",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg",
+]
+PREVIEWABLE_EXTENSIONS = [".pdf", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".svg"]
+
+# Images the rendition service can rasterize (Pillow does not read SVG)
+RENDERABLE_EXTENSIONS = [".png", ".jpg", ".jpeg", ".gif", ".webp"]
+
+# Cloudinary resource types that older uploads stored in file_type/file_extension
+PLACEHOLDER_EXTENSIONS = ["raw", "image", "video"]
+
+# Everything GET /{id}/url needs, read in one projected find_one
+DELIVERY_PROJECTION = {
+    "title": 1,
+    "file_url": 1,
+    "file_path": 1,
+    "file_type": 1,
+    "file_extension": 1,
+    "mime_type": 1,
+    "download_filename": 1,
+    "download_url": 1,
+    "can_preview": 1,
+    "delivery_version": 1,
+}
+
+
+def _detect_extension(name: str) -> str:
+    name = (name or "").lower()
+    for ext in KNOWN_EXTENSIONS:
+        if name.endswith(ext):
+            return ext
+    return ""
+
+
+def attachment_url(file_url: str, download_filename: str) -> str:
+    """Cloudinary URL that forces a download under download_filename"""
+    if not file_url or "cloudinary" not in file_url:
+        return file_url
+
+    # fl_attachment goes right after /upload/ and before the version:
+    # /upload/fl_attachment:filename/v123456/path
+    safe_filename = download_filename.replace(" ", "_")
+    encoded_filename = urllib.parse.quote(safe_filename, safe=".-_")
+
+    for marker in ("/raw/upload/", "/image/upload/", "/upload/"):
+        if marker in file_url:
+            return file_url.replace(marker, f"{marker}fl_attachment:{encoded_filename}/", 1)
+    return file_url
+
+
+def delivery_fields(document: dict) -> dict:
+    """
+    Derive the fields used to preview and download a document.
+
+    Stored at upload/update time (and by scripts/backfill_delivery_metadata.py
+    for older documents) so serving a URL never recomputes them. Documents
+    uploaded before file extensions were recorded carry "raw" in file_type;
+    their extension is recovered from the title or original filename.
+    """
+    title = document.get("title") or "document"
+    file_url = document.get("file_url") or document.get("file_path")
+
+    file_extension = (document.get("file_extension") or "").lower()
+    detected_extension = _detect_extension(title) or _detect_extension(document.get("original_filename"))
+    if not file_extension or file_extension in PLACEHOLDER_EXTENSIONS:
+        file_extension = detected_extension
+    if file_extension and not file_extension.startswith("."):
+        file_extension = "." + file_extension
+
+    download_filename = document.get("original_filename") or title
+    if file_extension and not download_filename.lower().endswith(file_extension):
+        download_filename = download_filename + file_extension
+
+    fields = {
+        "file_extension": file_extension,
+        "download_filename": download_filename,
+        "download_url": attachment_url(file_url, download_filename),
+        "can_preview": file_extension in PREVIEWABLE_EXTENSIONS or detected_extension in PREVIEWABLE_EXTENSIONS,
+        "delivery_version": DELIVERY_VERSION,
+    }
+
+    file_type = (document.get("file_type") or "").lower()
+    if (not file_type or file_type in PLACEHOLDER_EXTENSIONS) and file_extension:
+        fields["file_type"] = file_extension
+
+    return fields
+
+
+def thumbnail_url(document: dict):
+    """API path of a document's thumbnail, or None when it has no image to render"""
+    if (document.get("file_extension") or "").lower() not in RENDERABLE_EXTENSIONS:
+        return None
+    return f"/api/documents/{document.get('id') or document['_id']}/thumbnail"
@@ -0,0 +1,49 @@
+# utils/etag.py
+import hashlib
+import time
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+
+from services.collection_version_service import CollectionVersionService
+
+# Change when a response shape changes so clients drop ETags from older deploys
+ETAG_SCHEME = "1"
+
+
+def _if_none_match(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    # W/ prefixes are ignored: If-None-Match uses weak comparison
+    return "*" in candidates or any(value.removeprefix("W/") == etag.removeprefix("W/") for value in candidates)
+
+
+def conditional_get(*names: str, expires_after: Optional[int] = None):
+    """
+    Dependency for GET endpoints whose body only changes when one of the
+    named version counters is bumped (see CollectionVersionService).
+
+    The ETag combines those versions with the path and query string, so it
+    is known before the handler runs: a matching If-None-Match gets a 304
+    without loading or serializing anything. Declare it after the auth
+    dependency so unauthenticated requests never get a 304.
+
+    For data that can change without a bump (e.g. edited directly in
+    MongoDB and served from a TTL cache), expires_after also changes the
+    ETag every that many seconds.
+    """
+    async def check(request: Request, response: Response):
+        versions = await CollectionVersionService.current(names)
+        query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+        fingerprint = f"{ETAG_SCHEME}|{request.url.path}?{query}|{','.join(map(str, versions))}"
+        if expires_after:
+            fingerprint += f"|{int(time.time() // expires_after)}"
+        etag = f'W/"{hashlib.blake2b(fingerprint.encode(), digest_size=12).hexdigest()}"'
+
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if _if_none_match(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+    return check
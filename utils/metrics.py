@@ -0,0 +1,218 @@
+# utils/metrics.py
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pymongo import monitoring
+
+# Request latency buckets (seconds) and MongoDB round trips per request
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COMMAND_COUNT_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 32)
+
+# Label used for commands issued outside a request (startup, scripts, listeners)
+BACKGROUND_ROUTE = "background"
+
+# Per-request MongoDB stats for the request being served, if any
+_request_stats: ContextVar[Optional[dict]] = ContextVar("request_stats", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+class MetricsRegistry:
+    """Minimal thread-safe counters and histograms rendered in Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._histograms: Dict[str, Dict[tuple, list]] = {}
+        self._buckets: Dict[str, tuple] = {}
+        self._collectors: List[Callable[[], List[tuple]]] = []
+
+    def counter(self, name: str, help_text: str) -> None:
+        self._help[name] = ("counter", help_text)
+        self._counters.setdefault(name, {})
+
+    def histogram(self, name: str, help_text: str, buckets: tuple) -> None:
+        self._help[name] = ("histogram", help_text)
+        self._histograms.setdefault(name, {})
+        self._buckets[name] = buckets
+
+    def gauge_collector(self, collector: Callable[[], List[tuple]]) -> None:
+        """Register a callable returning (name, help, labels dict, value) tuples at scrape time"""
+        self._collectors.append(collector)
+
+    def inc(self, name: str, labels: dict, amount: float = 1.0) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters[name]
+            series[key] = series.get(key, 0.0) + amount
+
+    def observe(self, name: str, labels: dict, value: float) -> None:
+        key = tuple(sorted(labels.items()))
+        buckets = self._buckets[name]
+        with self._lock:
+            series = self._histograms[name]
+            state = series.get(key)
+            if state is None:
+                # per-bucket counts, then +Inf count and sum
+                state = series[key] = [0] * len(buckets) + [0, 0.0]
+            index = bisect.bisect_left(buckets, value)
+            if index < len(buckets):
+                state[index] += 1
+            state[-2] += 1
+            state[-1] += value
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, series in self._counters.items():
+                lines.append(f"# HELP {name} {self._help[name][1]}")
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{_format_labels(key)} {value}")
+
+            for name, series in self._histograms.items():
+                buckets = self._buckets[name]
+                lines.append(f"# HELP {name} {self._help[name][1]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, state in series.items():
+                    cumulative = 0
+                    for bound, count in zip(buckets, state):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key + (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', '+Inf'),))} {state[-2]}")
+                    lines.append(f"{name}_count{_format_labels(key)} {state[-2]}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {state[-1]}")
+
+        seen = set()
+        for collector in self._collectors:
+            try:
+                samples = collector()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, help_text, labels, value in samples:
+                if name not in seen:
+                    lines.append(f"# HELP {name} {help_text}")
+                    lines.append(f"# TYPE {name} gauge")
+                    seen.add(name)
+                lines.append(f"{name}{_format_labels(tuple(sorted(labels.items())))} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+registry.counter("dataroom_http_requests_total", "HTTP requests by route, method and status")
+registry.histogram("dataroom_http_request_duration_seconds", "HTTP request latency by route", LATENCY_BUCKETS)
+registry.histogram("dataroom_mongo_commands_per_request", "MongoDB commands issued per HTTP request", COMMAND_COUNT_BUCKETS)
+registry.counter("dataroom_mongo_commands_total", "MongoDB commands by route and command name")
+registry.counter("dataroom_mongo_command_failures_total", "Failed MongoDB commands by route and command name")
+registry.counter("dataroom_mongo_command_seconds_total", "Time spent in MongoDB commands by route")
+registry.counter("dataroom_mongo_documents_returned_total", "Documents returned by MongoDB by route")
+
+
+def _documents_returned(reply) -> int:
+    cursor = reply.get("cursor") if hasattr(reply, "get") else None
+    if cursor:
+        return len(cursor.get("firstBatch", cursor.get("nextBatch", [])))
+    return 0
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Attributes every MongoDB command to the FastAPI route being served.
+
+    The route's stats live in a context variable, which Starlette's threadpool
+    and Motor's executor both copy, so sync and async handlers are covered.
+    """
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def _record(self, command: str, seconds: float, documents: int, failed: bool) -> None:
+        stats = _request_stats.get()
+        if stats is not None:
+            with stats["lock"]:
+                stats["commands"].append((command, seconds, documents, failed))
+            return
+
+        labels = {"route": BACKGROUND_ROUTE, "command": command}
+        registry.inc("dataroom_mongo_commands_total", labels)
+        if failed:
+            registry.inc("dataroom_mongo_command_failures_total", labels)
+        registry.inc("dataroom_mongo_command_seconds_total", {"route": BACKGROUND_ROUTE}, seconds)
+        registry.inc("dataroom_mongo_documents_returned_total", {"route": BACKGROUND_ROUTE}, documents)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._record(event.command_name, event.duration_micros / 1_000_000, _documents_returned(event.reply), False)
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._record(event.command_name, event.duration_micros / 1_000_000, 0, True)
+
+
+mongo_command_listener = MongoCommandMetrics()
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware recording latency and MongoDB usage per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = {"lock": threading.Lock(), "commands": []}
+        token = _request_stats.set(stats)
+        status_holder = {"status": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        started_at = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            self._record(scope, stats, status_holder["status"], time.perf_counter() - started_at)
+
+    @staticmethod
+    def _record(scope, stats: dict, status: int, elapsed: float) -> None:
+        route = scope.get("route")
+        route_label = getattr(route, "path", None) or "unmatched"
+        method = scope.get("method", "")
+
+        registry.inc("dataroom_http_requests_total", {"route": route_label, "method": method, "status": str(status)})
+        registry.observe("dataroom_http_request_duration_seconds", {"route": route_label, "method": method}, elapsed)
+
+        with stats["lock"]:
+            commands = list(stats["commands"])
+
+        registry.observe("dataroom_mongo_commands_per_request", {"route": route_label, "method": method}, len(commands))
+        seconds = 0.0
+        documents = 0
+        for command, duration, returned, failed in commands:
+            labels = {"route": route_label, "command": command}
+            registry.inc("dataroom_mongo_commands_total", labels)
+            if failed:
+                registry.inc("dataroom_mongo_command_failures_total", labels)
+            seconds += duration
+            documents += returned
+        if commands:
+            registry.inc("dataroom_mongo_command_seconds_total", {"route": route_label}, seconds)
+            registry.inc("dataroom_mongo_documents_returned_total", {"route": route_label}, documents)
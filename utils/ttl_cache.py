@@ -0,0 +1,112 @@
+# utils/ttl_cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Optional
+
+
+class TTLCache:
+    """Thread-safe in-process cache with per-entry expiry and LRU eviction.
+
+    With track_keys set, hits and misses are also counted per key (for up to
+    track_keys distinct keys, least recently seen dropped first) so the
+    cache can be sized against the real working set.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, track_keys: int = 0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.track_keys = track_keys
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._key_stats: "OrderedDict[Hashable, List[int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _count(self, key: Hashable, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        if not self.track_keys:
+            return
+
+        counts = self._key_stats.get(key)
+        if counts is None:
+            counts = self._key_stats[key] = [0, 0]
+            while len(self._key_stats) > self.track_keys:
+                self._key_stats.popitem(last=False)
+        else:
+            self._key_stats.move_to_end(key)
+        counts[0 if hit else 1] += 1
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return a live entry (refreshing its LRU position) or default"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._count(key, False)
+                return default
+
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._data[key]
+                self._count(key, False)
+                return default
+
+            self._data.move_to_end(key)
+            self._count(key, True)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value; ttl overrides the cache default for this entry"""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        """Drop a single entry"""
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches the predicate"""
+        with self._lock:
+            keys = [key for key in self._data if predicate(key)]
+            for key in keys:
+                del self._data[key]
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def key_stats(self, limit: int = 20) -> List[dict]:
+        """Most requested tracked keys with their hit and miss counts"""
+        with self._lock:
+            ranked = sorted(self._key_stats.items(), key=lambda item: item[1][0] + item[1][1], reverse=True)
+        return [{"key": key, "hits": hits, "misses": misses} for key, (hits, misses) in ranked[:limit]]
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,43 @@
+# utils/upload_stream.py
+import hashlib
+
+from fastapi import HTTPException, UploadFile, status
+
+from config import settings
+
+
+def max_upload_bytes() -> int:
+    return settings.MAX_FILE_SIZE_MB * 1024 * 1024
+
+
+async def measure_upload(file: UploadFile, max_bytes: int = None) -> dict:
+    """
+    Stream an upload once in fixed-size chunks, enforcing the size cap and
+    hashing it on the fly. Only one chunk is in memory at a time.
+
+    Returns {"size", "sha256"} and rewinds the file for the upload that follows.
+    Raises 413 as soon as the cap is crossed.
+    """
+    max_bytes = max_bytes or max_upload_bytes()
+    chunk_size = settings.UPLOAD_READ_CHUNK_KB * 1024
+    digest = hashlib.sha256()
+    size = 0
+
+    await file.seek(0)
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"File exceeds the {settings.MAX_FILE_SIZE_MB}MB upload limit"
+            )
+        digest.update(chunk)
+
+    if size == 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file is empty")
+
+    await file.seek(0)
+    return {"size": size, "sha256": digest.hexdigest()}